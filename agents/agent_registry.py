@@ -0,0 +1,100 @@
+# agent_registry.py
+import threading
+from agents.llm_backends import BACKEND_GEMINI, TracedLLM, create_llm
+from agents.llm_client import DEFAULT_TIMEOUT, RateLimitedLLM
+
+DEFAULT_MODEL = "gemini-1.5-pro"
+
+# One client (and HTTP connection pool) per backend, API key and model, shared by every agent
+_llm_clients = {}
+_llm_clients_lock = threading.Lock()
+
+# Backend used when a caller does not name one: live Gemini by default, or fake / record / replay (see llm_backends)
+_default_backend = {"name": BACKEND_GEMINI, "options": {}}
+
+# Limits, timeout, retries and hedging applied to every client (see RateLimitedLLM); each model has its own buckets
+_rate_limits = {}
+
+
+def configure_llm_backend(name=BACKEND_GEMINI, **options):
+    """Set the default backend for callers that do not pass one; clients of other backends stay cached"""
+    with _llm_clients_lock:
+        _default_backend["name"] = name
+        _default_backend["options"] = options
+
+
+def current_llm_backend():
+    """Name of the default backend"""
+    with _llm_clients_lock:
+        return _default_backend["name"]
+
+
+def configure_rate_limits(**settings):
+    """Set requests_per_minute, tokens_per_minute, timeout, max_retries, hedge and max_concurrency for all clients.
+
+    Existing clients are updated in place, so agents holding them pick up the change.
+    """
+    with _llm_clients_lock:
+        _rate_limits.clear()
+        _rate_limits.update(settings)
+        clients = list(_llm_clients.values())
+    for client in clients:
+        client.llm.configure(**settings)
+
+
+def current_rate_limits():
+    with _llm_clients_lock:
+        return dict(_rate_limits)
+
+
+def llm_client_stats():
+    """{(backend, model): adaptive concurrency limit, requests in flight, limit decreases, p95 latency, clients}.
+
+    Clients of the same backend and model (other API keys or options) are
+    merged: limits, requests in flight and decreases add up, the p95 latency
+    is the slowest client's.
+    """
+    with _llm_clients_lock:
+        clients = list(_llm_clients.items())
+    stats = {}
+    for (backend, _, _, model_name), client in clients:
+        client_stats = dict(client.llm.stats(), clients=1)
+        merged = stats.get((backend, model_name))
+        if merged is None:
+            stats[(backend, model_name)] = client_stats
+            continue
+        for field in ("concurrency_limit", "in_flight", "decreases", "clients"):
+            merged[field] += client_stats[field]
+        latencies = [latency for latency in (merged["p95_latency"], client_stats["p95_latency"]) if latency is not None]
+        merged["p95_latency"] = max(latencies) if latencies else None
+    return stats
+
+
+def get_llm_client(api_key, model_name=DEFAULT_MODEL, backend=None, backend_options=None):
+    """Return the shared chat client for an API key, model and backend, creating it on first use.
+
+    Without a backend the default one (configure_llm_backend) is used; the
+    default backend named without options also gets the configured options.
+    Clients are cached per backend and options, so sessions on different
+    backends never replace each other's clients.
+    """
+    with _llm_clients_lock:
+        if backend is None:
+            backend = _default_backend["name"]
+        if backend_options is None and backend == _default_backend["name"]:
+            backend_options = _default_backend["options"]
+        backend_options = backend_options or {}
+        key = (backend, tuple(sorted(backend_options.items())), api_key, model_name)
+        client = _llm_clients.get(key)
+        if client is None:
+            # The live client gets the timeout in force when it is built
+            llm = create_llm(backend, api_key, model_name, **dict(backend_options, timeout=_rate_limits.get("timeout", DEFAULT_TIMEOUT)))
+            client = TracedLLM(RateLimitedLLM(llm, model_name, **_rate_limits), model_name)
+            _llm_clients[key] = client
+        return client
+
+
+def clear_llm_clients():
+    """Drop every cached client, e.g. after an API key has been revoked"""
+    with _llm_clients_lock:
+        _llm_clients.clear()
@@ -0,0 +1,106 @@
+# analysis_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_CACHE_PATH = os.path.join(".hr_assistant", "analysis_cache.sqlite")
+
+
+class AnalysisCache:
+    """Persistent, content-addressed cache for resume analysis results.
+
+    Entries are keyed by a hash of everything that determines the LLM output
+    (resume text, job description, model name and prompt version) and evicted
+    least-recently-used once the cache holds more than ``max_entries`` rows.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # The pipeline analyzes resumes from worker threads, so share one
+        # connection across threads and serialize access with a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                last_accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_last_accessed ON analyses (last_accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(resume_text, job_description, model_name, prompt_version):
+        """Build the content hash used as the cache key"""
+        digest = hashlib.sha256()
+        for part in (resume_text, job_description, model_name, str(prompt_version)):
+            encoded = (part or "").encode("utf-8")
+            # Length-prefix each part so different splits can never collide
+            digest.update(str(len(encoded)).encode("ascii") + b":")
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached analysis dict for a key, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE analyses SET last_accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, analysis_result):
+        """Store an analysis dict and evict the least recently used entries if over capacity"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, result, last_accessed) VALUES (?, ?, ?)",
+                (key, json.dumps(analysis_result), time.time())
+            )
+
+            count = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    """DELETE FROM analyses WHERE key IN (
+                        SELECT key FROM analyses ORDER BY last_accessed ASC LIMIT ?
+                    )""",
+                    (overflow,)
+                )
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached analysis and reset the counters"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters and the current number of cached entries"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self),
+            "max_entries": self.max_entries
+        }
@@ -1,17 +1,172 @@
-import os
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from agents.agent_registry import DEFAULT_MODEL, get_llm_client, current_llm_backend
+from agents.llm_backends import BACKEND_GEMINI, BACKEND_RECORD
+from agents.model_router import DEFAULT_BORDERLINE_MARGIN, select_llm
+from agents.llm_client import ainvoke_llm
+from agents.instrumentation import telemetry, traced
+from agents.contact_extraction import extract_contact_fields
+from agents.candidate_ranking import DEFAULT_WEIGHTS, score_matrix, weighted_scores, top_k_indices, rank_dataframe
+from agents.slot_allocator import SlotAllocator, by_priority
+from agents.response_parsing import (
+    CandidateAnalysis, ResponseParseError, aparse_response, estimate_tokens, parse_response, schema_description,
+    validate_analysis, validate_list, validate_slot_recommendation
+)
+
+# Bump whenever the analysis prompt changes so cached results are not reused
+ANALYSIS_PROMPT_VERSION = 2
+
+# Bump whenever the changed-criteria re-scoring prompt changes
+RESCORE_PROMPT_VERSION = 1
+
+# Token budget for a batched analysis request (prompt plus expected output)
+DEFAULT_BATCH_TOKEN_BUDGET = 30000
+# Expected output tokens per candidate in a batched response
+BATCH_OUTPUT_TOKENS_PER_RESUME = 600
+# Upper bound on resumes per batch so the JSON array fits in one response
+MAX_BATCH_SIZE = 10
+
+
+def _previous_scores(previous_analysis):
+    """The fields of an earlier analysis that a re-scoring request sends back"""
+    return {field: previous_analysis.get(field) for field in (
+        "skills_match_percentage", "experience_match_percentage", "overall_score",
+        "key_skills", "strengths", "weaknesses", "recommendation"
+    )}
+
+
+def _rescore_context(previous, requirement_changes):
+    """What a re-scoring result depends on besides the resume, for its cache key"""
+    return f"{requirement_changes}\n{json.dumps(previous, sort_keys=True)}"
+
+
+def _batch_results(entries, count):
+    """Valid analyses of a batched response keyed by batch position"""
+    batch_results = {}
+    for entry in entries:
+        try:
+            position = int(entry["resume_index"])
+            analysis_result = validate_analysis(entry)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= position < count and position not in batch_results:
+            batch_results[position] = analysis_result
+    return batch_results
+
+
+def _slot_recommendation(content, available_slots):
+    """The recommended slot from a slot-selection response, or the first available slot if it cannot be parsed"""
+    try:
+        return parse_response(content, validate_slot_recommendation, kind="slot")
+    except ResponseParseError:
+        # Fall back to first available slot if there's an error
+        if available_slots and len(available_slots) > 0:
+            return {
+                "slot_id": available_slots[0].get("id"),
+                "reasoning": "Fallback to first available slot due to processing error."
+            }
+        else:
+            return {
+                "slot_id": None,
+                "reasoning": "No available slots found."
+            }
+
 
 class CandidateAnalyzerAgent:
-    def __init__(self, api_key):
-        os.environ["GOOGLE_API_KEY"] = api_key
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", google_api_key=api_key)
+    def __init__(self, api_key, cache=None, llm=None, router=None, approve_threshold=50, backend=None):
+        self.model_name = DEFAULT_MODEL
+        backend = backend or current_llm_backend()
+        self.llm = llm if llm is not None else get_llm_client(api_key, self.model_name, backend)
+        self.cache = cache
+        # With a ModelRouter, analyses run on the fast tier and only borderline scores go to the pro tier
+        self.router = router
+        self.approve_threshold = approve_threshold
+        if router is not None:
+            self.model_name = f"{router.describe()}:{approve_threshold}"
+        # Cached analyses from fake or replayed responses must never be served as live ones
+        if backend not in (BACKEND_GEMINI, BACKEND_RECORD):
+            self.model_name = f"{backend}:{self.model_name}"
 
     
     
+    @traced("analysis")
     def analyze_resume(self, resume_text, job_description):
         """Analyze a resume against a job description"""
-        analysis_prompt = f"""
+        cache_key, cached_result = self._cached(resume_text, job_description, ANALYSIS_PROMPT_VERSION)
+        if cached_result is not None:
+            return cached_result
+        
+        analysis_result = self._request_analysis(resume_text, job_description, select_llm(self.router, self.llm, "triage"))
+        analysis_result = self._escalate_if_borderline(analysis_result, resume_text, job_description)
+        return self._finish_analysis(analysis_result, resume_text, cache_key)
+    
+    def _cached(self, resume_text, context, prompt_version):
+        """(cache key, cached result or None); the key is None without a cache"""
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.make_key(resume_text, context, self.model_name, prompt_version)
+        cached_result = self.cache.get(cache_key)
+        if cached_result is not None:
+            # The result may have been cached under a different approval threshold
+            cached_result["auto_decision"] = self._make_automatic_decision(cached_result)
+        return cache_key, cached_result
+    
+    def _finish_analysis(self, analysis_result, resume_text, cache_key):
+        """Add contact fields and the automatic decision, then cache the result"""
+        analysis_result = self._add_contact_fields(analysis_result, resume_text)
+        
+        # Add automatic decision based on score
+        analysis_result["auto_decision"] = self._make_automatic_decision(analysis_result)
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, analysis_result)
+        
+        return analysis_result
+    
+    def _needs_escalation(self, analysis_result):
+        return self.router is not None and self.router.is_borderline(analysis_result.get("overall_score"), self.approve_threshold)
+    
+    def _escalate_if_borderline(self, analysis_result, resume_text, job_description):
+        """Re-run a fast-tier analysis on the pro tier when its score is close to the approval threshold"""
+        if not self._needs_escalation(analysis_result):
+            return analysis_result
+        try:
+            return self._request_analysis(resume_text, job_description, self.router.for_task("borderline_analysis"))
+        except Exception:
+            # The fast-tier result is still usable
+            return analysis_result
+    
+    def _add_contact_fields(self, analysis_result, resume_text):
+        """Fill in name, email and phone from the resume text; the LLM is not asked for contact details"""
+        contact = extract_contact_fields(resume_text)
+        if contact["name_candidates"] or analysis_result.get("name") in (None, "", "Unknown"):
+            analysis_result["name"] = contact["name"]
+        analysis_result["email"] = contact["email"] or analysis_result.get("email") or ""
+        analysis_result["phone"] = contact["phone"] or ""
+        return analysis_result
+    
+    def _request_analysis(self, resume_text, job_description, llm):
+        """Send one analysis request and return the validated result"""
+        response = llm.invoke(self._analysis_prompt(resume_text, job_description))
+        
+        # Extract and validate the JSON, asking the model to repair it rather than re-running the analysis
+        try:
+            return parse_response(response.content, **self._analysis_parsing())
+        except ResponseParseError as e:
+            raise Exception(f"Error parsing analysis response: {str(e)}")
+    
+    def _analysis_parsing(self):
+        """parse_response arguments for a single analysis"""
+        return {
+            "validator": validate_analysis,
+            "kind": "analysis",
+            "llm": select_llm(self.router, self.llm, "repair"),
+            "schema_hint": f"a JSON object with {schema_description(CandidateAnalysis)}"
+        }
+    
+    @staticmethod
+    def _analysis_prompt(resume_text, job_description):
+        return f"""
         You are an expert HR analyst. Analyze the following resume against the job description.
         
         JOB DESCRIPTION:
@@ -21,8 +176,6 @@ class CandidateAnalyzerAgent:
         {resume_text}
         
         Provide your analysis in valid JSON format with these fields:
-        - name: The candidate's full name
-        - email: The candidate's email address (extract it accurately)
         - skills_match_percentage: A numerical score (0-100) representing how well the candidate's skills match the requirements
         - experience_match_percentage: A numerical score (0-100) representing how well the candidate's experience matches the requirements
         - overall_score: A numerical score (0-100) reflecting the candidate's overall suitability
@@ -33,41 +186,188 @@ class CandidateAnalyzerAgent:
         
         Return ONLY the JSON without any other text.
         """
+    
+    @traced("rescoring")
+    def rescore_changed_criteria(self, resume_text, previous_analysis, requirement_changes):
+        """Update an earlier analysis for edited job requirements without re-analyzing the whole job description"""
+        previous = _previous_scores(previous_analysis)
+        cache_key, cached_result = self._cached(resume_text, _rescore_context(previous, requirement_changes),
+                                                f"rescore-{RESCORE_PROMPT_VERSION}")
+        if cached_result is not None:
+            return cached_result
         
-        response = self.llm.invoke(analysis_prompt)
+        response = select_llm(self.router, self.llm, "rescore").invoke(
+            self._rescore_prompt(resume_text, previous, requirement_changes)
+        )
+        try:
+            analysis_result = parse_response(response.content, **self._analysis_parsing())
+        except ResponseParseError as e:
+            raise Exception(f"Error parsing re-scoring response: {str(e)}")
         
-        # Extract and parse the JSON
-        json_str = response.content
+        return self._finish_analysis(analysis_result, resume_text, cache_key)
+    
+    @staticmethod
+    def _rescore_prompt(resume_text, previous, requirement_changes):
+        return f"""
+        You are an expert HR analyst. A candidate was already analyzed against a job description.
+        The job requirements have since been edited. Re-evaluate ONLY the changed requirements below
+        and adjust the earlier analysis accordingly; keep everything the changes do not touch.
         
-        # Clean up the JSON string if needed
-        if "```json" in json_str:
-            json_str = json_str.split("```json")[1].split("```")[0].strip()
-        elif "```" in json_str:
-            json_str = json_str.split("```")[1].split("```")[0].strip()
+        REQUIREMENT CHANGES:
+        {requirement_changes}
         
-        try:
-            analysis_result = json.loads(json_str)
+        EARLIER ANALYSIS:
+        {json.dumps(previous)}
+        
+        RESUME:
+        {resume_text}
+        
+        Return the updated analysis in valid JSON format with the same fields as the earlier analysis.
+        
+        Return ONLY the JSON without any other text.
+        """
+    
+    def plan_batches(self, resume_texts, job_description, max_batch_tokens=DEFAULT_BATCH_TOKEN_BUDGET):
+        """Group resume indices into batches that fit the token budget alongside one copy of the JD"""
+        jd_tokens = estimate_tokens(job_description)
+        batches = []
+        current_batch = []
+        current_tokens = jd_tokens
+        
+        for index, resume_text in enumerate(resume_texts):
+            resume_tokens = estimate_tokens(resume_text) + BATCH_OUTPUT_TOKENS_PER_RESUME
             
-            # Add automatic decision based on score
-            analysis_result["auto_decision"] = self._make_automatic_decision(analysis_result)
+            if current_batch and (current_tokens + resume_tokens > max_batch_tokens or len(current_batch) >= MAX_BATCH_SIZE):
+                batches.append(current_batch)
+                current_batch = []
+                current_tokens = jd_tokens
             
-            return analysis_result
-        except json.JSONDecodeError as e:
-            raise Exception(f"Error parsing analysis response: {str(e)}")
+            # An oversized resume still gets a batch of its own
+            current_batch.append(index)
+            current_tokens += resume_tokens
+        
+        if current_batch:
+            batches.append(current_batch)
+        
+        return batches
+    
+    @traced("analysis_batch")
+    def analyze_resumes_batch(self, resume_texts, job_description, max_batch_tokens=DEFAULT_BATCH_TOKEN_BUDGET):
+        """Analyze several resumes against one job description using as few LLM calls as possible.
+        
+        Returns a list aligned with ``resume_texts``. Entries that could not be analyzed,
+        even by the per-resume fallback, hold the raised exception instead of a dict.
+        """
+        results, cache_keys, batches = self._batch_plan(resume_texts, job_description, max_batch_tokens)
+        for batch_indices in batches:
+            if len(batch_indices) == 1:
+                batch_results = {}
+            else:
+                batch_results = self._analyze_batch(
+                    [resume_texts[index] for index in batch_indices],
+                    job_description
+                )
+            
+            for position, index in enumerate(batch_indices):
+                analysis_result = batch_results.get(position)
+                if analysis_result is None:
+                    # Fall back to a dedicated call for anything the batch did not return cleanly
+                    telemetry.increment("retries", kind="batch_fallback")
+                    try:
+                        results[index] = self.analyze_resume(resume_texts[index], job_description)
+                    except Exception as e:
+                        results[index] = e
+                    continue
+                
+                analysis_result = self._escalate_if_borderline(analysis_result, resume_texts[index], job_description)
+                results[index] = self._finish_analysis(analysis_result, resume_texts[index], cache_keys[index])
+        
+        return results
+    
+    def _batch_plan(self, resume_texts, job_description, max_batch_tokens):
+        """Cached results aligned with ``resume_texts`` (None where missing), their cache keys, and batches
+        of the indices still to analyze"""
+        results = [None] * len(resume_texts)
+        cache_keys = [None] * len(resume_texts)
+        uncached_indices = []
+        
+        for index, resume_text in enumerate(resume_texts):
+            cache_keys[index], results[index] = self._cached(resume_text, job_description, ANALYSIS_PROMPT_VERSION)
+            if results[index] is None:
+                uncached_indices.append(index)
+        
+        uncached_texts = [resume_texts[index] for index in uncached_indices]
+        batches = [[uncached_indices[position] for position in batch]
+                   for batch in self.plan_batches(uncached_texts, job_description, max_batch_tokens)]
+        return results, cache_keys, batches
+    
+    def _analyze_batch(self, resume_texts, job_description):
+        """Send one batched analysis request and return the parsed entries keyed by batch position"""
+        try:
+            response = select_llm(self.router, self.llm, "analysis_batch").invoke(self._batch_prompt(resume_texts, job_description))
+            entries = parse_response(response.content, **self._batch_parsing())
+        except Exception:
+            # The whole batch is retried per resume by the caller
+            return {}
+        return _batch_results(entries, len(resume_texts))
+    
+    def _batch_parsing(self):
+        """parse_response arguments for a batched analysis"""
+        return {
+            "validator": validate_list,
+            "kind": "analysis_batch",
+            "llm": select_llm(self.router, self.llm, "repair"),
+            "schema_hint": f"a JSON array of objects with resume_index, {schema_description(CandidateAnalysis)}"
+        }
+    
+    @staticmethod
+    def _batch_prompt(resume_texts, job_description):
+        resumes_block = "\n".join(
+            f"""
+        RESUME {position}:
+        {resume_text}
+        """
+            for position, resume_text in enumerate(resume_texts)
+        )
+        
+        return f"""
+        You are an expert HR analyst. Analyze each of the following {len(resume_texts)} resumes against the job description.
+        
+        JOB DESCRIPTION:
+        {job_description}
+        {resumes_block}
+        
+        Provide your analysis as a valid JSON array with exactly one object per resume. Each object must have these fields:
+        - resume_index: The number of the resume this object describes
+        - skills_match_percentage: A numerical score (0-100) representing how well the candidate's skills match the requirements
+        - experience_match_percentage: A numerical score (0-100) representing how well the candidate's experience matches the requirements
+        - overall_score: A numerical score (0-100) reflecting the candidate's overall suitability
+        - key_skills: List of the candidate's top 5 most relevant skills
+        - strengths: 3 key strengths relative to the position
+        - weaknesses: 3 key areas for improvement relative to the position
+        - recommendation: One of ["Strong Hire", "Potential Hire", "Consider for Different Role", "Reject"]
+        
+        Evaluate every resume independently. Return ONLY the JSON array without any other text.
+        """
     
     def _make_automatic_decision(self, analysis_result):
-        """Make an automatic decision based on candidate analysis"""
+        """Make an automatic decision based on candidate analysis.
+        
+        Scores within the borderline margin below the approval threshold (the
+        band the router escalates to the pro tier) go to manual review.
+        """
         overall_score = analysis_result.get("overall_score", 0)
         recommendation = analysis_result.get("recommendation", "")
+        margin = self.router.borderline_margin if self.router is not None else DEFAULT_BORDERLINE_MARGIN
         
         # Automated decision criteria
-        if overall_score >= 50 and recommendation in ["Strong Hire", "Potential Hire"]:
+        if overall_score >= self.approve_threshold and recommendation in ["Strong Hire", "Potential Hire"]:
             return {
                 "status": "Approved",
                 "reason": f"Automatically approved with score of {overall_score}%. Candidate has sufficient qualifications for the role.",
                 "needs_interview": True
             }
-        elif overall_score >= 40 and overall_score < 50 and recommendation != "Reject":
+        elif self.approve_threshold - margin <= overall_score < self.approve_threshold and recommendation != "Reject":
             return {
                 "status": "Pending",
                 "reason": f"Score of {overall_score}% is close to threshold. Manual review recommended.",
@@ -84,27 +384,54 @@ class CandidateAnalyzerAgent:
         """Rank candidates based on their analysis scores and optional custom weights"""
         if weights is None:
             # Default weights for different factors
-            weights = {
-                "skills_match_percentage": 0.4,
-                "experience_match_percentage": 0.3,
-                "overall_score": 0.3
-            }
+            weights = DEFAULT_WEIGHTS
         
-        for candidate in candidates_data:
-            weighted_score = (
-                candidate.get("skills_match_percentage", 0) * weights["skills_match_percentage"] +
-                candidate.get("experience_match_percentage", 0) * weights["experience_match_percentage"] +
-                candidate.get("overall_score", 0) * weights["overall_score"]
-            )
-            candidate["weighted_score"] = weighted_score
+        scores = weighted_scores(score_matrix(candidates_data), weights)
+        for candidate, weighted_score in zip(candidates_data, scores):
+            candidate["weighted_score"] = float(weighted_score)
         
         # Sort candidates by weighted score
-        ranked_candidates = sorted(candidates_data, key=lambda x: x.get("weighted_score", 0), reverse=True)
+        ranked_candidates = [candidates_data[index] for index in top_k_indices(scores)]
         return ranked_candidates
     
+    def rank_candidates_df(self, candidates_df, weights=None, top_k=None):
+        """Rank a candidates DataFrame by weighted score without converting it to dicts"""
+        return rank_dataframe(candidates_df, weights, top_k)
+    
+    @traced("scheduling")
+    def schedule_interviews(self, candidates, slots, use_llm=False):
+        """Assign interview slots to a batch of candidates, highest overall score first.
+
+        Slots are allocated deterministically (earliest free slot, preferring
+        interviewers whose skills match the candidate) unless use_llm is set, in
+        which case the LLM picks each slot. Assigned slots are marked unavailable
+        in place. Returns (candidate, slot_or_None) pairs in priority order.
+        """
+        allocator = SlotAllocator(slots)
+        if not use_llm:
+            return allocator.allocate(candidates)
+        
+        assignments = []
+        for candidate in by_priority(candidates):
+            free_slots = allocator.free_slots()
+            if not free_slots:
+                assignments.append((candidate, None))
+                continue
+            recommended_slot = self.get_best_interview_time_slot(candidate, free_slots)
+            slot = allocator.take(recommended_slot.get("slot_id")) or allocator.take_earliest(candidate.get("key_skills"))
+            assignments.append((candidate, slot))
+        return assignments
+    
     def get_best_interview_time_slot(self, candidate_profile, available_slots):
         """Recommend the best interview time slot based on candidate profile and availability"""
-        prompt = f"""
+        response = select_llm(self.router, self.llm, "slot_selection").invoke(
+            self._slot_prompt(candidate_profile, available_slots)
+        )
+        return _slot_recommendation(response.content, available_slots)
+    
+    @staticmethod
+    def _slot_prompt(candidate_profile, available_slots):
+        return f"""
         You are an intelligent HR scheduling assistant. Based on the candidate profile below, 
         recommend the most suitable interview time slot from the available options.
         
@@ -126,27 +453,108 @@ class CandidateAnalyzerAgent:
         - slot_id: The ID of the recommended slot
         - reasoning: Brief explanation of why this slot is recommended
         """
+    
+    # Coroutine variants; they await the client directly and share its rate limits and adaptive concurrency
+    
+    @traced("analysis")
+    async def aanalyze_resume(self, resume_text, job_description):
+        cache_key, cached_result = self._cached(resume_text, job_description, ANALYSIS_PROMPT_VERSION)
+        if cached_result is not None:
+            return cached_result
+        
+        analysis_result = await self._arequest_analysis(resume_text, job_description,
+                                                        select_llm(self.router, self.llm, "triage"))
+        analysis_result = await self._aescalate_if_borderline(analysis_result, resume_text, job_description)
+        return self._finish_analysis(analysis_result, resume_text, cache_key)
+    
+    async def _arequest_analysis(self, resume_text, job_description, llm):
+        response = await ainvoke_llm(llm, self._analysis_prompt(resume_text, job_description))
+        try:
+            return await aparse_response(response.content, **self._analysis_parsing())
+        except ResponseParseError as e:
+            raise Exception(f"Error parsing analysis response: {str(e)}")
+    
+    async def _aescalate_if_borderline(self, analysis_result, resume_text, job_description):
+        if not self._needs_escalation(analysis_result):
+            return analysis_result
+        try:
+            return await self._arequest_analysis(resume_text, job_description, self.router.for_task("borderline_analysis"))
+        except Exception:
+            return analysis_result
+    
+    @traced("analysis_batch")
+    async def aanalyze_resumes_batch(self, resume_texts, job_description, max_batch_tokens=DEFAULT_BATCH_TOKEN_BUDGET):
+        """Like ``analyze_resumes_batch``, with every batch in flight at once"""
+        results, cache_keys, batches = self._batch_plan(resume_texts, job_description, max_batch_tokens)
+        
+        async def finish(index, analysis_result):
+            if analysis_result is None:
+                telemetry.increment("retries", kind="batch_fallback")
+                try:
+                    return await self.aanalyze_resume(resume_texts[index], job_description)
+                except Exception as e:
+                    return e
+            analysis_result = await self._aescalate_if_borderline(analysis_result, resume_texts[index], job_description)
+            return self._finish_analysis(analysis_result, resume_texts[index], cache_keys[index])
         
-        response = self.llm.invoke(prompt)
+        async def analyze(batch_indices):
+            batch_results = {}
+            if len(batch_indices) > 1:
+                batch_results = await self._aanalyze_batch([resume_texts[index] for index in batch_indices], job_description)
+            return await asyncio.gather(*(finish(index, batch_results.get(position))
+                                          for position, index in enumerate(batch_indices)))
         
+        analyzed = await asyncio.gather(*(analyze(batch_indices) for batch_indices in batches))
+        for batch_indices, batch_analyses in zip(batches, analyzed):
+            for index, analysis_result in zip(batch_indices, batch_analyses):
+                results[index] = analysis_result
+        return results
+    
+    async def _aanalyze_batch(self, resume_texts, job_description):
         try:
-            # Extract JSON from response
-            json_str = response.content
-            if "```json" in json_str:
-                json_str = json_str.split("```json")[1].split("```")[0].strip()
-            elif "```" in json_str:
-                json_str = json_str.split("```")[1].split("```")[0].strip()
-            
-            return json.loads(json_str)
-        except Exception as e:
-            # Fall back to first available slot if there's an error
-            if available_slots and len(available_slots) > 0:
-                return {
-                    "slot_id": available_slots[0].get("id"),
-                    "reasoning": "Fallback to first available slot due to processing error."
-                }
-            else:
-                return {
-                    "slot_id": None,
-                    "reasoning": "No available slots found."
-                }
\ No newline at end of file
+            response = await ainvoke_llm(select_llm(self.router, self.llm, "analysis_batch"),
+                                         self._batch_prompt(resume_texts, job_description))
+            entries = await aparse_response(response.content, **self._batch_parsing())
+        except Exception:
+            return {}
+        return _batch_results(entries, len(resume_texts))
+    
+    @traced("rescoring")
+    async def arescore_changed_criteria(self, resume_text, previous_analysis, requirement_changes):
+        previous = _previous_scores(previous_analysis)
+        cache_key, cached_result = self._cached(resume_text, _rescore_context(previous, requirement_changes),
+                                                f"rescore-{RESCORE_PROMPT_VERSION}")
+        if cached_result is not None:
+            return cached_result
+        
+        response = await ainvoke_llm(select_llm(self.router, self.llm, "rescore"),
+                                     self._rescore_prompt(resume_text, previous, requirement_changes))
+        try:
+            analysis_result = await aparse_response(response.content, **self._analysis_parsing())
+        except ResponseParseError as e:
+            raise Exception(f"Error parsing re-scoring response: {str(e)}")
+        
+        return self._finish_analysis(analysis_result, resume_text, cache_key)
+    
+    @traced("scheduling")
+    async def aschedule_interviews(self, candidates, slots, use_llm=False):
+        allocator = SlotAllocator(slots)
+        if not use_llm:
+            return allocator.allocate(candidates)
+        
+        # One candidate at a time: each recommendation depends on the slots taken before it
+        assignments = []
+        for candidate in by_priority(candidates):
+            free_slots = allocator.free_slots()
+            if not free_slots:
+                assignments.append((candidate, None))
+                continue
+            recommended_slot = await self.aget_best_interview_time_slot(candidate, free_slots)
+            slot = allocator.take(recommended_slot.get("slot_id")) or allocator.take_earliest(candidate.get("key_skills"))
+            assignments.append((candidate, slot))
+        return assignments
+    
+    async def aget_best_interview_time_slot(self, candidate_profile, available_slots):
+        response = await ainvoke_llm(select_llm(self.router, self.llm, "slot_selection"),
+                                     self._slot_prompt(candidate_profile, available_slots))
+        return _slot_recommendation(response.content, available_slots)
@@ -0,0 +1,108 @@
+# candidate_ranking.py
+import numpy as np
+import pandas as pd
+
+# Score fields used for ranking, in weight-vector order
+SCORE_FIELDS = ["skills_match_percentage", "experience_match_percentage", "overall_score"]
+
+# Matching column names in the candidates table shown in the app
+SCORE_COLUMNS = {
+    "skills_match_percentage": "Skills Match (%)",
+    "experience_match_percentage": "Experience Match (%)",
+    "overall_score": "Overall Score"
+}
+
+DEFAULT_WEIGHTS = {
+    "skills_match_percentage": 0.4,
+    "experience_match_percentage": 0.3,
+    "overall_score": 0.3
+}
+
+# Preset weight profiles for comparing rankings side by side
+WEIGHT_PROFILES = {
+    "Balanced": DEFAULT_WEIGHTS,
+    "Skills First": {"skills_match_percentage": 0.6, "experience_match_percentage": 0.2, "overall_score": 0.2},
+    "Experience First": {"skills_match_percentage": 0.2, "experience_match_percentage": 0.6, "overall_score": 0.2},
+    "Overall Fit": {"skills_match_percentage": 0.2, "experience_match_percentage": 0.2, "overall_score": 0.6}
+}
+
+
+def weight_vector(weights=None):
+    """Turn a weights dict (analysis field or table column names) or a sequence into a NumPy vector"""
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    if isinstance(weights, dict):
+        return np.array([
+            float(weights.get(field, weights.get(SCORE_COLUMNS[field], 0.0)))
+            for field in SCORE_FIELDS
+        ])
+
+    vector = np.asarray(weights, dtype=float)
+    if vector.shape != (len(SCORE_FIELDS),):
+        raise ValueError(f"Expected {len(SCORE_FIELDS)} weights, got shape {vector.shape}")
+    return vector
+
+
+def score_matrix(candidates):
+    """Return an (n_candidates, n_scores) float matrix from a DataFrame or list of analysis dicts.
+
+    DataFrames may use either the analysis field names or the app's column names;
+    missing or non-numeric scores count as 0.
+    """
+    if isinstance(candidates, pd.DataFrame):
+        columns = []
+        for field in SCORE_FIELDS:
+            column = field if field in candidates.columns else SCORE_COLUMNS[field]
+            if column in candidates.columns:
+                columns.append(pd.to_numeric(candidates[column], errors="coerce").to_numpy(dtype=float))
+            else:
+                columns.append(np.zeros(len(candidates)))
+        matrix = np.column_stack(columns) if len(candidates) else np.zeros((0, len(SCORE_FIELDS)))
+    else:
+        matrix = np.array(
+            [[candidate.get(field, 0) or 0 for field in SCORE_FIELDS] for candidate in candidates],
+            dtype=float
+        ).reshape(-1, len(SCORE_FIELDS))
+
+    return np.nan_to_num(matrix, nan=0.0)
+
+
+def weighted_scores(scores, weights=None):
+    """Weighted score per candidate for one weight vector"""
+    return scores @ weight_vector(weights)
+
+
+def top_k_indices(values, k=None):
+    """Positions of the k largest values in descending order, using a partial sort when k < n"""
+    n = len(values)
+    if k is None or k >= n:
+        return np.argsort(-values, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=int)
+
+    candidates = np.argpartition(-values, k - 1)[:k]
+    return candidates[np.argsort(-values[candidates], kind="stable")]
+
+
+def rank_dataframe(candidates_df, weights=None, top_k=None, score_column="Weighted Score"):
+    """Return the candidates ranked by weighted score (top_k rows only if given), with the score added"""
+    scores = weighted_scores(score_matrix(candidates_df), weights)
+    order = top_k_indices(scores, top_k)
+
+    ranked = candidates_df.iloc[order].copy()
+    ranked[score_column] = scores[order].round(2)
+    return ranked
+
+
+def rank_under_profiles(candidates_df, profiles=None, top_k=None):
+    """Rank candidates under several weight profiles with a single matrix product.
+
+    Returns a dict mapping each profile name to the positional indices of its
+    top candidates, best first.
+    """
+    profiles = profiles or WEIGHT_PROFILES
+    names = list(profiles)
+    weight_matrix = np.column_stack([weight_vector(profiles[name]) for name in names])
+    all_scores = score_matrix(candidates_df) @ weight_matrix
+
+    return {name: top_k_indices(all_scores[:, column], top_k) for column, name in enumerate(names)}
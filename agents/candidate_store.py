@@ -0,0 +1,163 @@
+# candidate_store.py
+import pandas as pd
+
+CANDIDATE_COLUMNS = [
+    "Name", "Email", "Skills Match (%)", "Experience Match (%)", "Overall Score",
+    "Key Skills", "Strengths", "Weaknesses", "Recommendation", "Status",
+    "Automated Decision", "Email Sent", "JD Version"
+]
+
+ID_COLUMN = "Candidate ID"
+
+
+def _normalize_email(email):
+    return str(email).strip().lower()
+
+
+class CandidateStore:
+    """Candidate table indexed by a stable candidate ID, with a hash index on email.
+
+    The DataFrame index is the candidate ID, so rows can be addressed directly
+    instead of scanning for matching emails. With a repository, IDs are
+    assigned by the database (so concurrent sessions never hand out the same
+    one), rows are loaded page by page on first access and every change is
+    written through to it; without one, IDs come from a monotonic counter.
+    """
+
+    def __init__(self, repository=None):
+        self.repository = repository
+        self._df = pd.DataFrame(columns=CANDIDATE_COLUMNS, index=pd.Index([], name=ID_COLUMN, dtype="int64"))
+        self._next_id = 1
+        self._loaded = repository is None
+        # Normalized email -> IDs of every candidate with that email, oldest first
+        self._email_index = {}
+
+    @property
+    def df(self):
+        self._ensure_loaded()
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._load_from_repository()
+
+    def _load_from_repository(self):
+        """Read all stored candidates from the repository, one page at a time"""
+        self._loaded = True
+        pages = [
+            pd.DataFrame(page).set_index(ID_COLUMN).reindex(columns=CANDIDATE_COLUMNS)
+            for page in self.repository.iter_candidate_pages()
+        ]
+        if pages:
+            self._df = pd.concat(pages)
+            self._df["Email Sent"] = self._df["Email Sent"].astype(bool)
+            self._index_emails(self._df.index, self._df["Email"])
+
+    def _index_emails(self, candidate_ids, emails):
+        for candidate_id, email in zip(candidate_ids, emails):
+            if isinstance(email, str) and "@" in email:
+                self._email_index.setdefault(_normalize_email(email), []).append(candidate_id)
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def add_candidates(self, rows, resume_hashes=None, job_description_hash=None):
+        """Append candidate rows (dicts) in one step and return their new IDs"""
+        if not rows:
+            return []
+
+        current_df = self.df
+        new_df = pd.DataFrame(rows).reindex(columns=CANDIDATE_COLUMNS)
+        new_df["Email Sent"] = new_df["Email Sent"].fillna(False).astype(bool)
+        if job_description_hash is not None and self.repository is not None:
+            # Rows are tagged with the job description version they were scored against
+            new_df["JD Version"] = new_df["JD Version"].fillna(self.repository.job_description_version(job_description_hash))
+
+        if self.repository is not None:
+            ids = self.repository.insert_candidates(new_df.to_dict("records"), resume_hashes, job_description_hash)
+        else:
+            ids = list(range(self._next_id, self._next_id + len(rows)))
+            self._next_id += len(rows)
+
+        new_df.index = pd.Index(ids, name=ID_COLUMN)
+        self.df = new_df if current_df.empty else pd.concat([current_df, new_df])
+        self._index_emails(ids, new_df["Email"])
+        return ids
+
+    def id_for_email(self, email):
+        """Look up the most recently added candidate ID for an email address, or None"""
+        self._ensure_loaded()
+        candidate_ids = self._email_index.get(_normalize_email(email))
+        return candidate_ids[-1] if candidate_ids else None
+
+    def ids_for_emails(self, emails):
+        """Look up the IDs of every candidate with one of several email addresses, skipping unknown ones"""
+        self._ensure_loaded()
+        return [candidate_id for email in emails for candidate_id in self._email_index.get(_normalize_email(email), ())]
+
+    def apply_edits(self, edited_df, columns=("Status",)):
+        """Apply edited values from a view of the table (indexed by candidate ID).
+
+        Only rows whose values differ are written. Returns a DataFrame of the
+        changed rows with ``previous <column>`` and ``<column>`` for each edited column.
+        """
+        columns = list(columns)
+        ids = edited_df.index.intersection(self.df.index)
+        if ids.empty:
+            return pd.DataFrame(columns=[f"previous {column}" for column in columns] + columns)
+
+        current = self.df.loc[ids, columns]
+        edited = edited_df.loc[ids, columns]
+        changed_mask = (current.astype(object) != edited.astype(object)).any(axis=1).to_numpy()
+        changed_ids = ids[changed_mask]
+
+        changes = current.loc[changed_ids].add_prefix("previous ")
+        for column in columns:
+            changes[column] = edited.loc[changed_ids, column]
+
+        if len(changed_ids):
+            self.df.loc[changed_ids, columns] = edited.loc[changed_ids, columns].to_numpy()
+            if self.repository is not None:
+                for column in columns:
+                    self.repository.update_candidates(column, zip(changed_ids, edited.loc[changed_ids, column]))
+
+        return changes
+
+    def update_rows(self, candidate_ids, column, value):
+        """Set one column to the same value for several candidates"""
+        if len(candidate_ids):
+            self.df.loc[list(candidate_ids), column] = value
+            if self.repository is not None:
+                self.repository.update_candidates(column, [(candidate_id, value) for candidate_id in candidate_ids])
+
+    def update_records(self, updates):
+        """Set several columns per candidate from {candidate_id: {column: value}}.
+
+        Candidates added by other sessions since this table was loaded are only
+        updated in the repository.
+        """
+        columns = {}
+        for candidate_id, values in updates.items():
+            known = candidate_id in self.df.index
+            for column, value in values.items():
+                if known:
+                    self.df.at[candidate_id, column] = value
+                columns.setdefault(column, []).append((candidate_id, value))
+        if self.repository is not None:
+            for column, column_updates in columns.items():
+                self.repository.update_candidates(column, column_updates)
+
+    def mark_email_sent(self, emails):
+        """Flag candidates as emailed by address, touching only the matching rows"""
+        candidate_ids = [candidate_id for candidate_id in self.ids_for_emails(emails)
+                         if not self.df.at[candidate_id, "Email Sent"]]
+        self.update_rows(candidate_ids, "Email Sent", True)
+        return candidate_ids
@@ -1,21 +1,113 @@
 # communication_agent.py
-import os
-import smtplib
+import asyncio
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agents.agent_registry import get_llm_client
+from agents.model_router import select_llm
+from agents.llm_client import ainvoke_llm
+from agents.instrumentation import traced
+from agents.email_delivery import SMTPDeliveryEngine, DEFAULT_SMTP_HOST, DEFAULT_SMTP_PORT
+from agents.text_compaction import job_description_digest
+from agents.response_parsing import ResponseParseError, parse_response, validate_email, validate_list
+from agents.email_templates import (
+    EMAIL_MODE_LLM, EMAIL_MODE_OFFLINE, EMAIL_MODES,
+    offline_personalized_paragraph, render_interview_email, render_rejection_email
+)
+
+# Largest number of rejection emails drafted in one request
+REJECTION_BATCH_SIZE = 15
+
+
+def _job_title(job_description):
+    """Use the first line of the job description as the position title"""
+    if '\n' not in job_description:
+        return 'the open position'
+    return job_description.split('\n')[0].strip().strip('#* ') or 'the open position'
+
+
+def _parse_email_response(content, fallback_subject):
+    """Read subject and body from a structured email response.
+    
+    When the output is not valid JSON the raw text is used as the body together
+    with a deterministic subject line.
+    """
+    try:
+        email = parse_response(content, validate_email, kind="email")
+        return {"subject": email["subject"] or fallback_subject, "body": email["body"]}
+    except ResponseParseError:
+        pass
+    
+    return {"subject": fallback_subject, "body": content.strip()}
+
+
+def _rejection_batches(count):
+    """Index lists of at most REJECTION_BATCH_SIZE candidates"""
+    return [list(range(start, min(start + REJECTION_BATCH_SIZE, count))) for start in range(0, count, REJECTION_BATCH_SIZE)]
+
+
+def _batch_emails(entries, count, job_title):
+    """Valid emails of a batched rejection response keyed by batch position"""
+    batch_emails = {}
+    for entry in entries:
+        try:
+            position = int(entry["candidate_index"])
+            email = validate_email(entry)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= position < count:
+            batch_emails[position] = {
+                "subject": email["subject"] or f"Your application for {job_title}",
+                "body": email["body"]
+            }
+    return batch_emails
+
 
 class CommunicationAgent:
-    def __init__(self, gemini_api_key, gmail_email=None, gmail_password=None):
-        os.environ["GOOGLE_API_KEY"] = gemini_api_key
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", google_api_key=gemini_api_key)
+    def __init__(self, gemini_api_key, gmail_email=None, gmail_password=None, llm=None,
+                 smtp_host=DEFAULT_SMTP_HOST, smtp_port=DEFAULT_SMTP_PORT, smtp_use_ssl=True,
+                 messages_per_minute=None, outbox=None, email_mode=EMAIL_MODE_LLM, router=None):
+        self.llm = llm if llm is not None else get_llm_client(gemini_api_key)
+        self.router = router
         self.gmail_email = gmail_email
         self.gmail_password = gmail_password
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.smtp_use_ssl = smtp_use_ssl
+        self.messages_per_minute = messages_per_minute
+        self.outbox = outbox
+        
+        if email_mode not in EMAIL_MODES:
+            raise ValueError(f"Unknown email mode '{email_mode}'. Expected one of {', '.join(EMAIL_MODES)}.")
+        self.email_mode = email_mode
+        
+        # Personalized paragraphs for template mode, keyed by candidate profile
+        self._paragraph_cache = {}
+        self._paragraph_cache_lock = threading.Lock()
     
-    def generate_interview_email(self, candidate_info, job_description, interview_details, email_tone="Professional"):
+    @traced("email_generation", kind="interview")
+    def generate_interview_email(self, candidate_info, job_description, interview_details, email_tone="Professional",
+                                 mode=None):
         """Generate a personalized interview invitation email"""
-        # Truncate the job description to avoid too long prompt
-        job_desc_truncated = job_description[:500] + "..." if len(job_description) > 500 else job_description
+        mode = mode or self.email_mode
+        if mode != EMAIL_MODE_LLM:
+            job_title = _job_title(job_description)
+            if mode == EMAIL_MODE_OFFLINE:
+                paragraph = offline_personalized_paragraph(candidate_info, job_title)
+            else:
+                paragraph = self.generate_personalized_paragraph(candidate_info, job_title, email_tone)
+            return render_interview_email(candidate_info, job_title, interview_details, paragraph)
+        
+        email_prompt, fallback_subject = self._interview_email_prompt(candidate_info, job_description,
+                                                                      interview_details, email_tone)
+        response = select_llm(self.router, self.llm, "interview_email").invoke(email_prompt)
+        return _parse_email_response(response.content, fallback_subject)
+    
+    def _interview_email_prompt(self, candidate_info, job_description, interview_details, email_tone):
+        """The interview email prompt and the subject used when the response has none"""
+        # A short digest of the job description keeps the prompt small; it is computed once per description
+        job_digest = job_description_digest(job_description)
+        job_title = _job_title(job_description)
         
         email_prompt = f"""
         Create a personalized interview invitation email for a job candidate with the following details:
@@ -26,7 +118,7 @@ class CommunicationAgent:
         - Strengths: {', '.join(candidate_info['strengths'])}
         
         JOB DETAILS:
-        {job_desc_truncated}
+        {job_digest}
         
         INTERVIEW DETAILS:
         - Date: {interview_details['date']}
@@ -45,42 +137,81 @@ class CommunicationAgent:
         5. Contact information for questions
         6. Professional signature from the interviewer
         
-        IMPORTANT: Write only the email body, no subject line.
-        """
-        
-        response = self.llm.invoke(email_prompt)
-        email_body = response.content
-        
-        # Generate subject line
-        job_title = job_description.split('\n')[0] if '\n' in job_description else 'the open position'
-        
-        subject_prompt = f"""
-        Create a concise, professional subject line for an interview invitation email for:
-        - Candidate: {candidate_info['name']}
-        - Position: {job_title}
-        - Date: {interview_details['date']}
+        Also write a concise, professional subject line that mentions the position ({job_title}) and the interview date.
         
-        Return only the subject line, nothing else.
+        Return ONLY a JSON object with two fields:
+        - subject: The subject line
+        - body: The email body
         """
+        return email_prompt, f"Interview Invitation: {job_title} - {interview_details['date']}"
+    
+    def generate_personalized_paragraph(self, candidate_info, job_title, email_tone="Professional"):
+        """Ask the LLM for a short paragraph tailored to the candidate, cached per candidate profile"""
+        cache_key, paragraph = self._cached_paragraph(candidate_info, job_title, email_tone)
+        if paragraph is not None:
+            return paragraph
+        try:
+            prompt = self._paragraph_prompt(candidate_info, job_title, email_tone)
+            paragraph = select_llm(self.router, self.llm, "personalization").invoke(prompt).content.strip()
+        except Exception:
+            paragraph = ""
+        return self._store_paragraph(cache_key, paragraph, candidate_info, job_title)
+    
+    def _cached_paragraph(self, candidate_info, job_title, email_tone):
+        """(cache key, cached paragraph or None)"""
+        cache_key = (
+            candidate_info['name'],
+            tuple(candidate_info.get('key_skills', [])),
+            tuple(candidate_info.get('strengths', [])),
+            job_title,
+            email_tone
+        )
+        with self._paragraph_cache_lock:
+            return cache_key, self._paragraph_cache.get(cache_key)
+    
+    @staticmethod
+    def _paragraph_prompt(candidate_info, job_title, email_tone):
+        return f"""
+        Write 2-3 sentences for an interview invitation email to {candidate_info['name']} for the {job_title} position.
+        Express genuine interest based on their key skills ({', '.join(candidate_info.get('key_skills', []))})
+        and strengths ({', '.join(candidate_info.get('strengths', []))}).
         
-        subject_response = self.llm.invoke(subject_prompt)
-        email_subject = subject_response.content.strip()
+        Tone should be: {email_tone}
         
-        return {
-            "subject": email_subject,
-            "body": email_body
-        }
+        Do not include a greeting, interview logistics or a signature. Return only the paragraph.
+        """
+    
+    def _store_paragraph(self, cache_key, paragraph, candidate_info, job_title):
+        if not paragraph:
+            # Never block an invitation on the personalization step
+            return offline_personalized_paragraph(candidate_info, job_title)
+        
+        with self._paragraph_cache_lock:
+            self._paragraph_cache[cache_key] = paragraph
+        return paragraph
     
-    def generate_rejection_email(self, candidate_info, job_description, reason=None, feedback=True):
+    @traced("email_generation", kind="rejection")
+    def generate_rejection_email(self, candidate_info, job_description, reason=None, feedback=True, mode=None):
         """Generate a professional rejection email with optional feedback"""
-        # Truncate the job description
-        job_desc_truncated = job_description[:300] + "..." if len(job_description) > 300 else job_description
+        # Rejections have no candidate-specific logistics, so both template modes skip the LLM
+        if (mode or self.email_mode) != EMAIL_MODE_LLM:
+            return render_rejection_email(candidate_info, _job_title(job_description), feedback=feedback)
+        
+        email_prompt, fallback_subject = self._rejection_email_prompt(candidate_info, job_description, reason, feedback)
+        response = select_llm(self.router, self.llm, "rejection_email").invoke(email_prompt)
+        return _parse_email_response(response.content, fallback_subject)
+    
+    @staticmethod
+    def _rejection_email_prompt(candidate_info, job_description, reason, feedback):
+        """The rejection email prompt and the subject used when the response has none"""
+        job_digest = job_description_digest(job_description)
         
         # Create condition text for feedback section
         feedback_instruction = "3. Provide constructive feedback based on their strengths and weaknesses" if feedback else ""
         
         # Create condition text for reason
         reason_text = f"REJECTION REASON: {reason}" if reason else ""
+        job_title = _job_title(job_description)
         
         email_prompt = f"""
         Create a professional, respectful rejection email for a job candidate with the following details:
@@ -89,7 +220,7 @@ class CommunicationAgent:
         - Name: {candidate_info['name']}
         
         JOB DETAILS:
-        {job_desc_truncated}
+        {job_digest}
         
         {reason_text}
         
@@ -100,35 +231,113 @@ class CommunicationAgent:
         4. Wish them well in their job search
         5. Leave the door open for future opportunities if appropriate
         
-        IMPORTANT: Write only the email body, no subject line.
+        Also write a respectful subject line for the position ({job_title}) that doesn't explicitly mention rejection.
+        
+        Return ONLY a JSON object with two fields:
+        - subject: The subject line
+        - body: The email body
         """
+        return email_prompt, f"Your application for {job_title}"
+    
+    @traced("email_generation_batch", kind="rejection")
+    def generate_rejection_emails_batch(self, candidates_info, job_description, reasons=None, feedback=True, mode=None):
+        """Draft rejection emails for many candidates with one request per batch.
         
-        response = self.llm.invoke(email_prompt)
-        email_body = response.content
+        Returns a list of {"subject", "body"} dicts aligned with ``candidates_info``.
+        Candidates missing from a batched response are drafted individually.
+        """
+        if (mode or self.email_mode) != EMAIL_MODE_LLM:
+            job_title = _job_title(job_description)
+            return [render_rejection_email(candidate_info, job_title, feedback=feedback)
+                    for candidate_info in candidates_info]
+        
+        reasons = reasons or [None] * len(candidates_info)
+        emails = [None] * len(candidates_info)
+        
+        for batch_indices in _rejection_batches(len(candidates_info)):
+            batch_emails = self._draft_rejection_batch(
+                [candidates_info[index] for index in batch_indices],
+                job_description,
+                [reasons[index] for index in batch_indices],
+                feedback
+            )
+            
+            for position, index in enumerate(batch_indices):
+                emails[index] = batch_emails.get(position) or self.generate_rejection_email(
+                    candidates_info[index], job_description, reasons[index], feedback
+                )
         
-        # Generate subject line
-        job_title = job_description.split('\n')[0] if '\n' in job_description else 'the open position'
+        return emails
+    
+    def _draft_rejection_batch(self, candidates_info, job_description, reasons, feedback):
+        """Request rejection emails for a batch of candidates and return them keyed by batch position"""
+        email_prompt = self._rejection_batch_prompt(candidates_info, job_description, reasons, feedback)
+        try:
+            response = select_llm(self.router, self.llm, "rejection_email").invoke(email_prompt)
+            entries = parse_response(response.content, validate_list, kind="rejection_batch")
+        except Exception:
+            return {}
+        return _batch_emails(entries, len(candidates_info), _job_title(job_description))
+    
+    @staticmethod
+    def _rejection_batch_prompt(candidates_info, job_description, reasons, feedback):
+        job_digest = job_description_digest(job_description)
+        job_title = _job_title(job_description)
         
-        subject_prompt = f"""
-        Create a respectful subject line for a job application rejection email that doesn't explicitly mention rejection in the subject.
-        Position: {job_title}
+        feedback_instruction = "3. Provide constructive feedback based on their strengths and weaknesses" if feedback else ""
         
-        Return only the subject line, nothing else.
-        """
+        candidate_lines = []
+        for position, (candidate_info, reason) in enumerate(zip(candidates_info, reasons)):
+            details = [f"Name: {candidate_info['name']}"]
+            if feedback and candidate_info.get('strengths'):
+                details.append(f"Strengths: {', '.join(candidate_info['strengths'])}")
+            if feedback and candidate_info.get('weaknesses'):
+                details.append(f"Weaknesses: {', '.join(candidate_info['weaknesses'])}")
+            if reason:
+                details.append(f"Rejection reason: {reason}")
+            candidate_lines.append(f"{position}. " + "; ".join(details))
+        candidates_block = "\n        ".join(candidate_lines)
         
-        subject_response = self.llm.invoke(subject_prompt)
-        email_subject = subject_response.content.strip()
+        return f"""
+        Create a professional, respectful rejection email for each of the following job candidates.
         
-        return {
-            "subject": email_subject,
-            "body": email_body
-        }
+        CANDIDATES:
+        {candidates_block}
+        
+        JOB DETAILS:
+        {job_digest}
+        
+        Each email should:
+        1. Be kind but clear about the decision
+        2. Thank the candidate for their time and interest
+        {feedback_instruction}
+        4. Wish them well in their job search
+        5. Leave the door open for future opportunities if appropriate
+        
+        Each email needs a respectful subject line for the position ({job_title}) that doesn't explicitly mention rejection.
+        
+        Return ONLY a JSON array with one object per candidate, each with these fields:
+        - candidate_index: The number of the candidate the email is for
+        - subject: The subject line
+        - body: The email body
+        """
     
-    def send_email(self, to_email, subject, html_content, from_email=None, sender_name=None):
-        """Send an email using Gmail SMTP"""
+    def create_delivery_engine(self):
+        """Create an SMTP delivery engine that reuses one connection for a batch of emails"""
         if not self.gmail_email or not self.gmail_password:
             raise Exception("Gmail credentials not provided. Please provide valid email and app password.")
         
+        return SMTPDeliveryEngine(
+            username=self.gmail_email,
+            password=self.gmail_password,
+            host=self.smtp_host,
+            port=self.smtp_port,
+            use_ssl=self.smtp_use_ssl,
+            messages_per_minute=self.messages_per_minute
+        )
+    
+    def build_message(self, to_email, subject, html_content, sender_name=None):
+        """Build the MIME message for an email and return it as a string"""
         from_email = self.gmail_email
         
         # Create message container
@@ -144,23 +353,131 @@ class CommunicationAgent:
         part = MIMEText(html_content_formatted, 'html')
         msg.attach(part)
         
+        return msg.as_string()
+    
+    def send_email(self, to_email, subject, html_content, from_email=None, sender_name=None):
+        """Send an email using Gmail SMTP"""
+        result = self.send_emails([{
+            "to_email": to_email,
+            "subject": subject,
+            "html_content": html_content,
+            "sender_name": sender_name
+        }])[0]
+        
+        return {
+            "status_code": result["status_code"],
+            "success": result["success"],
+            "message": result["message"]
+        }
+    
+    @traced("email_delivery")
+    def send_emails(self, emails):
+        """Send several emails over a single SMTP connection.
+        
+        Each email is a dict with ``to_email``, ``subject``, ``html_content`` and an
+        optional ``sender_name``. Returns one result dict per email, in order.
+        """
+        engine = self.create_delivery_engine()
+        
+        with engine:
+            return engine.send_batch(
+                (self.gmail_email,
+                 email["to_email"],
+                 self.build_message(email["to_email"], email["subject"], email["html_content"], email.get("sender_name")))
+                for email in emails
+            )
+    
+    @traced("outbox_enqueue")
+    def enqueue_email(self, to_email, subject, html_content, sender_name=None, candidate_name=None,
+                      metadata=None, kind="interview"):
+        """Queue an email in the durable outbox for background delivery.
+        
+        Returns (message_id, newly_queued); an email of the same kind already queued or
+        sent to this address is not queued again. The message is delivered from this
+        agent's Gmail account only.
+        """
+        if self.outbox is None:
+            raise Exception("No outbox configured for queued email delivery.")
+        
+        return self.outbox.enqueue(
+            to_email=to_email,
+            subject=subject,
+            body=html_content,
+            sender_name=sender_name,
+            candidate_name=candidate_name,
+            metadata=metadata,
+            kind=kind,
+            sender_account=self.gmail_email
+        )
+    
+    # Coroutine variants; they await the client directly and share its rate limits and adaptive concurrency
+    
+    @traced("email_generation", kind="interview")
+    async def agenerate_interview_email(self, candidate_info, job_description, interview_details,
+                                        email_tone="Professional", mode=None):
+        mode = mode or self.email_mode
+        if mode != EMAIL_MODE_LLM:
+            job_title = _job_title(job_description)
+            if mode == EMAIL_MODE_OFFLINE:
+                paragraph = offline_personalized_paragraph(candidate_info, job_title)
+            else:
+                paragraph = await self.agenerate_personalized_paragraph(candidate_info, job_title, email_tone)
+            return render_interview_email(candidate_info, job_title, interview_details, paragraph)
+        
+        email_prompt, fallback_subject = self._interview_email_prompt(candidate_info, job_description,
+                                                                      interview_details, email_tone)
+        response = await ainvoke_llm(select_llm(self.router, self.llm, "interview_email"), email_prompt)
+        return _parse_email_response(response.content, fallback_subject)
+    
+    async def agenerate_personalized_paragraph(self, candidate_info, job_title, email_tone="Professional"):
+        cache_key, paragraph = self._cached_paragraph(candidate_info, job_title, email_tone)
+        if paragraph is not None:
+            return paragraph
         try:
-            # Connect to Gmail SMTP server
-            server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-            server.login(self.gmail_email, self.gmail_password)
-            
-            # Send email
-            server.sendmail(from_email, to_email, msg.as_string())
-            server.quit()
-            
-            return {
-                "status_code": 200,
-                "success": True,
-                "message": "Email sent successfully"
-            }
-        except Exception as e:
-            return {
-                "status_code": 500,
-                "success": False,
-                "message": f"Error sending email: {str(e)}"
-            }
\ No newline at end of file
+            prompt = self._paragraph_prompt(candidate_info, job_title, email_tone)
+            paragraph = (await ainvoke_llm(select_llm(self.router, self.llm, "personalization"), prompt)).content.strip()
+        except Exception:
+            paragraph = ""
+        return self._store_paragraph(cache_key, paragraph, candidate_info, job_title)
+    
+    @traced("email_generation", kind="rejection")
+    async def agenerate_rejection_email(self, candidate_info, job_description, reason=None, feedback=True, mode=None):
+        if (mode or self.email_mode) != EMAIL_MODE_LLM:
+            return render_rejection_email(candidate_info, _job_title(job_description), feedback=feedback)
+        
+        email_prompt, fallback_subject = self._rejection_email_prompt(candidate_info, job_description, reason, feedback)
+        response = await ainvoke_llm(select_llm(self.router, self.llm, "rejection_email"), email_prompt)
+        return _parse_email_response(response.content, fallback_subject)
+    
+    @traced("email_generation_batch", kind="rejection")
+    async def agenerate_rejection_emails_batch(self, candidates_info, job_description, reasons=None, feedback=True,
+                                               mode=None):
+        """Like ``generate_rejection_emails_batch``, with every batch in flight at once"""
+        if (mode or self.email_mode) != EMAIL_MODE_LLM:
+            job_title = _job_title(job_description)
+            return [render_rejection_email(candidate_info, job_title, feedback=feedback)
+                    for candidate_info in candidates_info]
+        
+        reasons = reasons or [None] * len(candidates_info)
+        
+        async def draft(batch_indices):
+            batch_candidates = [candidates_info[index] for index in batch_indices]
+            email_prompt = self._rejection_batch_prompt(batch_candidates, job_description,
+                                                        [reasons[index] for index in batch_indices], feedback)
+            try:
+                response = await ainvoke_llm(select_llm(self.router, self.llm, "rejection_email"), email_prompt)
+                entries = parse_response(response.content, validate_list, kind="rejection_batch")
+            except Exception:
+                entries = []
+            batch_emails = _batch_emails(entries, len(batch_indices), _job_title(job_description))
+            emails = [batch_emails.get(position) for position in range(len(batch_indices))]
+            missing = [batch_indices[position] for position, email in enumerate(emails) if email is None]
+            fallbacks = iter(await asyncio.gather(*(
+                self.agenerate_rejection_email(candidates_info[index], job_description, reasons[index], feedback)
+                for index in missing
+            )))
+            return [email or next(fallbacks) for email in emails]
+        
+        batches = _rejection_batches(len(candidates_info))
+        drafted = await asyncio.gather(*(draft(batch_indices) for batch_indices in batches))
+        return [email for batch_emails in drafted for email in batch_emails]
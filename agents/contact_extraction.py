@@ -0,0 +1,165 @@
+# contact_extraction.py
+import re
+from itertools import islice
+
+import pandas as pd
+
+from agents.text_compaction import heading_section, is_boilerplate
+
+# Compiled once; every lookup stops after a handful of matches instead of scanning for all of them
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+# Catches most US/international phone formats
+PHONE_PATTERN = re.compile(r"(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}")
+URL_PATTERN = re.compile(
+    r"(?:https?://|www\.)[^\s<>()\"']+|(?<![\w.@])(?:[a-z]{2,3}\.)?(?:linkedin\.com|github\.com)/[^\s<>()\"',;|]+",
+    re.IGNORECASE
+)
+
+# Matches kept per field and record
+MAX_MATCHES_PER_FIELD = 5
+# Contact details sit in a resume's header or footer; only these many leading and trailing
+# characters are scanned for match lists, with a whole-text search when they hold nothing
+CONTACT_SCAN_CHARS = 3000
+# Names are looked for on the first lines of the resume only
+NAME_SCAN_LINES = 8
+MAX_NAME_WORDS = 4
+# Separators between a name and a headline or contact details on the same line
+NAME_SEPARATOR_PATTERN = re.compile(r"\s*[|,–—•·]\s*|\s+-\s+")
+# Words that mark a job title or an organisation rather than a person's name
+NON_NAME_WORDS = frozenset({
+    "engineer", "developer", "manager", "analyst", "designer", "consultant", "specialist", "director",
+    "intern", "scientist", "architect", "lead", "officer", "administrator", "assistant", "coordinator",
+    "senior", "junior", "principal", "head", "programmer", "technician", "accountant", "executive",
+    "inc", "corp", "llc", "ltd", "gmbh", "company", "university", "college", "institute", "school"
+})
+UNKNOWN_NAME = "Unknown Candidate"
+
+CONTACT_FIELDS = ["name", "email", "phone", "linkedin", "github", "emails", "phones", "urls", "name_candidates"]
+
+
+def _first_matches(pattern, text, limit=MAX_MATCHES_PER_FIELD):
+    """Up to ``limit`` distinct matches in document order, without scanning the rest of the text"""
+    matches = []
+    seen = set()
+    for match in pattern.finditer(text):
+        value = match.group().rstrip(".,;:")
+        if value.lower() not in seen:
+            seen.add(value.lower())
+            matches.append(value)
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def _iter_lines(text):
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def leading_lines(text, count=NAME_SCAN_LINES):
+    """The first ``count`` lines of text, without splitting the whole document"""
+    return list(islice(_iter_lines(text), count))
+
+
+def first_email(text):
+    match = EMAIL_PATTERN.search(text or "")
+    return match.group() if match else None
+
+
+def first_phone(text):
+    match = PHONE_PATTERN.search(text or "")
+    return match.group() if match else None
+
+
+def _looks_like_name(segment):
+    words = segment.split()
+    return (
+        0 < len(words) <= MAX_NAME_WORDS
+        and segment[0].isalpha()
+        and any(char.isupper() for char in segment)
+        and not any(char.isdigit() for char in segment)
+        and "@" not in segment and "://" not in segment
+        and heading_section(segment) is None
+        and not is_boilerplate(segment)
+        and not NON_NAME_WORDS.intersection(word.strip(".()").lower() for word in words)
+    )
+
+
+def name_candidates(text):
+    """Name-like parts of the first lines of the resume, most likely first.
+
+    Lines are split on separators ("Jane Doe | Senior Engineer"), and section
+    headings, boilerplate such as "CURRICULUM VITAE", job titles and company
+    names are skipped. Parts on or next to the line holding the email or phone
+    number come first, the rest follow in document order.
+    """
+    lines = [line.strip() for line in leading_lines(text or "")]
+    contact_rows = [row for row, line in enumerate(lines) if EMAIL_PATTERN.search(line) or PHONE_PATTERN.search(line)]
+    ranked = []
+    seen = set()
+    for row, line in enumerate(lines):
+        near_contact = any(abs(row - contact_row) <= 1 for contact_row in contact_rows)
+        for segment in NAME_SEPARATOR_PATTERN.split(line):
+            if _looks_like_name(segment) and segment.lower() not in seen:
+                seen.add(segment.lower())
+                ranked.append((not near_contact, len(ranked), segment))
+    return [segment for _, _, segment in sorted(ranked)]
+
+
+def name_from_filename(fallback_filename):
+    return fallback_filename.split(".")[0].replace("_", " ").title() if fallback_filename else None
+
+
+def contact_region(text):
+    """Header and footer of the text, where contact details are expected"""
+    if len(text) <= 2 * CONTACT_SCAN_CHARS:
+        return text
+    return text[:CONTACT_SCAN_CHARS] + "\n" + text[-CONTACT_SCAN_CHARS:]
+
+
+def extract_contact_fields(text, fallback_filename=""):
+    """Contact record for one resume: first name/email/phone/LinkedIn/GitHub plus every candidate found"""
+    text = text if isinstance(text, str) else ""
+    region = contact_region(text)
+    emails = _first_matches(EMAIL_PATTERN, region)
+    phones = _first_matches(PHONE_PATTERN, region)
+    urls = _first_matches(URL_PATTERN, region)
+    if region is not text:
+        # Nothing in the header or footer: settle for the first match anywhere
+        emails = emails or [value for value in [first_email(text)] if value]
+        phones = phones or [value for value in [first_phone(text)] if value]
+    names = name_candidates(text)
+    return {
+        "name": names[0] if names else (name_from_filename(fallback_filename) or UNKNOWN_NAME),
+        "email": emails[0] if emails else None,
+        "phone": phones[0] if phones else None,
+        "linkedin": next((url for url in urls if "linkedin.com" in url.lower()), None),
+        "github": next((url for url in urls if "github.com" in url.lower()), None),
+        "emails": emails,
+        "phones": phones,
+        "urls": urls,
+        "name_candidates": names
+    }
+
+
+def extract_contacts_batch(texts, fallback_filenames=None):
+    """Contact records for many resumes at once.
+
+    ``texts`` may be a list or a pandas Series. A list gives a list of dicts;
+    a Series gives a DataFrame with the same index and one column per field.
+    """
+    is_series = isinstance(texts, pd.Series)
+    values = texts.tolist() if is_series else list(texts)
+    fallback_filenames = list(fallback_filenames) if fallback_filenames is not None else [""] * len(values)
+
+    records = [extract_contact_fields(text, fallback_filename)
+               for text, fallback_filename in zip(values, fallback_filenames)]
+    if is_series:
+        return pd.DataFrame(records, index=texts.index, columns=CONTACT_FIELDS)
+    return records
@@ -0,0 +1,167 @@
+# email_delivery.py
+import time
+import smtplib
+import threading
+
+from agents.instrumentation import telemetry
+
+DEFAULT_SMTP_HOST = "smtp.gmail.com"
+DEFAULT_SMTP_PORT = 465
+
+# Errors after which the connection is re-established and the message retried
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPDeliveryEngine:
+    """Sends batches of messages over one authenticated SMTP connection.
+
+    The connection is opened lazily, reused for every message, re-established
+    if the server drops it, and sends are spaced out to respect an optional
+    messages-per-minute limit. Use it as a context manager so the connection
+    is closed when the batch is done.
+    """
+
+    def __init__(self, username=None, password=None, host=DEFAULT_SMTP_HOST, port=DEFAULT_SMTP_PORT,
+                 use_ssl=True, starttls=False, messages_per_minute=None, timeout=30, max_reconnects=2):
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.starttls = starttls
+        self.messages_per_minute = messages_per_minute
+        self.timeout = timeout
+        self.max_reconnects = max_reconnects
+
+        self._server = None
+        self._last_send_time = None
+        self._auth_error = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        """Open and authenticate the SMTP connection if it is not already open"""
+        if self._server is not None:
+            return
+
+        with telemetry.span("smtp_connect", host=self.host):
+            self._server = self._open_connection()
+
+    def _open_connection(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                server.starttls()
+
+        try:
+            # Local test servers often do not offer AUTH at all
+            server.ehlo_or_helo_if_needed()
+            if self.username and self.password and server.has_extn("auth"):
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+
+        return server
+
+    def close(self):
+        """Close the SMTP connection, ignoring errors from an already dropped connection"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        finally:
+            self._server = None
+
+    def _wait_for_rate_limit(self):
+        """Sleep long enough to keep sends under the messages-per-minute limit"""
+        if not self.messages_per_minute or self._last_send_time is None:
+            return
+        min_interval = 60.0 / self.messages_per_minute
+        elapsed = time.monotonic() - self._last_send_time
+        if elapsed < min_interval:
+            time.sleep(min_interval - elapsed)
+
+    def send_message(self, from_email, to_email, message_string):
+        """Send one message, reconnecting if the server dropped the connection"""
+        start = time.perf_counter()
+        result = self._send_message(from_email, to_email, message_string)
+        # Includes waiting for the rate limit and any reconnects
+        telemetry.record("smtp_send", time.perf_counter() - start, error=not result["success"],
+                         status_code=result["status_code"])
+        return result
+
+    def _send_message(self, from_email, to_email, message_string):
+        with self._lock:
+            # Bad credentials will not fix themselves; fail fast instead of logging in again
+            if self._auth_error is not None:
+                return {
+                    "recipient": to_email,
+                    "status_code": 401,
+                    "success": False,
+                    "message": f"Error sending email: {self._auth_error}"
+                }
+
+            self._wait_for_rate_limit()
+            attempts = 0
+
+            while True:
+                try:
+                    self.connect()
+                    self._server.sendmail(from_email, to_email, message_string)
+                    self._last_send_time = time.monotonic()
+                    return {
+                        "recipient": to_email,
+                        "status_code": 200,
+                        "success": True,
+                        "message": "Email sent successfully"
+                    }
+                except _RECONNECT_ERRORS as e:
+                    # Throw away the broken connection; the next attempt opens a new one
+                    self._server = None
+                    attempts += 1
+                    telemetry.increment("retries", kind="smtp_reconnect")
+                    if attempts > self.max_reconnects:
+                        return {
+                            "recipient": to_email,
+                            "status_code": 503,
+                            "success": False,
+                            "message": f"Error sending email: connection lost ({str(e)})"
+                        }
+                except smtplib.SMTPAuthenticationError as e:
+                    self._auth_error = f"authentication failed ({str(e)})"
+                    return {
+                        "recipient": to_email,
+                        "status_code": 401,
+                        "success": False,
+                        "message": f"Error sending email: {self._auth_error}"
+                    }
+                except smtplib.SMTPRecipientsRefused as e:
+                    self._last_send_time = time.monotonic()
+                    return {
+                        "recipient": to_email,
+                        "status_code": 550,
+                        "success": False,
+                        "message": f"Error sending email: recipient refused ({str(e)})"
+                    }
+                except Exception as e:
+                    return {
+                        "recipient": to_email,
+                        "status_code": 500,
+                        "success": False,
+                        "message": f"Error sending email: {str(e)}"
+                    }
+
+    def send_batch(self, messages):
+        """Send (from_email, to_email, message_string) tuples and return one result per recipient"""
+        return [self.send_message(from_email, to_email, message_string)
+                for from_email, to_email, message_string in messages]
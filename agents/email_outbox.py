@@ -0,0 +1,363 @@
+# email_outbox.py
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from agents.hr_repository import DEFAULT_DATABASE_PATH
+from agents.instrumentation import telemetry
+
+# The outbox table lives in the main application database
+DEFAULT_OUTBOX_PATH = DEFAULT_DATABASE_PATH
+
+# Result codes that will not succeed on retry (e.g. the recipient was refused)
+PERMANENT_FAILURE_CODES = {550}
+
+logger = logging.getLogger(__name__)
+
+
+def idempotency_key_for(kind, to_email):
+    """Default idempotency key: one email of each kind per recipient"""
+    return f"{kind}:{to_email.strip().lower()}"
+
+
+def sender_account_key(email_address):
+    """Normalized sender account an outbox row is delivered from"""
+    return (email_address or "").strip().lower() or None
+
+
+class EmailOutbox:
+    """Durable queue of outbound emails stored in SQLite.
+
+    Each message has an idempotency key (by default one per kind of email and
+    recipient), so enqueueing the same invitation twice never sends it twice.
+    Status moves from ``queued`` to ``sending`` to ``sent`` or ``failed``.
+    Each message also records the sender account it must be delivered from.
+    """
+
+    def __init__(self, path=DEFAULT_OUTBOX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                to_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                sender_name TEXT,
+                candidate_name TEXT,
+                metadata TEXT,
+                sender_account TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                sent_at TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_sent ON outbox (sent_at)")
+        # Outboxes created before messages recorded their sender account
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "sender_account" not in columns:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN sender_account TEXT")
+
+        # Messages claimed by a worker that died mid-send go back to the queue
+        self._conn.execute("UPDATE outbox SET status = 'queued' WHERE status = 'sending'")
+        self._conn.commit()
+
+    def enqueue(self, to_email, subject, body, sender_name=None, candidate_name=None,
+                metadata=None, kind="interview", idempotency_key=None, sender_account=None):
+        """Queue an email for delivery and return (message_id, newly_queued).
+
+        An email whose idempotency key was already queued or sent is left alone;
+        one that previously failed is replaced with the new content and retried.
+        Only a worker holding ``sender_account``'s credentials delivers it.
+        """
+        idempotency_key = idempotency_key or idempotency_key_for(kind, to_email)
+        sender_account = sender_account_key(sender_account)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+
+            if row is not None and row["status"] != "failed":
+                return row["id"], False
+
+            if row is not None:
+                self._conn.execute(
+                    """UPDATE outbox SET to_email = ?, subject = ?, body = ?, sender_name = ?, candidate_name = ?,
+                       metadata = ?, sender_account = ?, status = 'queued', attempts = 0, next_attempt_at = ?,
+                       last_error = NULL WHERE id = ?""",
+                    (to_email, subject, body, sender_name, candidate_name, json.dumps(metadata or {}), sender_account,
+                     now, row["id"])
+                )
+                self._conn.commit()
+                return row["id"], True
+
+            cursor = self._conn.execute(
+                """INSERT INTO outbox (idempotency_key, to_email, subject, body, sender_name, candidate_name,
+                   metadata, sender_account, next_attempt_at, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (idempotency_key, to_email, subject, body, sender_name, candidate_name,
+                 json.dumps(metadata or {}), sender_account, now, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            self._conn.commit()
+            return cursor.lastrowid, True
+
+    def is_active(self, to_email, kind="interview"):
+        """Whether an email of this kind to this address is already queued, sending or sent"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM outbox WHERE idempotency_key = ?", (idempotency_key_for(kind, to_email),)
+            ).fetchone()
+        return row is not None and row["status"] != "failed"
+
+    def claim_due(self, limit=20, sender_accounts=None):
+        """Mark up to ``limit`` queued messages whose retry time has come as sending and return them.
+
+        With ``sender_accounts``, only messages from those accounts are claimed.
+        Messages queued before messages recorded their account are never
+        claimed that way; they wait for ``assign_sender``.
+        """
+        query = "SELECT * FROM outbox WHERE status = 'queued' AND next_attempt_at <= ?"
+        params = [time.time()]
+        if sender_accounts is not None:
+            sender_accounts = list(sender_accounts)
+            query += f" AND sender_account IN ({', '.join('?' * len(sender_accounts))})"
+            params += sender_accounts
+        query += " ORDER BY next_attempt_at LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            if rows:
+                self._conn.executemany(
+                    "UPDATE outbox SET status = 'sending', attempts = attempts + 1 WHERE id = ?",
+                    [(row["id"],) for row in rows]
+                )
+                self._conn.commit()
+            return [self._row_to_dict(row, attempts_offset=1) for row in rows]
+
+    def unassigned_count(self):
+        """Queued messages without a sender account, left over from before messages recorded one"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = 'queued' AND sender_account IS NULL"
+            ).fetchone()[0]
+
+    def assign_sender(self, sender_account):
+        """Deliver every queued message without a sender account from ``sender_account``; returns how many"""
+        sender_account = sender_account_key(sender_account)
+        if sender_account is None:
+            raise Exception("Cannot assign messages to a sender without an email address.")
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET sender_account = ? WHERE status = 'queued' AND sender_account IS NULL",
+                (sender_account,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def mark_sent(self, message_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', last_error = NULL, sent_at = ? WHERE id = ?",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), message_id)
+            )
+            self._conn.commit()
+
+    def mark_retry(self, message_id, error, delay_seconds):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'queued', last_error = ?, next_attempt_at = ? WHERE id = ?",
+                (error, time.time() + delay_seconds, message_id)
+            )
+            self._conn.commit()
+
+    def mark_failed(self, message_id, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?",
+                (error, message_id)
+            )
+            self._conn.commit()
+
+    def list_messages(self, status=None, kind=None):
+        """Return outbox messages (newest first), optionally filtered by status or kind"""
+        query = "SELECT * FROM outbox"
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if kind:
+            conditions.append("idempotency_key LIKE ?")
+            params.append(f"{kind}:%")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def get_message(self, message_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM outbox WHERE id = ?", (message_id,)).fetchone()
+        return self._row_to_dict(row) if row is not None else None
+
+    def sent_recipients(self, kind=None):
+        """Return the set of addresses with a successfully delivered email"""
+        return {message["to_email"] for message in self.list_messages(status="sent", kind=kind)}
+
+    def sent_recipients_since(self, since=None, kind=None):
+        """Addresses with an email delivered at or after ``since`` (a previous high-water mark; None for all).
+
+        Returns (addresses, new high-water mark). Only the address column is
+        read, and the mark is inclusive, so emails sent within the same second
+        as the previous mark are never missed.
+        """
+        query = "SELECT to_email, sent_at FROM outbox WHERE status = 'sent'"
+        params = []
+        if since is not None:
+            query += " AND sent_at >= ?"
+            params.append(since)
+        if kind:
+            query += " AND idempotency_key LIKE ?"
+            params.append(f"{kind}:%")
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return {row["to_email"] for row in rows}, max((row["sent_at"] for row in rows), default=since)
+
+    def active_recipients(self, kind=None):
+        """Return the set of addresses with an email that is queued, sending or sent"""
+        return {message["to_email"] for message in self.list_messages(kind=kind) if message["status"] != "failed"}
+
+    def status_counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def _row_to_dict(row, attempts_offset=0):
+        message = dict(row)
+        message["metadata"] = json.loads(message["metadata"] or "{}")
+        message["attempts"] += attempts_offset
+        return message
+
+
+class OutboxWorker(threading.Thread):
+    """Background thread that drains the outbox through CommunicationAgents.
+
+    Each sender account registers its own agent (and credentials), and every
+    message is delivered by the agent of the account that queued it, so one
+    recruiter's mail never goes out from another recruiter's account. Messages
+    whose account has no agent yet stay queued. Failed sends are retried with
+    jittered exponential backoff until ``max_attempts`` is reached.
+    """
+
+    def __init__(self, outbox, communication_agent=None, poll_interval=2.0, batch_size=20,
+                 max_attempts=5, base_delay=30.0, max_delay=3600.0):
+        super().__init__(name="email-outbox-worker", daemon=True)
+        self.outbox = outbox
+        # Sender account -> CommunicationAgent holding its credentials
+        self._senders = {}
+        self._senders_lock = threading.Lock()
+        if communication_agent is not None:
+            self.register_sender(communication_agent)
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def register_sender(self, communication_agent):
+        """Deliver the sender account's messages through this agent (replacing its previous one)"""
+        sender_account = sender_account_key(communication_agent.gmail_email)
+        if sender_account is None:
+            raise Exception("Cannot register a sender without an email address.")
+        with self._senders_lock:
+            self._senders[sender_account] = communication_agent
+
+    def senders(self):
+        with self._senders_lock:
+            return dict(self._senders)
+
+    def retry_delay(self, attempts):
+        """Exponential backoff with jitter for the given number of attempts so far"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                processed = self.drain_once()
+            except Exception:
+                # Keep the worker alive; messages left in 'sending' are requeued when the outbox is next opened
+                logger.exception("Email outbox worker failed to process a batch")
+                telemetry.increment("outbox_errors")
+                processed = 0
+            if not processed:
+                self._stop_event.wait(self.poll_interval)
+
+    def drain_once(self):
+        """Send one batch of due messages and return how many were processed"""
+        senders = self.senders()
+        if not senders:
+            return 0
+
+        messages = self.outbox.claim_due(self.batch_size, sender_accounts=senders)
+        if not messages:
+            return 0
+
+        # One SMTP session per sender account
+        by_sender = {}
+        for message in messages:
+            by_sender.setdefault(message["sender_account"], []).append(message)
+
+        for sender_account, sender_messages in by_sender.items():
+            self._deliver(senders[sender_account], sender_messages)
+        return len(messages)
+
+    def _deliver(self, communication_agent, messages):
+        try:
+            results = communication_agent.send_emails([
+                {
+                    "to_email": message["to_email"],
+                    "subject": message["subject"],
+                    "html_content": message["body"],
+                    "sender_name": message["sender_name"]
+                }
+                for message in messages
+            ])
+        except Exception as e:
+            results = [{"status_code": 500, "success": False, "message": str(e)}] * len(messages)
+
+        for message, result in zip(messages, results):
+            if result["success"]:
+                self.outbox.mark_sent(message["id"])
+            elif result.get("status_code") in PERMANENT_FAILURE_CODES or message["attempts"] >= self.max_attempts:
+                self.outbox.mark_failed(message["id"], result["message"])
+            else:
+                telemetry.increment("retries", kind="email_outbox")
+                self.outbox.mark_retry(message["id"], result["message"], self.retry_delay(message["attempts"]))
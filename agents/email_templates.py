@@ -0,0 +1,101 @@
+# email_templates.py
+from string import Template
+
+# Email rendering modes understood by CommunicationAgent
+EMAIL_MODE_LLM = "llm"
+EMAIL_MODE_TEMPLATE = "template"
+EMAIL_MODE_OFFLINE = "offline"
+EMAIL_MODES = (EMAIL_MODE_LLM, EMAIL_MODE_TEMPLATE, EMAIL_MODE_OFFLINE)
+
+# Templates are compiled once at import time and only substituted per email
+INTERVIEW_SUBJECT_TEMPLATE = Template("Interview Invitation: $job_title - $date")
+
+INTERVIEW_BODY_TEMPLATE = Template("""Dear $name,
+
+$personalized_paragraph
+
+We would like to invite you to interview for the $job_title position. Here are the details:
+
+- Date and time: $date
+- Format: $format
+- Location: $location
+- Interviewer: $interviewer
+$additional_details
+Please reply to this email to confirm your attendance, or let us know if you need to propose a different time.
+
+If you have any questions before the interview, simply reply to this email and we will be happy to help.
+
+Best regards,
+$interviewer""")
+
+REJECTION_SUBJECT_TEMPLATE = Template("Your application for $job_title")
+
+REJECTION_BODY_TEMPLATE = Template("""Dear $name,
+
+Thank you for your interest in the $job_title position and for the time you invested in applying.
+
+After careful consideration, we have decided to move forward with other candidates whose experience more closely matches the current requirements of the role.
+$feedback
+We appreciate your interest in joining us and encourage you to apply for future openings that match your background. We wish you every success in your job search.
+
+Best regards,
+$sender""")
+
+
+def offline_personalized_paragraph(candidate_info, job_title):
+    """Build the personalized paragraph from the candidate profile without calling an LLM"""
+    key_skills = [skill for skill in candidate_info.get('key_skills', []) if skill][:3]
+    strengths = [strength for strength in candidate_info.get('strengths', []) if strength][:2]
+
+    sentences = [f"Thank you for applying for the {job_title} position."]
+    if key_skills:
+        sentences.append(f"We were impressed by your experience with {_join_items(key_skills)}.")
+    if strengths:
+        sentences.append(f"Your profile particularly stood out in these areas: {_join_items(strengths).rstrip('.')}.")
+    return " ".join(sentences)
+
+
+def render_interview_email(candidate_info, job_title, interview_details, personalized_paragraph):
+    """Render an interview invitation from the fixed template and a personalized paragraph"""
+    additional_details = interview_details.get('additional_details', '')
+    values = {
+        "name": candidate_info['name'],
+        "job_title": job_title,
+        "date": interview_details['date'],
+        "format": interview_details['format'],
+        "location": interview_details['location'],
+        "interviewer": interview_details['interviewer'],
+        "additional_details": f"\n{additional_details}\n" if additional_details else "",
+        "personalized_paragraph": personalized_paragraph
+    }
+    return {
+        "subject": INTERVIEW_SUBJECT_TEMPLATE.safe_substitute(values),
+        "body": INTERVIEW_BODY_TEMPLATE.safe_substitute(values)
+    }
+
+
+def render_rejection_email(candidate_info, job_title, sender="The Hiring Team", feedback=True):
+    """Render a rejection email from the fixed template, with optional strengths-based feedback"""
+    feedback_text = ""
+    strengths = [strength for strength in candidate_info.get('strengths', []) if strength][:2]
+    if feedback and strengths:
+        feedback_text = f"\nWe particularly appreciated these aspects of your application: {_join_items(strengths).rstrip('.')}. We hope you continue to build on these strengths.\n"
+
+    values = {
+        "name": candidate_info['name'],
+        "job_title": job_title,
+        "feedback": feedback_text,
+        "sender": sender
+    }
+    return {
+        "subject": REJECTION_SUBJECT_TEMPLATE.safe_substitute(values),
+        "body": REJECTION_BODY_TEMPLATE.safe_substitute(values)
+    }
+
+
+def _join_items(items):
+    """Join items as natural language: 'a', 'a and b', 'a, b and c'"""
+    items = [str(item).strip() for item in items]
+    if len(items) <= 1:
+        return "".join(items)
+    return ", ".join(items[:-1]) + f" and {items[-1]}"
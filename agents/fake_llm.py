@@ -0,0 +1,121 @@
+# fake_llm.py
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+
+RECOMMENDATION_BY_SCORE = [(75, "Strong Hire"), (55, "Potential Hire"), (40, "Consider for Different Role"), (0, "Reject")]
+
+_SLOT_ID_PATTERN = re.compile(r'"id":\s*(\d+)')
+_RESUME_MARKER_PATTERN = re.compile(r"^\s*RESUME (\d+):", re.MULTILINE)
+_CANDIDATE_LINE_PATTERN = re.compile(r"^\s*(\d+)\. Name: ([^;\n]*)", re.MULTILINE)
+_EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+
+class FakeLLMError(Exception):
+    """Injected failure raised by FakeLLM"""
+
+
+class FakeResponse:
+    """Minimal stand-in for a chat model message"""
+
+    def __init__(self, content, usage_metadata=None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+def _stable_fraction(text):
+    """Deterministic number in [0, 1) derived from text"""
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+def _fake_analysis(resume_text):
+    score = 20 + int(_stable_fraction(resume_text) * 76)
+    recommendation = next(label for floor, label in RECOMMENDATION_BY_SCORE if score >= floor)
+    email = _EMAIL_PATTERN.search(resume_text)
+    first_line = next((line.strip() for line in resume_text.splitlines() if line.strip()), "Candidate")
+    return {
+        "name": first_line[:40],
+        "email": email.group() if email else "",
+        "skills_match_percentage": min(100, score + 5),
+        "experience_match_percentage": max(0, score - 5),
+        "overall_score": score,
+        "key_skills": ["Python", "SQL", "Communication"],
+        "strengths": ["Relevant experience", "Technical depth", "Clear communication"],
+        "weaknesses": ["Limited leadership", "Few certifications", "Short tenure"],
+        "recommendation": recommendation
+    }
+
+
+def canned_response(prompt):
+    """Plausible, deterministic reply for each kind of prompt the agents send"""
+    if "Analyze each of the following" in prompt:
+        parts = _RESUME_MARKER_PATTERN.split(prompt)
+        # split() yields [preamble, index, text, index, text, ...]
+        entries = [dict(_fake_analysis(text), resume_index=int(index)) for index, text in zip(parts[1::2], parts[2::2])]
+        return json.dumps(entries)
+    if "Analyze the following resume" in prompt:
+        return json.dumps(_fake_analysis(prompt.split("RESUME:", 1)[-1]))
+    if "could not be used" in prompt:
+        return json.dumps(_fake_analysis(prompt))
+    if "interview time slot" in prompt:
+        slot_id = _SLOT_ID_PATTERN.search(prompt)
+        return json.dumps({"slot_id": int(slot_id.group(1)) if slot_id else None, "reasoning": "Earliest available slot."})
+    if "for each of the following job candidates" in prompt:
+        return json.dumps([
+            {"candidate_index": int(index), "subject": "Your application", "body": f"Dear {name.strip()},\n\nThank you for applying."}
+            for index, name in _CANDIDATE_LINE_PATTERN.findall(prompt)
+        ])
+    if "interview invitation email" in prompt or "rejection email" in prompt:
+        return json.dumps({"subject": "Your application", "body": "Dear candidate,\n\nThank you for your interest."})
+    if "Write 2-3 sentences" in prompt:
+        return "Your experience stood out to us, and we would love to learn more about your work."
+    return "Generated text for: " + prompt.strip().splitlines()[0][:80] if prompt.strip() else "Generated text"
+
+
+class FakeLLM:
+    """Offline stand-in for ChatGoogleGenerativeAI, for tests and benchmarks without network access.
+
+    Replies come from ``responder(prompt)`` when given, else from ``responses``
+    in order (the last one repeats), else from ``canned_response``. ``latency``
+    is seconds per call (a number or a (min, max) range) and ``failure_rate``
+    the share of calls that raise FakeLLMError; both draw from a seeded random
+    generator, so runs are reproducible. Every prompt is recorded in ``prompts``.
+    """
+
+    def __init__(self, responses=None, responder=None, model_name="fake", latency=0, failure_rate=0.0, seed=0):
+        if isinstance(responses, str):
+            responses = [responses]
+        self.responses = list(responses or [])
+        self.responder = responder
+        self.model = model_name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.prompts = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            call_index = len(self.prompts)
+            self.prompts.append(prompt)
+            if isinstance(self.latency, (tuple, list)):
+                delay = self._random.uniform(*self.latency)
+            else:
+                delay = self.latency
+            fails = self._random.random() < self.failure_rate
+
+        if delay:
+            time.sleep(delay)
+        if fails:
+            raise FakeLLMError(f"Injected failure on call {call_index}")
+
+        if self.responder is not None:
+            content = self.responder(prompt)
+        elif self.responses:
+            content = self.responses[min(call_index, len(self.responses) - 1)]
+        else:
+            content = canned_response(prompt)
+        return FakeResponse(content)
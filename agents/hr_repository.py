@@ -0,0 +1,556 @@
+# hr_repository.py
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+DEFAULT_DATABASE_PATH = os.path.join(".hr_assistant", "hr_assistant.sqlite")
+
+# Candidate table columns and the database fields they are stored in
+CANDIDATE_FIELDS = {
+    "Name": "name",
+    "Email": "email",
+    "Skills Match (%)": "skills_match",
+    "Experience Match (%)": "experience_match",
+    "Overall Score": "overall_score",
+    "Key Skills": "key_skills",
+    "Strengths": "strengths",
+    "Weaknesses": "weaknesses",
+    "Recommendation": "recommendation",
+    "Status": "status",
+    "Automated Decision": "automated_decision",
+    "Email Sent": "email_sent",
+    "JD Version": "jd_version"
+}
+
+DEFAULT_PAGE_SIZE = 500
+
+# Interview slots are unique per date, time and interviewer, ignoring case and a missing interviewer
+SLOT_KEY_COLUMNS = "date, upper(time), lower(coalesce(interviewer, ''))"
+
+
+def content_hash(text):
+    """Stable hash used to deduplicate resumes and job descriptions"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class HRRepository:
+    """Persistent storage for job descriptions, resumes, analyses, candidates and interview slots.
+
+    Everything lives in one SQLite database in WAL mode, so several sessions
+    (and the background email worker, whose outbox table shares the file) can
+    read while another writes.
+    """
+
+    def __init__(self, path=DEFAULT_DATABASE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS job_descriptions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_hash TEXT NOT NULL UNIQUE,
+                text TEXT NOT NULL,
+                parent_hash TEXT,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS resumes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_hash TEXT NOT NULL UNIQUE,
+                file_name TEXT,
+                text TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS resume_signatures (
+                resume_hash TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS resume_vectors (
+                resume_hash TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS index_state (
+                name TEXT PRIMARY KEY,
+                value BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS resume_duplicates (
+                resume_hash TEXT PRIMARY KEY,
+                duplicate_of TEXT NOT NULL,
+                similarity REAL,
+                candidate_id INTEGER,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS analyses (
+                resume_hash TEXT NOT NULL,
+                job_description_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (resume_hash, job_description_hash)
+            );
+            CREATE TABLE IF NOT EXISTS candidates (
+                id INTEGER PRIMARY KEY,
+                resume_hash TEXT,
+                job_description_hash TEXT,
+                name TEXT,
+                email TEXT,
+                skills_match REAL,
+                experience_match REAL,
+                overall_score REAL,
+                key_skills TEXT,
+                strengths TEXT,
+                weaknesses TEXT,
+                recommendation TEXT,
+                status TEXT,
+                automated_decision TEXT,
+                email_sent INTEGER NOT NULL DEFAULT 0,
+                jd_version INTEGER,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_candidates_email ON candidates (email);
+            CREATE INDEX IF NOT EXISTS idx_candidates_resume ON candidates (resume_hash);
+            CREATE TABLE IF NOT EXISTS interview_slots (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                time TEXT NOT NULL,
+                interviewer TEXT,
+                interviewer_skills TEXT,
+                available INTEGER NOT NULL DEFAULT 1
+            );
+            """
+        )
+        # Databases created before slots had interviewers
+        slot_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(interview_slots)")}
+        if "interviewer" not in slot_columns:
+            self._conn.execute("ALTER TABLE interview_slots ADD COLUMN interviewer TEXT")
+        if "interviewer_skills" not in slot_columns:
+            self._conn.execute("ALTER TABLE interview_slots ADD COLUMN interviewer_skills TEXT")
+        # One slot per date, time and interviewer, so sessions adding the same slot cannot both insert it.
+        # Databases created before the constraint keep one copy of each duplicate, a booked one if there is one
+        if not self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_slots_unique'"
+        ).fetchone():
+            self._conn.execute(
+                f"""DELETE FROM interview_slots WHERE id NOT IN (
+                        SELECT id FROM (SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY {SLOT_KEY_COLUMNS} ORDER BY available, id) AS copy FROM interview_slots)
+                        WHERE copy = 1)"""
+            )
+            self._conn.execute(f"CREATE UNIQUE INDEX idx_slots_unique ON interview_slots ({SLOT_KEY_COLUMNS})")
+        # Databases created before job descriptions were versioned
+        job_description_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(job_descriptions)")}
+        if "parent_hash" not in job_description_columns:
+            self._conn.execute("ALTER TABLE job_descriptions ADD COLUMN parent_hash TEXT")
+        candidate_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(candidates)")}
+        if "jd_version" not in candidate_columns:
+            self._conn.execute("ALTER TABLE candidates ADD COLUMN jd_version INTEGER")
+        self._conn.commit()
+
+    # Job descriptions
+
+    def save_job_description(self, text, parent_hash=None):
+        """Store a job description (once per distinct text) and return its content hash.
+
+        ``parent_hash`` records the version it was edited from.
+        """
+        jd_hash = content_hash(text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO job_descriptions (content_hash, text, parent_hash, created_at) VALUES (?, ?, ?, ?)",
+                (jd_hash, text, parent_hash, _now())
+            )
+            self._conn.commit()
+        return jd_hash
+
+    def get_job_description(self, job_description_hash):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM job_descriptions WHERE content_hash = ?", (job_description_hash,)
+            ).fetchone()
+        return row["text"] if row else None
+
+    def job_description_version(self, job_description_hash):
+        """Version number of a stored job description (its row ID), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM job_descriptions WHERE content_hash = ?", (job_description_hash,)
+            ).fetchone()
+        return row["id"] if row else None
+
+    def scored_job_descriptions(self):
+        """[(content_hash, version, title, candidate count)] of the job descriptions that have candidates, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT job_descriptions.content_hash, job_descriptions.id, substr(job_descriptions.text, 1, 200) AS head,
+                          COUNT(candidates.id) AS candidate_count
+                   FROM job_descriptions JOIN candidates ON candidates.job_description_hash = job_descriptions.content_hash
+                   GROUP BY job_descriptions.content_hash ORDER BY job_descriptions.id DESC"""
+            ).fetchall()
+        return [(row["content_hash"], row["id"], row["head"].strip().split("\n")[0].strip("#* "), row["candidate_count"])
+                for row in rows]
+
+    def latest_job_description(self):
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM job_descriptions ORDER BY id DESC LIMIT 1").fetchone()
+        return row["text"] if row else None
+
+    # Resumes
+
+    def save_resumes(self, resumes):
+        """Bulk-store (file_name, text) pairs in one transaction and return their content hashes"""
+        rows = [(content_hash(text), file_name, text, _now()) for file_name, text in resumes]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO resumes (content_hash, file_name, text, created_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        return [row[0] for row in rows]
+
+    def count_resumes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+
+    def iter_resumes(self, page_size=DEFAULT_PAGE_SIZE):
+        """Yield stored resumes as dicts, reading one page at a time"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, content_hash, file_name, text FROM resumes WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]["id"]
+
+    def get_resumes(self, resume_hashes):
+        """{resume_hash: {"file_name", "text"}} for the stored resumes among the given hashes"""
+        resume_hashes = list(resume_hashes)
+        resumes = {}
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(resume_hashes), 500):
+            chunk = resume_hashes[start:start + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT content_hash, file_name, text FROM resumes WHERE content_hash IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+            resumes.update({row["content_hash"]: {"file_name": row["file_name"], "text": row["text"]} for row in rows})
+        return resumes
+
+    def iter_resumes_without_vectors(self, page_size=DEFAULT_PAGE_SIZE):
+        """Yield pages of (content_hash, text) for stored resumes not yet in the talent pool"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    """SELECT resumes.id, resumes.content_hash, resumes.text FROM resumes
+                       LEFT JOIN resume_vectors ON resume_vectors.resume_hash = resumes.content_hash
+                       WHERE resume_vectors.resume_hash IS NULL AND resumes.id > ? ORDER BY resumes.id LIMIT ?""",
+                    (last_id, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [(row["content_hash"], row["text"]) for row in rows]
+            last_id = rows[-1]["id"]
+
+    def save_resume_vectors(self, vectors):
+        """Bulk-store (resume_hash, vector_bytes) talent pool vectors"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO resume_vectors (resume_hash, vector) VALUES (?, ?)",
+                vectors
+            )
+            self._conn.commit()
+
+    def iter_resume_vectors(self, page_size=DEFAULT_PAGE_SIZE * 20):
+        """Yield pages of (resume_hash, vector_bytes), one page at a time"""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, resume_hash, vector FROM resume_vectors WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [(row["resume_hash"], row["vector"]) for row in rows]
+            last_rowid = rows[-1]["rowid"]
+
+    def save_index_state(self, name, value):
+        """Store a named blob of search index state (replacing any previous value)"""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO index_state (name, value) VALUES (?, ?)", (name, value))
+            self._conn.commit()
+
+    def load_index_state(self, name):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM index_state WHERE name = ?", (name,)).fetchone()
+        return bytes(row["value"]) if row else None
+
+    def save_resume_signatures(self, signatures):
+        """Bulk-store (resume_hash, signature_bytes) MinHash signatures used for near-duplicate detection"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO resume_signatures (resume_hash, signature) VALUES (?, ?)",
+                signatures
+            )
+            self._conn.commit()
+
+    def iter_resume_signatures(self, page_size=DEFAULT_PAGE_SIZE * 20):
+        """Yield (resume_hash, signature_bytes) pairs, reading one page at a time"""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, resume_hash, signature FROM resume_signatures WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["resume_hash"], row["signature"]
+            last_rowid = rows[-1]["rowid"]
+
+    def save_duplicate_links(self, links):
+        """Bulk-store (resume_hash, duplicate_of_hash, similarity, candidate_id) links between near-duplicate resumes"""
+        with self._lock:
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO resume_duplicates (resume_hash, duplicate_of, similarity, candidate_id, created_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [(*link, _now()) for link in links]
+            )
+            self._conn.commit()
+
+    def count_duplicate_links(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resume_duplicates").fetchone()[0]
+
+    # Analyses
+
+    def get_analysis(self, resume_text, job_description):
+        """Return the stored analysis for this resume and job description, or None"""
+        return self.get_analysis_by_hash(content_hash(resume_text), job_description)
+
+    def get_analysis_by_hash(self, resume_hash, job_description):
+        """Return the stored analysis for a resume content hash and job description, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM analyses WHERE resume_hash = ? AND job_description_hash = ?",
+                (resume_hash, content_hash(job_description))
+            ).fetchone()
+        return json.loads(row["result"]) if row else None
+
+    def save_analyses(self, analyses):
+        """Bulk-store (resume_text, job_description, analysis_dict) tuples in one transaction"""
+        rows = [
+            (content_hash(resume_text), content_hash(job_description), json.dumps(analysis), _now())
+            for resume_text, job_description, analysis in analyses
+        ]
+        with self._lock:
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO analyses (resume_hash, job_description_hash, result, created_at)
+                   VALUES (?, ?, ?, ?)""",
+                rows
+            )
+            self._conn.commit()
+
+    # Candidates
+
+    def count_candidates(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def iter_candidate_pages(self, page_size=DEFAULT_PAGE_SIZE):
+        """Yield candidate rows (keyed by table column names plus "Candidate ID") one page at a time"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM candidates WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [self._candidate_row(row) for row in rows]
+            last_id = rows[-1]["id"]
+
+    @staticmethod
+    def _candidate_row(row):
+        candidate = {column: row[field] for column, field in CANDIDATE_FIELDS.items()}
+        candidate["Email Sent"] = bool(candidate["Email Sent"])
+        candidate["Candidate ID"] = row["id"]
+        return candidate
+
+    def candidate_id_for_resume(self, resume_hash, job_description_hash=None):
+        """ID of the latest candidate created from this resume (for this job description when given), or None"""
+        query = "SELECT MAX(id) FROM candidates WHERE resume_hash = ?"
+        params = [resume_hash]
+        if job_description_hash is not None:
+            query += " AND job_description_hash = ?"
+            params.append(job_description_hash)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def candidates_for_job_description(self, job_description_hash):
+        """Candidate rows (as in iter_candidate_pages, plus "resume_hash") belonging to a job description.
+
+        Rows come from the database, so candidates added by other sessions are included.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM candidates WHERE job_description_hash = ? ORDER BY id",
+                (job_description_hash,)
+            ).fetchall()
+        return [dict(self._candidate_row(row), resume_hash=row["resume_hash"]) for row in rows]
+
+    def move_candidates(self, candidate_ids, job_description_hash):
+        """Attach candidates to another job description version, keeping their scores"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE candidates SET job_description_hash = ? WHERE id = ?",
+                [(job_description_hash, candidate_id) for candidate_id in candidate_ids]
+            )
+            self._conn.commit()
+
+    def insert_candidates(self, rows, resume_hashes=None, job_description_hash=None):
+        """Bulk-insert candidate rows (dicts keyed by table column names) in one transaction and return their new IDs.
+
+        IDs are assigned by SQLite, so sessions adding candidates at the same
+        time never collide.
+        """
+        resume_hashes = resume_hashes or [None] * len(rows)
+        fields = list(CANDIDATE_FIELDS.values())
+        placeholders = ", ".join("?" * (len(fields) + 3))
+        query = f"""INSERT INTO candidates (resume_hash, job_description_hash, {', '.join(fields)}, created_at)
+                    VALUES ({placeholders})"""
+        with self._lock:
+            candidate_ids = [
+                self._conn.execute(
+                    query,
+                    (resume_hash, job_description_hash, *[self._to_db(row.get(column)) for column in CANDIDATE_FIELDS], _now())
+                ).lastrowid
+                for row, resume_hash in zip(rows, resume_hashes)
+            ]
+            self._conn.commit()
+        return candidate_ids
+
+    def update_candidates(self, column, updates):
+        """Bulk-update one table column from (candidate_id, value) pairs"""
+        field = CANDIDATE_FIELDS[column]
+        with self._lock:
+            self._conn.executemany(
+                f"UPDATE candidates SET {field} = ? WHERE id = ?",
+                [(self._to_db(value), candidate_id) for candidate_id, value in updates]
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _to_db(value):
+        """Convert pandas/NumPy scalars to plain Python values SQLite understands"""
+        if value is None:
+            return None
+        if hasattr(value, "item"):
+            value = value.item()
+        if isinstance(value, float) and value != value:
+            return None
+        return value
+
+    # Interview slots
+
+    def list_slots(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, date, time, interviewer, interviewer_skills, available FROM interview_slots ORDER BY id"
+            ).fetchall()
+        # Skills are stored comma-separated
+        return [{"id": row["id"], "date": row["date"], "time": row["time"], "interviewer": row["interviewer"],
+                 "interviewer_skills": [skill for skill in (row["interviewer_skills"] or "").split(", ") if skill],
+                 "available": bool(row["available"])}
+                for row in rows]
+
+    def add_slots(self, slots):
+        """Bulk-insert slot dicts with date, time, available and an optional interviewer and interviewer_skills list.
+
+        Returns their new IDs in order, with None for slots already stored
+        (same date, time and interviewer, e.g. added by another session).
+        """
+        with self._lock:
+            # The write lock is taken up front, so every row above the current maximum ID is one of ours
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM interview_slots").fetchone()[0]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO interview_slots (date, time, interviewer, interviewer_skills, available) VALUES (?, ?, ?, ?, ?)",
+                    [(slot["date"], slot["time"], slot.get("interviewer"),
+                      ", ".join(slot.get("interviewer_skills") or []) or None, int(slot["available"]))
+                     for slot in slots]
+                )
+                rows = self._conn.execute(
+                    "SELECT id, date, time, interviewer FROM interview_slots WHERE id > ?", (last_id,)
+                ).fetchall()
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        inserted = {(row["date"], row["time"], row["interviewer"]): row["id"] for row in rows}
+        return [inserted.pop((slot["date"], slot["time"], slot.get("interviewer")), None) for slot in slots]
+
+    def set_slot_availability(self, slot_id, available):
+        with self._lock:
+            self._conn.execute("UPDATE interview_slots SET available = ? WHERE id = ?", (int(available), slot_id))
+            self._conn.commit()
+
+    def book_slots(self, slot_ids):
+        """Mark slots taken only if they are still available; returns the IDs this call booked"""
+        booked = []
+        with self._lock:
+            for slot_id in slot_ids:
+                cursor = self._conn.execute(
+                    "UPDATE interview_slots SET available = 0 WHERE id = ? AND available = 1", (slot_id,)
+                )
+                if cursor.rowcount:
+                    booked.append(slot_id)
+            self._conn.commit()
+        return booked
+
+    def set_slots_availability(self, slot_ids, available):
+        """Bulk-update availability for several slots in one transaction"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE interview_slots SET available = ? WHERE id = ?",
+                [(int(available), slot_id) for slot_id in slot_ids]
+            )
+            self._conn.commit()
+
+    # Emails
+
+    def list_emails(self, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Page through emails recorded in the outbox table that shares this database"""
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'outbox'"
+            ).fetchone()
+            if not exists:
+                return []
+            rows = self._conn.execute(
+                "SELECT * FROM outbox ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,350 @@
+# instrumentation.py
+import os
+import json
+import time
+import queue
+import bisect
+import inspect
+import functools
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds (the Prometheus client defaults, extended to a minute)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Durations kept per stage for percentiles
+SPAN_WINDOW = 1000
+
+DEFAULT_TRACE_PATH = os.path.join(".hr_assistant", "traces.jsonl")
+# Most spans the trace writer takes off its queue before writing and flushing
+TRACE_BATCH_SIZE = 512
+DEFAULT_METRICS_PORT = 9464
+METRIC_PREFIX = "hr_assistant"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+def _label_text(labels):
+    return ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in labels)
+
+
+class StageHistogram:
+    """Duration histogram, error count and recent durations for one stage"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket plus the overflow bucket; not cumulative
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.durations = deque(maxlen=SPAN_WINDOW)
+
+    def observe(self, duration, error=False):
+        self.bucket_counts[bisect.bisect_left(self.buckets, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.durations.append(duration)
+        if error:
+            self.errors += 1
+
+    def snapshot(self):
+        durations = sorted(self.durations)
+
+        def percentile(fraction):
+            if not durations:
+                return 0.0
+            return round(1000 * durations[min(int(fraction * len(durations)), len(durations) - 1)], 2)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_seconds": round(self.total, 3),
+            "mean_ms": round(1000 * self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(1000 * durations[-1], 2) if durations else 0.0
+        }
+
+
+class TraceWriter:
+    """Appends JSON lines to trace files from one background thread.
+
+    ``write`` only queues the line; the thread keeps the current file open,
+    writes whatever has queued up in one batch and flushes when the queue runs dry.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def write(self, path, line):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put((path, line))
+
+    def flush(self):
+        """Block until every queued line is written and flushed"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self):
+        trace_file = None
+        current_path = None
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < TRACE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for path, line in batch:
+                    if path != current_path:
+                        if trace_file is not None:
+                            trace_file.close()
+                        trace_file = open(path, "a", encoding="utf-8")
+                        current_path = path
+                    trace_file.write(line)
+                if trace_file is not None:
+                    trace_file.flush()
+            except OSError:
+                # A broken trace file must not stop tracing; the next span reopens it
+                trace_file = current_path = None
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+class Telemetry:
+    """Thread-safe spans, per-stage duration histograms and counters.
+
+    ``span(stage)`` times a block and nests under the span already open on
+    the current thread. Finished spans update the stage's histogram and, once
+    ``configure(trace_path=...)`` is called, are queued for a background
+    writer that appends them to a JSONL trace file with OpenTelemetry-style
+    fields. ``to_prometheus`` renders everything in the Prometheus text
+    format, served by ``MetricsServer``.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.trace_path = None
+        self._lock = threading.Lock()
+        # Open spans as a tuple of (span_id, stage); a context variable, so each thread and asyncio task has its own
+        self._open_spans = contextvars.ContextVar("open_spans", default=())
+        self._span_ids = itertools.count(1)
+        self._stages = {}
+        self._counters = {}
+        self._trace_writer = TraceWriter()
+        # Process-pool workers inherit this object; only the process that owns it records
+        self._owner_pid = os.getpid()
+
+    def configure(self, trace_path=None):
+        """Start (or with None, stop) writing finished spans to a JSONL trace file"""
+        if trace_path:
+            directory = os.path.dirname(trace_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self.trace_path = trace_path
+            self._owner_pid = os.getpid()
+
+    def current_stage(self):
+        """Name of the innermost open span in this thread or task, or None"""
+        stack = self._open_spans.get()
+        return stack[-1][1] if stack else None
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """Time the enclosed block as one span of ``stage``.
+
+        Yields the span's attribute dict, so the block can add attributes such
+        as token counts. An exception marks the span as an error and propagates.
+        The block may await; spans opened in other tasks meanwhile do not nest under it.
+        """
+        stack = self._open_spans.get()
+        parent_id = stack[-1][0] if stack else None
+        span_id = next(self._span_ids)
+        token = self._open_spans.set(stack + ((span_id, stage),))
+        start_time = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._open_spans.reset(token)
+            if error is not None:
+                attributes["error_message"] = str(error)[:200]
+            self.record(stage, time.perf_counter() - start, error=error is not None, start_time=start_time,
+                        span_id=span_id, parent_id=parent_id, **attributes)
+
+    def record(self, stage, duration, error=False, start_time=None, span_id=None, parent_id=None, **attributes):
+        """Record a finished span measured elsewhere (e.g. in a worker process)"""
+        if os.getpid() != self._owner_pid:
+            return
+        if span_id is None:
+            span_id = next(self._span_ids)
+            stack = self._open_spans.get()
+            parent_id = stack[-1][0] if stack else None
+
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = StageHistogram(self.buckets)
+            histogram.observe(duration, error)
+            trace_path = self.trace_path
+
+        if trace_path:
+            span_record = {
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": stage,
+                "start_time": start_time if start_time is not None else time.time() - duration,
+                "duration_ms": round(1000 * duration, 3),
+                "status": "ERROR" if error else "OK",
+                "pid": self._owner_pid,
+                "thread": threading.current_thread().name,
+                "attributes": attributes
+            }
+            self._trace_writer.write(trace_path, json.dumps(span_record, default=str) + "\n")
+
+    def flush(self):
+        """Wait until every finished span is written to the trace file"""
+        self._trace_writer.flush()
+
+    def increment(self, name, value=1, **labels):
+        """Add ``value`` to the counter ``name`` with the given labels"""
+        if os.getpid() != self._owner_pid:
+            return
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def stage_stats(self):
+        """{stage: count, errors, total_seconds, mean/p50/p95/max in ms}"""
+        with self._lock:
+            return {stage: histogram.snapshot() for stage, histogram in self._stages.items()}
+
+    def histogram(self, stage):
+        """[(bucket upper bound label, count)] for one stage, not cumulative"""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            counts = list(histogram.bucket_counts) if histogram else [0] * (len(self.buckets) + 1)
+        bounds = list(self.buckets) + [float("inf")]
+        return [(f"<= {_format_bound(bound)}s", count) for bound, count in zip(bounds, counts)]
+
+    def counters(self, name=None):
+        """[(name, labels dict, value)], optionally only for one counter name"""
+        with self._lock:
+            items = sorted(self._counters.items())
+        return [(counter_name, dict(labels), value) for (counter_name, labels), value in items
+                if name is None or counter_name == name]
+
+    def counter_total(self, name, **labels):
+        """Sum of a counter over every label set that includes ``labels``"""
+        return sum(value for _, counter_labels, value in self.counters(name)
+                   if all(counter_labels.get(key) == labeled for key, labeled in labels.items()))
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            stages = {stage: (list(histogram.bucket_counts), histogram.count, histogram.total, histogram.errors)
+                      for stage, histogram in self._stages.items()}
+            counters = sorted(self._counters.items())
+
+        duration_metric = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [f"# HELP {duration_metric} Duration of pipeline stages", f"# TYPE {duration_metric} histogram"]
+        for stage, (bucket_counts, count, total, _) in sorted(stages.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + [float("inf")], bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{duration_metric}_bucket{{stage="{stage}",le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{duration_metric}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{duration_metric}_count{{stage="{stage}"}} {count}')
+
+        errors_metric = f"{METRIC_PREFIX}_stage_errors_total"
+        lines += [f"# HELP {errors_metric} Failed spans per stage", f"# TYPE {errors_metric} counter"]
+        lines += [f'{errors_metric}{{stage="{stage}"}} {errors}' for stage, (_, _, _, errors) in sorted(stages.items())]
+
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{_label_text(labels)}}} {value}" if labels else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._counters = {}
+
+
+# Shared by every agent in the process
+telemetry = Telemetry()
+
+
+def traced(stage, **attributes):
+    """Decorator that runs each call of the function (or coroutine function) inside a telemetry span"""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with telemetry.span(stage, **attributes):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with telemetry.span(stage, **attributes):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    telemetry = telemetry
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.telemetry.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Serves ``/metrics`` for a Prometheus scraper from a background thread"""
+
+    def __init__(self, port=DEFAULT_METRICS_PORT, host="127.0.0.1", source=telemetry):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"telemetry": source})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,86 @@
+# jd_versioning.py
+import difflib
+
+from agents.prescreening import skills_from_job_description
+from agents.text_compaction import clean_lines, segment_sections
+
+# Sections whose lines are treated as scoring criteria; edits elsewhere (company blurb, benefits) affect nobody
+REQUIREMENT_SECTIONS = ("requirements", "skills", "preferred", "experience", "responsibilities", "education",
+                        "certifications")
+# A removed and an added line at least this similar count as one edited requirement
+CHANGED_LINE_SIMILARITY = 0.6
+# When more than this share of the criteria changed, affected candidates get a full re-analysis
+# instead of a re-evaluation of the changed criteria only
+FULL_RESCORE_CHANGE_SHARE = 0.5
+
+
+def requirement_items(job_description):
+    """[(section, requirement line)] from the criteria sections of a job description, in document order"""
+    items = []
+    for section, section_lines in segment_sections(clean_lines(job_description)):
+        if section not in REQUIREMENT_SECTIONS:
+            continue
+        for line in section_lines:
+            line = line.strip().strip("•-*· ").strip()
+            if line:
+                items.append((section, line))
+    return items
+
+
+def diff_job_descriptions(old_job_description, new_job_description):
+    """Structured diff of the requirements of two job description versions.
+
+    Returns a dict with ``added``, ``removed`` and ``changed`` requirement
+    lines (changed as (section, old line, new line)), the number of
+    ``unchanged`` lines, ``added_skills``/``removed_skills``, the share of
+    criteria that changed, and whether anything outside the criteria changed.
+    """
+    old_items = requirement_items(old_job_description)
+    new_items = requirement_items(new_job_description)
+    old_keys = {(section, line.lower()) for section, line in old_items}
+    new_keys = {(section, line.lower()) for section, line in new_items}
+    removed = [item for item in old_items if (item[0], item[1].lower()) not in new_keys]
+    added = [item for item in new_items if (item[0], item[1].lower()) not in old_keys]
+
+    # Pair up edits of the same requirement so they are reported (and matched) as one change
+    changed = []
+    for old_section, old_line in list(removed):
+        best, best_ratio = None, CHANGED_LINE_SIMILARITY
+        for new_item in added:
+            ratio = difflib.SequenceMatcher(None, old_line.lower(), new_item[1].lower()).ratio()
+            if new_item[0] == old_section and ratio >= best_ratio:
+                best, best_ratio = new_item, ratio
+        if best is not None:
+            changed.append((old_section, old_line, best[1]))
+            removed.remove((old_section, old_line))
+            added.remove(best)
+
+    old_skills = {skill.lower(): skill for skill in skills_from_job_description(old_job_description)}
+    new_skills = {skill.lower(): skill for skill in skills_from_job_description(new_job_description)}
+    change_count = len(added) + len(removed) + len(changed)
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "unchanged": len(old_keys & new_keys),
+        "added_skills": [skill for key, skill in new_skills.items() if key not in old_skills],
+        "removed_skills": [skill for key, skill in old_skills.items() if key not in new_skills],
+        "change_share": change_count / max(1, len(old_keys | new_keys) - len(changed)),
+        "requirements_changed": bool(change_count),
+        "other_text_changed": _other_lines(old_job_description) != _other_lines(new_job_description)
+    }
+
+
+def _other_lines(job_description):
+    """Lower-cased lines outside the criteria sections"""
+    return [line.lower() for section, section_lines in segment_sections(clean_lines(job_description))
+            if section not in REQUIREMENT_SECTIONS for line in section_lines]
+
+
+def describe_changes(diff):
+    """Plain-text list of the requirement changes, as shown to the model when re-scoring"""
+    lines = [f"- Added ({section}): {line}" for section, line in diff["added"]]
+    lines += [f"- Removed ({section}): {line}" for section, line in diff["removed"]]
+    lines += [f"- Changed ({section}): \"{old_line}\" -> \"{new_line}\"" for section, old_line, new_line in diff["changed"]]
+    return "\n".join(lines)
+
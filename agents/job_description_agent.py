@@ -1,15 +1,52 @@
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agents.agent_registry import get_llm_client
+from agents.model_router import select_llm
+from agents.llm_client import ainvoke_llm
 
 class JobDescriptionAgent:
-    def __init__(self, api_key):
-        os.environ["GOOGLE_API_KEY"] = api_key
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", google_api_key=api_key)
+    def __init__(self, api_key, llm=None, router=None):
+        self.llm = llm if llm is not None else get_llm_client(api_key)
+        self.router = router
     
     def generate_job_description(self, job_role, industry, experience_level, key_skills, 
                                 company_name, company_specialization):
         """Generate a comprehensive job description based on provided parameters"""
-        prompt = f"""Create a detailed job description for a {job_role} position in the {industry} industry.
+        prompt = self._generation_prompt(job_role, industry, experience_level, key_skills,
+                                         company_name, company_specialization)
+        response = select_llm(self.router, self.llm, "jd_generation").invoke(prompt)
+        return response.content
+    
+    def refine_job_description(self, existing_jd, refinement_instructions, 
+                              company_name=None, company_specialization=None):
+        """Refine an existing job description based on provided instructions"""
+        prompt = self._refinement_prompt(existing_jd, refinement_instructions, company_name, company_specialization)
+        response = select_llm(self.router, self.llm, "jd_refinement").invoke(prompt)
+        return response.content
+    
+    def validate_job_description(self, job_description):
+        """Check job description for common issues like bias, clarity, completeness"""
+        response = select_llm(self.router, self.llm, "jd_validation").invoke(self._validation_prompt(job_description))
+        return response.content
+    
+    # Coroutine variants; they await the client directly and share its rate limits and adaptive concurrency
+    
+    async def agenerate_job_description(self, job_role, industry, experience_level, key_skills,
+                                        company_name, company_specialization):
+        prompt = self._generation_prompt(job_role, industry, experience_level, key_skills,
+                                         company_name, company_specialization)
+        return (await ainvoke_llm(select_llm(self.router, self.llm, "jd_generation"), prompt)).content
+    
+    async def arefine_job_description(self, existing_jd, refinement_instructions,
+                                      company_name=None, company_specialization=None):
+        prompt = self._refinement_prompt(existing_jd, refinement_instructions, company_name, company_specialization)
+        return (await ainvoke_llm(select_llm(self.router, self.llm, "jd_refinement"), prompt)).content
+    
+    async def avalidate_job_description(self, job_description):
+        prompt = self._validation_prompt(job_description)
+        return (await ainvoke_llm(select_llm(self.router, self.llm, "jd_validation"), prompt)).content
+    
+    @staticmethod
+    def _generation_prompt(job_role, industry, experience_level, key_skills, company_name, company_specialization):
+        return f"""Create a detailed job description for a {job_role} position in the {industry} industry.
         
         Company Name: {company_name}
         Company Specialization: {company_specialization}
@@ -26,13 +63,9 @@ class JobDescriptionAgent:
         - Benefits
         
         Make it professional, detailed, and appealing to qualified candidates."""
-        
-        response = self.llm.invoke(prompt)
-        return response.content
     
-    def refine_job_description(self, existing_jd, refinement_instructions, 
-                              company_name=None, company_specialization=None):
-        """Refine an existing job description based on provided instructions"""
+    @staticmethod
+    def _refinement_prompt(existing_jd, refinement_instructions, company_name=None, company_specialization=None):
         company_context = ""
         if company_name and company_specialization:
             company_context = f"""
@@ -41,7 +74,7 @@ class JobDescriptionAgent:
             Company Specialization: {company_specialization}
             """
             
-        prompt = f"""Refine the following job description according to these instructions: 
+        return f"""Refine the following job description according to these instructions: 
         {refinement_instructions}
         {company_context}
         
@@ -49,13 +82,10 @@ class JobDescriptionAgent:
         {existing_jd}
         
         Return the complete refined job description."""
-        
-        response = self.llm.invoke(prompt)
-        return response.content
     
-    def validate_job_description(self, job_description):
-        """Check job description for common issues like bias, clarity, completeness"""
-        prompt = f"""Analyze the following job description and identify any potential issues:
+    @staticmethod
+    def _validation_prompt(job_description):
+        return f"""Analyze the following job description and identify any potential issues:
         - Check for gender or age bias in language
         - Identify vague requirements or responsibilities
         - Highlight any missing essential sections
@@ -65,6 +95,3 @@ class JobDescriptionAgent:
         {job_description}
         
         Provide a structured analysis with specific recommendations for improvement."""
-        
-        response = self.llm.invoke(prompt)
-        return response.content
\ No newline at end of file
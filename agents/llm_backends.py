@@ -0,0 +1,142 @@
+# llm_backends.py
+import os
+import json
+import hashlib
+import threading
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from agents.fake_llm import FakeLLM, FakeResponse
+from agents.instrumentation import telemetry
+from agents.llm_client import ainvoke_llm
+from agents.response_parsing import usage_tokens
+
+BACKEND_GEMINI = "gemini"
+BACKEND_FAKE = "fake"
+BACKEND_RECORD = "record"
+BACKEND_REPLAY = "replay"
+LLM_BACKENDS = (BACKEND_GEMINI, BACKEND_FAKE, BACKEND_RECORD, BACKEND_REPLAY)
+
+DEFAULT_RECORDING_PATH = os.path.join(".hr_assistant", "llm_recordings.jsonl")
+
+
+def recording_key(model_name, prompt):
+    """Key of a recorded exchange: the model and the exact prompt"""
+    return hashlib.sha256(f"{model_name}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class RecordingLLM:
+    """Wraps a live client and appends every prompt/response pair to a JSONL file"""
+
+    def __init__(self, llm, model_name, path=DEFAULT_RECORDING_PATH):
+        self.llm = llm
+        self.model_name = model_name
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def invoke(self, prompt):
+        response = self.llm.invoke(prompt)
+        record = {"key": recording_key(self.model_name, prompt), "model": self.model_name, "content": response.content}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as recording_file:
+                recording_file.write(json.dumps(record) + "\n")
+        return response
+
+
+class ReplayLLM:
+    """Answers prompts from a recording made by RecordingLLM, without network access.
+
+    Prompts that were never recorded go to ``fallback`` (e.g. a FakeLLM) when
+    given, otherwise they raise.
+    """
+
+    def __init__(self, model_name, path=DEFAULT_RECORDING_PATH, fallback=None):
+        self.model_name = model_name
+        self.fallback = fallback
+        self.misses = 0
+        self._responses = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as recording_file:
+                for line in recording_file:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._responses[record["key"]] = record["content"]
+
+    def __len__(self):
+        return len(self._responses)
+
+    def invoke(self, prompt):
+        content = self._responses.get(recording_key(self.model_name, prompt))
+        if content is not None:
+            return FakeResponse(content)
+        self.misses += 1
+        if self.fallback is not None:
+            return self.fallback.invoke(prompt)
+        raise Exception(f"No recorded response for this prompt ({self.model_name})")
+
+
+class TracedLLM:
+    """Wraps any backend's client so every call is a telemetry span with its token counts.
+
+    Tokens are counted per model and per enclosing stage (analysis, email
+    generation, ...). Other attributes pass through to the wrapped client.
+    """
+
+    def __init__(self, llm, model_name):
+        self.llm = llm
+        self.model_name = model_name
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def invoke(self, prompt):
+        stage = telemetry.current_stage() or "unattributed"
+        with telemetry.span("llm_call", model=self.model_name, caller=stage) as attributes:
+            response = self.llm.invoke(prompt)
+            self._count_tokens(response, prompt, stage, attributes)
+        return response
+
+    async def ainvoke(self, prompt):
+        stage = telemetry.current_stage() or "unattributed"
+        with telemetry.span("llm_call", model=self.model_name, caller=stage) as attributes:
+            response = await ainvoke_llm(self.llm, prompt)
+            self._count_tokens(response, prompt, stage, attributes)
+        return response
+
+    def _count_tokens(self, response, prompt, stage, attributes):
+        input_tokens, output_tokens = usage_tokens(response, prompt)
+        attributes["input_tokens"] = input_tokens
+        attributes["output_tokens"] = output_tokens
+        telemetry.increment("llm_tokens", input_tokens, direction="input", model=self.model_name, stage=stage)
+        telemetry.increment("llm_tokens", output_tokens, direction="output", model=self.model_name, stage=stage)
+
+
+def create_llm(backend, api_key, model_name, **options):
+    """Build a chat client for a backend.
+
+    Options: ``timeout`` (seconds) for the live client, ``recording_path``
+    for record/replay, and ``latency``, ``failure_rate`` and ``seed`` for the
+    fake backend (replay also uses them for its fallback when
+    ``replay_fallback`` is set).
+    """
+    recording_path = options.get("recording_path") or DEFAULT_RECORDING_PATH
+    fake_options = {key: options[key] for key in ("latency", "failure_rate", "seed") if key in options}
+
+    if backend == BACKEND_GEMINI:
+        os.environ["GOOGLE_API_KEY"] = api_key
+        # A single attempt per call: RateLimitedLLM retries, and needs to see 429s to adapt its concurrency.
+        # The client enforces the timeout itself, since RateLimitedLLM cannot interrupt a blocked call
+        return ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key, max_retries=1,
+                                      timeout=options.get("timeout"))
+    if backend == BACKEND_FAKE:
+        return FakeLLM(model_name=model_name, **fake_options)
+    if backend == BACKEND_RECORD:
+        return RecordingLLM(create_llm(BACKEND_GEMINI, api_key, model_name, timeout=options.get("timeout")),
+                            model_name, recording_path)
+    if backend == BACKEND_REPLAY:
+        fallback = FakeLLM(model_name=model_name, **fake_options) if options.get("replay_fallback") else None
+        return ReplayLLM(model_name, recording_path, fallback=fallback)
+    raise Exception(f"Unknown LLM backend '{backend}'. Choose one of: {', '.join(LLM_BACKENDS)}")
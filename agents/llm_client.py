@@ -0,0 +1,421 @@
+# llm_client.py
+import re
+import time
+import random
+import asyncio
+import functools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.instrumentation import telemetry
+from agents.response_parsing import estimate_tokens, usage_tokens
+
+# Requests in flight per client: AIMD moves the limit between the bounds, starting at the initial value
+DEFAULT_INITIAL_CONCURRENCY = 8
+MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 32
+# Additive increase: the limit grows by about one after a full limit's worth of successful requests
+AIMD_INCREASE = 1.0
+# Multiplicative decrease on a 429 or timeout
+AIMD_DECREASE = 0.5
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 4
+# Full-jitter exponential backoff: a random wait of up to min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2^(attempt - 1))
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# A request still running after this percentile of recent latencies gets one hedge request
+HEDGE_PERCENTILE = 0.95
+# Latencies needed before hedging starts, and the shortest hedge delay
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 1.0
+LATENCY_WINDOW = 200
+
+# Output tokens reserved per request until the actual usage is known
+EXPECTED_OUTPUT_TOKENS = 500
+
+# Threads for the wrapped clients' blocking calls
+CLIENT_THREADS = 64
+
+_RATE_LIMIT_PATTERN = re.compile(r"\b429\b|rate.?limit|quota|resource.?exhausted|too many requests", re.IGNORECASE)
+_TIMEOUT_PATTERN = re.compile(r"timed? ?out|deadline", re.IGNORECASE)
+_TRANSIENT_PATTERN = re.compile(r"\b50[0234]\b|unavailable|internal.?server|connection (reset|aborted|refused)",
+                                re.IGNORECASE)
+
+
+class LLMTimeoutError(Exception):
+    pass
+
+
+def classify_error(error):
+    """"rate_limit", "timeout" or "transient" for errors worth retrying, else None"""
+    if isinstance(error, (TimeoutError, LLMTimeoutError)):
+        return "timeout"
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return "rate_limit"
+    text = f"{type(error).__name__}: {error}"
+    if _RATE_LIMIT_PATTERN.search(text):
+        return "rate_limit"
+    if _TIMEOUT_PATTERN.search(text):
+        return "timeout"
+    if isinstance(error, ConnectionError) or _TRANSIENT_PATTERN.search(text):
+        return "transient"
+    return None
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff before retry number ``attempt`` (1-based)"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+_background = {"loop": None, "thread": None}
+
+
+def _executor(name, threads):
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=name)
+        return executor
+
+
+def _background_loop():
+    with _executors_lock:
+        if _background["thread"] is None or not _background["thread"].is_alive():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True)
+            thread.start()
+            _background["loop"], _background["thread"] = loop, thread
+        return _background["loop"], _background["thread"]
+
+
+def run_coroutine(coroutine):
+    """Run a coroutine on the shared background event loop and wait for its result, for synchronous callers"""
+    loop, thread = _background_loop()
+    if threading.current_thread() is thread:
+        coroutine.close()
+        raise Exception("Synchronous LLM calls cannot be made from the LLM client's own event loop; await ainvoke instead")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def _submit(executor, function, *args, **kwargs):
+    """Start a blocking call on a worker thread and return its concurrent future"""
+    # Copy the caller's context so telemetry spans opened in the thread nest under the caller's
+    context = contextvars.copy_context()
+    return executor.submit(functools.partial(context.run, function, *args, **kwargs))
+
+
+async def _run_in_executor(executor, function, *args, **kwargs):
+    return await asyncio.wrap_future(_submit(executor, function, *args, **kwargs))
+
+
+async def ainvoke_llm(llm, prompt):
+    """Await a chat client: its ``ainvoke`` when it has one, else its blocking ``invoke`` on a worker thread"""
+    if hasattr(llm, "ainvoke"):
+        return await llm.ainvoke(prompt)
+    return await _run_in_executor(_executor("llm-client", CLIENT_THREADS), llm.invoke, prompt)
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute`` tokens a minute, holding at most a minute's worth.
+
+    ``reserve`` takes the tokens at once and returns how long to wait before
+    using them. The balance may go negative, so waiting callers are served
+    in arrival order. A rate of None or 0 means unlimited.
+    """
+
+    def __init__(self, per_minute=None, clock=time.monotonic):
+        self.per_minute = per_minute
+        self._clock = clock
+        self._tokens = float(per_minute or 0)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        if not self.per_minute:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * self.per_minute / 60.0)
+            self._updated = now
+            # A request larger than the bucket still goes through once the bucket is full
+            self._tokens -= min(float(amount), self.per_minute)
+            return 0.0 if self._tokens >= 0 else -self._tokens * 60.0 / self.per_minute
+
+    def refund(self, amount):
+        """Give back unused tokens; a negative amount charges extra ones"""
+        if not self.per_minute:
+            return
+        with self._lock:
+            self._tokens = min(self.per_minute, self._tokens + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one model"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, tokens):
+        """Wait until one request with this many (estimated) tokens fits both limits"""
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay > 0:
+            telemetry.increment("llm_rate_limit_waits")
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.requests.refund(1)
+                self.tokens.refund(tokens)
+                raise
+        return delay
+
+    def settle(self, reserved, used):
+        """Correct the token bucket once a response reports its actual usage"""
+        self.tokens.refund(reserved - used)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on requests in flight, shared by every thread and event loop using one client.
+
+    Each success raises the limit by AIMD_INCREASE / limit (about one per
+    round of requests); a rate-limit error or timeout halves it. As in TCP,
+    only requests sent after the last decrease can trigger another, so one
+    burst of errors counts once. The limit never exceeds ``maximum``, which is
+    the configured maximum or, when lower, the ``cap`` a ModelRouter sets for
+    its tier.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=DEFAULT_MAX_CONCURRENCY):
+        self.minimum = minimum
+        self.configured_maximum = maximum
+        self.cap = None
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._clock = time.monotonic
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _try_enter(self):
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def try_acquire(self):
+        """Take a slot only if one is free right now"""
+        with self._lock:
+            return self._try_enter()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_enter():
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_all()
+
+    def _wake_all(self):
+        # Waiters may belong to different event loops; each re-checks the limit when woken
+        waiters, self._waiters = self._waiters, deque()
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                pass
+
+    def set_maximum(self, maximum):
+        with self._lock:
+            self.configured_maximum = maximum
+            self._apply_maximum()
+
+    def set_cap(self, cap):
+        """Keep the maximum at or below ``cap`` whatever set_maximum configures; None lifts the cap"""
+        with self._lock:
+            self.cap = cap
+            self._apply_maximum()
+
+    def _apply_maximum(self):
+        self.maximum = self.configured_maximum if self.cap is None else min(self.configured_maximum, self.cap)
+        self.limit = max(self.minimum, min(self.limit, float(self.maximum)))
+        self._wake_all()
+
+    def on_success(self):
+        with self._lock:
+            previous = int(self.limit)
+            self.limit = min(self.maximum, self.limit + AIMD_INCREASE / self.limit)
+            if int(self.limit) > previous:
+                self._wake_all()
+
+    def now(self):
+        return self._clock()
+
+    def on_overload(self, sent_at):
+        """Halve the limit for a rate-limit error or timeout on a request sent at ``sent_at`` (see ``now``)"""
+        with self._lock:
+            if sent_at > self._last_decrease:
+                self.limit = max(self.minimum, self.limit * AIMD_DECREASE)
+                self._last_decrease = self._clock()
+                self.decreases += 1
+
+
+class RateLimitedLLM:
+    """Wraps a blocking chat client with rate limits, adaptive concurrency, retries and hedging.
+
+    Every request first waits for the requests-per-minute and tokens-per-minute
+    buckets, then for a slot under the adaptive (AIMD) concurrency limit.
+    Rate-limit errors, timeouts and transient server errors are retried with
+    full-jitter exponential backoff. A request still running past the recent
+    p95 latency gets one hedge request when a slot is free, and the first
+    response wins.
+
+    ``ainvoke`` is the coroutine API. ``invoke`` runs it on a shared background
+    event loop, so the agents' synchronous calls share the same limits. The
+    wrapped client's blocking ``invoke`` always runs on worker threads (never
+    its own async API, which may be bound to another event loop). A call that
+    times out cannot be interrupted: the caller gets LLMTimeoutError at once,
+    but the call keeps its concurrency slot until its thread returns, so hung
+    requests never push the calls in flight past the limit. The live client is
+    also given the timeout (see llm_backends.create_llm) so it gives up itself.
+    """
+
+    def __init__(self, llm, model_name=None, requests_per_minute=None, tokens_per_minute=None, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, hedge=True, initial_concurrency=DEFAULT_INITIAL_CONCURRENCY,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.llm = llm
+        self.model_name = model_name
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, maximum=max_concurrency)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def configure(self, requests_per_minute=None, tokens_per_minute=None, timeout=DEFAULT_TIMEOUT,
+                  max_retries=DEFAULT_MAX_RETRIES, hedge=True, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """Apply new limits in place; the learned concurrency limit is kept within the new maximum"""
+        if (requests_per_minute, tokens_per_minute) != (self.rate_limiter.requests.per_minute,
+                                                         self.rate_limiter.tokens.per_minute):
+            self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.concurrency.set_maximum(max_concurrency)
+
+    def stats(self):
+        """Current concurrency limit, requests in flight, limit decreases and p95 latency"""
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "decreases": self.concurrency.decreases,
+            "p95_latency": self._latency_percentile(HEDGE_PERCENTILE)
+        }
+
+    def _latency_percentile(self, fraction):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging a request, or None while hedging is off or there is too little history"""
+        if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, self._latency_percentile(HEDGE_PERCENTILE))
+
+    def invoke(self, prompt):
+        return run_coroutine(self.ainvoke(prompt))
+
+    async def ainvoke(self, prompt):
+        reserved = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        attempt = 0
+        while True:
+            try:
+                return await self._hedged(prompt, reserved)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                telemetry.increment("retries", kind=f"llm_{kind}")
+                await asyncio.sleep(backoff_delay(attempt))
+
+    async def _hedged(self, prompt, reserved):
+        tasks = {asyncio.ensure_future(self._attempt(prompt, reserved))}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                # Never hedge when the limit is already saturated
+                if not done and self.concurrency.try_acquire():
+                    telemetry.increment("llm_hedges", model=self.model_name)
+                    tasks.add(asyncio.ensure_future(self._attempt(prompt, reserved, slot_taken=True)))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(self, prompt, reserved, slot_taken=False):
+        sent_at = None
+        call = None
+        try:
+            await self.rate_limiter.acquire(reserved)
+            if not slot_taken:
+                await self.concurrency.acquire()
+                slot_taken = True
+            sent_at = self.concurrency.now()
+            start = time.perf_counter()
+            call = _submit(_executor("llm-client", CLIENT_THREADS), self.llm.invoke, prompt)
+            response = await asyncio.wait_for(asyncio.wrap_future(call), self.timeout)
+        except Exception as e:
+            if sent_at is not None and classify_error(e) in ("rate_limit", "timeout"):
+                self.concurrency.on_overload(sent_at)
+            if isinstance(e, TimeoutError):
+                raise LLMTimeoutError(f"LLM request timed out after {self.timeout}s ({self.model_name})") from e
+            raise
+        finally:
+            if slot_taken:
+                if call is None or call.done():
+                    self.concurrency.release()
+                else:
+                    # Timed out or lost a hedge while its thread is still blocked: free the slot when it returns
+                    call.add_done_callback(lambda _: self.concurrency.release())
+
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        self.concurrency.on_success()
+        self.rate_limiter.settle(reserved, sum(usage_tokens(response, prompt)))
+        return response
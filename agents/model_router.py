@@ -0,0 +1,195 @@
+# model_router.py
+import time
+import threading
+from collections import deque
+
+from agents.agent_registry import get_llm_client
+from agents.llm_client import ainvoke_llm
+from agents.response_parsing import usage_tokens
+
+TIER_FAST = "fast"
+TIER_PRO = "pro"
+
+DEFAULT_TIER_MODELS = {
+    TIER_FAST: "gemini-1.5-flash",
+    TIER_PRO: "gemini-1.5-pro"
+}
+
+# Task -> tier. Unknown tasks use the "default" entry.
+DEFAULT_ROUTING_RULES = {
+    "triage": TIER_FAST,
+    "borderline_analysis": TIER_PRO,
+    "analysis_batch": TIER_FAST,
+    "rescore": TIER_FAST,
+    "repair": TIER_FAST,
+    "slot_selection": TIER_FAST,
+    "interview_email": TIER_FAST,
+    "personalization": TIER_FAST,
+    "rejection_email": TIER_FAST,
+    "jd_generation": TIER_PRO,
+    "jd_refinement": TIER_PRO,
+    "jd_validation": TIER_FAST,
+    "default": TIER_PRO
+}
+
+# Requests allowed in flight per tier
+DEFAULT_CONCURRENCY = {TIER_FAST: 8, TIER_PRO: 2}
+
+# Analyses whose fast-tier score is within this many points of the approval threshold go to the pro tier
+DEFAULT_BORDERLINE_MARGIN = 10
+
+# Latency samples kept per tier for percentiles
+LATENCY_WINDOW = 1000
+
+
+def select_llm(router, llm, task):
+    """The routed client for a task when a router is configured, else the agent's own client"""
+    return router.for_task(task) if router is not None else llm
+
+
+class TierStats:
+    """Call, error, latency and token counters for one tier"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_latency = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(int(fraction * len(latencies)), len(latencies) - 1)], 3)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "mean_latency": round(self.total_latency / self.calls, 3) if self.calls else 0.0,
+            "p50_latency": percentile(0.5),
+            "p95_latency": percentile(0.95)
+        }
+
+
+class RoutedLLM:
+    """Chat client wrapper that records its tier's stats.
+
+    Exposes ``invoke`` and ``ainvoke`` like the wrapped client, so agents can
+    use it unchanged. The tier's concurrency limit is enforced by the client
+    itself (see ``ModelRouter.client_for_tier``).
+    """
+
+    def __init__(self, router, tier, task):
+        self.router = router
+        self.tier = tier
+        self.task = task
+
+    @property
+    def model_name(self):
+        return self.router.tier_models[self.tier]
+
+    def invoke(self, prompt):
+        client = self.router.client_for_tier(self.tier)
+        start = time.perf_counter()
+        try:
+            response = client.invoke(prompt)
+        except Exception:
+            self.router.record(self.tier, time.perf_counter() - start, error=True)
+            raise
+        self.router.record(self.tier, time.perf_counter() - start, *usage_tokens(response, prompt))
+        return response
+
+    async def ainvoke(self, prompt):
+        client = self.router.client_for_tier(self.tier)
+        start = time.perf_counter()
+        try:
+            response = await ainvoke_llm(client, prompt)
+        except Exception:
+            self.router.record(self.tier, time.perf_counter() - start, error=True)
+            raise
+        self.router.record(self.tier, time.perf_counter() - start, *usage_tokens(response, prompt))
+        return response
+
+
+class ModelRouter:
+    """Sends each kind of LLM task to a model tier.
+
+    ``client_factory(model_name)`` builds the chat client for a tier (see
+    ``from_api_key``; tests can pass a factory returning ``FakeLLM``s). Routing
+    rules map task names to tiers. A tier's ``concurrency`` setting caps the
+    maximum of its client's adaptive (AIMD) concurrency limit, so the limit
+    still shrinks on rate-limit errors but never grows past the tier setting.
+    Clients without adaptive concurrency (e.g. a bare FakeLLM) are not capped.
+    """
+
+    def __init__(self, client_factory, tier_models=None, rules=None, concurrency=None,
+                 borderline_margin=DEFAULT_BORDERLINE_MARGIN):
+        self.client_factory = client_factory
+        self.tier_models = dict(DEFAULT_TIER_MODELS, **(tier_models or {}))
+        self.rules = dict(DEFAULT_ROUTING_RULES, **(rules or {}))
+        self.concurrency = dict(DEFAULT_CONCURRENCY, **(concurrency or {}))
+        self.borderline_margin = borderline_margin
+
+        self._clients = {}
+        self._stats = {tier: TierStats() for tier in self.tier_models}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_api_key(cls, api_key, backend=None, backend_options=None, **kwargs):
+        """Router whose tiers use the shared clients for this API key (on the default backend unless one is given)"""
+        return cls(lambda model_name: get_llm_client(api_key, model_name, backend, backend_options), **kwargs)
+
+    def tier_for(self, task):
+        tier = self.rules.get(task, self.rules.get("default", TIER_PRO))
+        if tier not in self.tier_models:
+            raise Exception(f"Task '{task}' is routed to unknown tier '{tier}'")
+        return tier
+
+    def for_task(self, task):
+        """Client for a task, routed to its tier"""
+        return RoutedLLM(self, self.tier_for(task), task)
+
+    def client_for_tier(self, tier):
+        with self._lock:
+            client = self._clients.get(tier)
+            if client is None:
+                client = self.client_factory(self.tier_models[tier])
+                concurrency = getattr(client, "concurrency", None)
+                if concurrency is not None:
+                    # Clients are shared per model; the router created last sets the cap
+                    concurrency.set_cap(max(1, int(self.concurrency.get(tier, 1))))
+                self._clients[tier] = client
+            return client
+
+    def is_borderline(self, score, threshold):
+        """Whether a fast-tier score is close enough to the threshold to need the pro tier"""
+        try:
+            return abs(float(score) - float(threshold)) <= self.borderline_margin
+        except (TypeError, ValueError):
+            return True
+
+    def describe(self):
+        """Stable text identifying the routing setup, used in analysis cache keys"""
+        return f"routed:{self.tier_models[TIER_FAST]}/{self.tier_models[TIER_PRO]}:{self.borderline_margin}"
+
+    def record(self, tier, latency, input_tokens=0, output_tokens=0, error=False):
+        with self._lock:
+            stats = self._stats[tier]
+            stats.calls += 1
+            stats.total_latency += latency
+            stats.latencies.append(latency)
+            if error:
+                stats.errors += 1
+            stats.input_tokens += input_tokens
+            stats.output_tokens += output_tokens
+
+    def stats(self):
+        """Per-tier snapshot with the tier's model name"""
+        with self._lock:
+            return {tier: dict(stats.snapshot(), model=self.tier_models[tier]) for tier, stats in self._stats.items()}
@@ -0,0 +1,199 @@
+# prescreening.py
+import re
+import math
+from collections import Counter
+
+from agents.resume_parser_agent import ResumeParserAgent
+from agents.text_compaction import clean_lines, segment_sections
+
+# Resumes scoring below this local score are rejected without an LLM call
+DEFAULT_PRESCREEN_FLOOR = 15
+# Share of the local score that comes from key-skill coverage (the rest is text similarity)
+SKILL_COVERAGE_WEIGHT = 0.7
+# BM25 parameters; resume length is normalized against a typical resume
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVERAGE_RESUME_TERMS = 400
+# Most frequent job description terms used as the similarity query
+MAX_QUERY_TERMS = 60
+
+# Common spellings and abbreviations of skills, keyed by canonical name. Abbreviations that are also
+# ordinary words ("go", "node", "ai", ...) are left out; see AMBIGUOUS_SKILL_TERMS.
+DEFAULT_SKILL_ALIASES = {
+    "javascript": ["js", "ecmascript", "es6"],
+    "python": ["python3"],
+    "go": ["golang"],
+    "c#": ["csharp", "c sharp", ".net"],
+    "c++": ["cpp"],
+    "node.js": ["nodejs", "node js"],
+    "react": ["reactjs", "react.js"],
+    "vue": ["vuejs", "vue.js"],
+    "angular": ["angularjs"],
+    "postgresql": ["postgres", "psql"],
+    "mongodb": ["mongo"],
+    "kubernetes": ["k8s"],
+    "aws": ["amazon web services", "ec2"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "azure": ["microsoft azure"],
+    "machine learning": ["ml"],
+    "natural language processing": ["nlp"],
+    "deep learning": ["neural networks"],
+    "ci/cd": ["continuous integration", "continuous delivery", "continuous deployment"],
+    "rest": ["restful", "rest api", "rest apis"],
+    "sql": ["mysql", "postgresql", "sqlite", "t-sql"],
+    "docker": ["containers", "containerization"],
+    "project management": ["pmp"],
+    "user experience": ["ux"]
+}
+
+# Skill names that are also common words or letters; they only count as an item of their own in a
+# list ("Python, Go, SQL" or a line by itself), never inside running text ("ready to go")
+AMBIGUOUS_SKILL_TERMS = frozenset({"go", "node", "ai", "ui", "ts", "lambda", "s3", "r", "c", "rest", "swift", "spring"})
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could do does each
+etc for from has have having he her his how i if in into is it its may more most must no not of on
+or other our ours out over own per she should so some such than that the their them then there these
+they this those through to under up us very was we were what when where which while who will with
+within without would you your role team work working years year experience ability strong excellent
+including candidate candidates position company job new using use based across well plus
+""".split())
+
+_TERM_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text):
+    """Lower-case content terms of a text, without stopwords"""
+    return [term for term in _TERM_PATTERN.findall((text or "").lower()) if term not in STOPWORDS]
+
+
+def parse_skill_list(key_skills):
+    """Split a comma/semicolon/newline separated skills string (or list) into distinct skills"""
+    if isinstance(key_skills, str):
+        key_skills = re.split(r"[,;\n]", key_skills)
+    skills = []
+    for skill in key_skills or []:
+        skill = str(skill).strip().strip("•-* ").strip()
+        if skill and skill.lower() not in (existing.lower() for existing in skills):
+            skills.append(skill)
+    return skills
+
+
+def skills_from_job_description(job_description, max_skills=25):
+    """Guess the key skills from the skills/requirements sections of a job description.
+
+    Used when no explicit skills list was entered: short comma-separated items
+    in those sections are taken as skills.
+    """
+    skills = []
+    for section, section_lines in segment_sections(clean_lines(job_description)):
+        if section not in ("skills", "requirements", "preferred"):
+            continue
+        for line in section_lines:
+            line = re.sub(r"\(.*?\)", "", line.split(":", 1)[-1])
+            for item in re.split(r",| and | or ", line):
+                item = item.strip().strip("•-*. ")
+                if item and len(item.split()) <= 3 and not any(char.isdigit() for char in item):
+                    skills.append(item)
+    return parse_skill_list(skills)[:max_skills]
+
+
+def _skill_pattern(skill, aliases):
+    """Compiled case-insensitive pattern matching a skill or any alias as a whole word.
+
+    Ambiguous variants (AMBIGUOUS_SKILL_TERMS) must be a list item of their own.
+    """
+    variants = sorted({skill.lower(), *[alias.lower() for alias in aliases]}, key=len, reverse=True)
+    plain = [re.escape(variant) for variant in variants if variant not in AMBIGUOUS_SKILL_TERMS]
+    ambiguous = [re.escape(variant) for variant in variants if variant in AMBIGUOUS_SKILL_TERMS]
+    alternatives = []
+    if plain:
+        alternatives.append(rf"(?<![a-z0-9+#])(?:{'|'.join(plain)})(?![a-z0-9+#])")
+    if ambiguous:
+        alternatives.append(rf"(?:^|(?<=[,;|•/(]))[ \t]*(?:{'|'.join(ambiguous)})[ \t]*(?=$|[,;|•/)]|\.(?:\s|$))")
+    return re.compile("|".join(alternatives), re.IGNORECASE | re.MULTILINE)
+
+
+def build_skill_patterns(key_skills, aliases=None):
+    """Map each skill to a pattern matching its name and known aliases"""
+    aliases = DEFAULT_SKILL_ALIASES if aliases is None else aliases
+    return {skill: _skill_pattern(skill, aliases.get(skill.lower(), [])) for skill in parse_skill_list(key_skills)}
+
+
+class PreScreener:
+    """Cheap local relevance score for a resume against one job description.
+
+    The score (0-100) blends the share of key skills found in the resume
+    (matched by name or alias) with a BM25-style similarity between the resume
+    and the job description's most frequent terms. Resumes scoring below the
+    floor can be rejected without calling the LLM.
+    """
+
+    def __init__(self, job_description, key_skills=None, floor=DEFAULT_PRESCREEN_FLOOR, aliases=None, resume_parser=None):
+        self.floor = floor
+        self.resume_parser = resume_parser or ResumeParserAgent()
+        self.key_skills = parse_skill_list(key_skills) or skills_from_job_description(job_description)
+        self.skill_patterns = build_skill_patterns(self.key_skills, aliases)
+
+        # Query term weights grow with how often the job description uses the term
+        term_counts = Counter(tokenize(job_description))
+        self.query_weights = {term: 1 + math.log(count) for term, count in term_counts.most_common(MAX_QUERY_TERMS)}
+        self._max_similarity = sum(self.query_weights.values()) or 1.0
+
+    def similarity(self, resume_text):
+        """BM25-style similarity between the resume and the job description terms, scaled to 0-1"""
+        terms = tokenize(resume_text)
+        if not terms or not self.query_weights:
+            return 0.0
+        term_frequencies = Counter(terms)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / AVERAGE_RESUME_TERMS)
+        score = 0.0
+        for term, weight in self.query_weights.items():
+            frequency = term_frequencies.get(term, 0)
+            if frequency:
+                score += weight * frequency / (frequency + length_norm)
+        # Each term contributes at most its weight, reached as its frequency grows
+        return min(score / self._max_similarity, 1.0)
+
+    def screen(self, resume_text):
+        """Score one resume; returns score, matched and missing skills and whether it passed the floor"""
+        matched_skills = [skill for skill, pattern in self.skill_patterns.items() if pattern.search(resume_text or "")]
+        missing_skills = [skill for skill in self.skill_patterns if skill not in matched_skills]
+        similarity = self.similarity(resume_text)
+
+        if self.skill_patterns:
+            coverage = len(matched_skills) / len(self.skill_patterns)
+            score = 100 * (SKILL_COVERAGE_WEIGHT * coverage + (1 - SKILL_COVERAGE_WEIGHT) * similarity)
+        else:
+            coverage = None
+            score = 100 * similarity
+
+        return {
+            "score": round(score, 1),
+            "skill_coverage": None if coverage is None else round(100 * coverage, 1),
+            "similarity": round(100 * similarity, 1),
+            "matched_skills": matched_skills,
+            "missing_skills": missing_skills,
+            "passed": score >= self.floor
+        }
+
+    def rejection_analysis(self, resume_text, screening):
+        """Analysis dict for a resume rejected locally, shaped like CandidateAnalyzerAgent results"""
+        reason = f"Rejected by local pre-screening: relevance score {screening['score']} is below the floor of {self.floor}."
+        if screening["missing_skills"]:
+            reason += f" Missing key skills: {', '.join(screening['missing_skills'][:8])}."
+        contact = self.resume_parser.extract_contact_fields(resume_text)
+        return {
+            "name": contact["name"],
+            "email": contact["email"] or "",
+            "phone": contact["phone"] or "",
+            "skills_match_percentage": screening["skill_coverage"] or 0,
+            "experience_match_percentage": 0,
+            "overall_score": screening["score"],
+            "key_skills": screening["matched_skills"][:5],
+            "strengths": [],
+            "weaknesses": [f"No evidence of {skill}" for skill in screening["missing_skills"][:3]],
+            "recommendation": "Reject",
+            "auto_decision": {"status": "Rejected", "reason": reason, "needs_interview": False},
+            "prescreened": True
+        }
@@ -0,0 +1,327 @@
+# response_parsing.py
+import re
+import json
+import time
+import threading
+from dataclasses import dataclass, field, fields, asdict
+
+from agents.instrumentation import telemetry
+
+RECOMMENDATIONS = ["Strong Hire", "Potential Hire", "Consider for Different Role", "Reject"]
+
+# Longest slice of a malformed response sent back for repair
+MAX_REPAIR_CHARS = 12000
+
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about four characters per token for English text)"""
+    return len(text or "") // 4 + 1
+
+
+def usage_tokens(response, prompt):
+    """Input and output token counts from the response metadata, or estimated from the text"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    content = getattr(response, "content", "")
+    input_tokens = usage.get("input_tokens") or estimate_tokens(prompt if isinstance(prompt, str) else str(prompt))
+    output_tokens = usage.get("output_tokens") or estimate_tokens(content if isinstance(content, str) else str(content))
+    return input_tokens, output_tokens
+
+
+class ResponseParseError(ValueError):
+    """Raised when a model response does not contain usable JSON"""
+
+
+class ParseStats:
+    """Thread-safe counters of parse outcomes per response kind.
+
+    ``wasted_tokens`` estimates the tokens spent on responses that had to be
+    repaired or were discarded, plus the repair prompts themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, kind, outcome, wasted_tokens=0):
+        with self._lock:
+            counts = self._counts.setdefault(kind, {"parsed": 0, "repaired": 0, "failed": 0, "repair_calls": 0, "wasted_tokens": 0})
+            counts[outcome] += 1
+            counts["wasted_tokens"] += wasted_tokens
+
+    def snapshot(self):
+        """Per-kind counters plus a "total" entry"""
+        with self._lock:
+            result = {kind: dict(counts) for kind, counts in self._counts.items()}
+        total = {"parsed": 0, "repaired": 0, "failed": 0, "repair_calls": 0, "wasted_tokens": 0}
+        for counts in result.values():
+            for key in total:
+                total[key] += counts[key]
+        result["total"] = total
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+
+
+# Shared by every agent in the process
+parse_stats = ParseStats()
+
+
+def _balanced_end(text, start):
+    """Index just past the JSON value opening at text[start], or -1 if it never closes"""
+    closing = {"{": "}", "[": "]"}
+    stack = []
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in closing:
+            stack.append(closing[char])
+        elif char in "}]":
+            if not stack or stack.pop() != char:
+                return -1
+            if not stack:
+                return index + 1
+    return -1
+
+
+def extract_json(content):
+    """Return the first balanced JSON object or array in a model response.
+
+    Code fences and surrounding prose are ignored, and trailing commas are
+    tolerated. Raises ResponseParseError if nothing parses.
+    """
+    text = content if isinstance(content, str) else str(content or "")
+    start = 0
+    while True:
+        candidates = [index for index in (text.find("{", start), text.find("[", start)) if index != -1]
+        if not candidates:
+            raise ResponseParseError("No JSON found in response")
+        start = min(candidates)
+        end = _balanced_end(text, start)
+        if end != -1:
+            snippet = text[start:end]
+            for attempt in (snippet, _TRAILING_COMMA_PATTERN.sub(r"\1", snippet)):
+                try:
+                    return json.loads(attempt)
+                except json.JSONDecodeError:
+                    continue
+        start += 1
+
+
+def coerce_score(value):
+    """Turn 85, "85", "85%" or "85/100" into a number clamped to 0-100; None if there is no number"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        match = _NUMBER_PATTERN.search(str(value or ""))
+        if not match:
+            return None
+        number = float(match.group())
+    if number != number:
+        return None
+    number = min(max(number, 0.0), 100.0)
+    return int(number) if number.is_integer() else round(number, 1)
+
+
+def _coerce_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in re.split(r"[,;\n]", value) if item.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [str(value)]
+
+
+def _coerce_recommendation(value):
+    text = str(value or "").strip()
+    for recommendation in RECOMMENDATIONS:
+        if text.lower() == recommendation.lower():
+            return recommendation
+    return text
+
+
+@dataclass
+class CandidateAnalysis:
+    """Validated resume analysis as returned by the analyzer"""
+    overall_score: float
+    name: str = "Unknown"
+    email: str = ""
+    skills_match_percentage: float = 0
+    experience_match_percentage: float = 0
+    key_skills: list = field(default_factory=list)
+    strengths: list = field(default_factory=list)
+    weaknesses: list = field(default_factory=list)
+    recommendation: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ResponseParseError("Expected a JSON object")
+        overall_score = coerce_score(data.get("overall_score"))
+        if overall_score is None:
+            raise ResponseParseError("Missing or non-numeric overall_score")
+        return cls(
+            overall_score=overall_score,
+            name=str(data.get("name") or "Unknown").strip(),
+            email=str(data.get("email") or "").strip(),
+            skills_match_percentage=coerce_score(data.get("skills_match_percentage")) or 0,
+            experience_match_percentage=coerce_score(data.get("experience_match_percentage")) or 0,
+            key_skills=_coerce_list(data.get("key_skills")),
+            strengths=_coerce_list(data.get("strengths")),
+            weaknesses=_coerce_list(data.get("weaknesses")),
+            recommendation=_coerce_recommendation(data.get("recommendation"))
+        )
+
+
+@dataclass
+class SlotRecommendation:
+    slot_id: object
+    reasoning: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or data.get("slot_id") is None:
+            raise ResponseParseError("Missing slot_id")
+        slot_id = data["slot_id"]
+        if isinstance(slot_id, str) and slot_id.strip().isdigit():
+            slot_id = int(slot_id)
+        return cls(slot_id=slot_id, reasoning=str(data.get("reasoning") or ""))
+
+
+@dataclass
+class EmailDraft:
+    body: str
+    subject: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ResponseParseError("Expected a JSON object")
+        body = str(data.get("body") or "").strip()
+        if not body:
+            raise ResponseParseError("Missing email body")
+        return cls(body=body, subject=str(data.get("subject") or "").strip())
+
+
+def validate_analysis(data):
+    """Validate and coerce one analysis object into a plain dict"""
+    return asdict(CandidateAnalysis.from_dict(data))
+
+
+def validate_slot_recommendation(data):
+    return asdict(SlotRecommendation.from_dict(data))
+
+
+def validate_email(data):
+    return asdict(EmailDraft.from_dict(data))
+
+
+def validate_list(data):
+    if not isinstance(data, list):
+        raise ResponseParseError("Expected a JSON array")
+    return data
+
+
+def schema_description(schema):
+    """Field list of a dataclass schema, used in repair prompts"""
+    return ", ".join(schema_field.name for schema_field in fields(schema))
+
+
+def _repair_prompt(content, error, schema_hint):
+    return f"""
+        The following model output should have been valid JSON but could not be used ({error}).
+        Expected: {schema_hint}
+
+        Fix it and return ONLY the corrected JSON, without any other text. Do not invent missing content beyond what the output implies.
+
+        OUTPUT:
+        {content[:MAX_REPAIR_CHARS]}
+        """
+
+
+def _parse_first(content, validator, kind):
+    """(result, None) when the response parses and validates, else (None, the error)"""
+    start = time.perf_counter()
+    try:
+        data = extract_json(content)
+        result = validator(data) if validator is not None else data
+        parse_stats.record(kind, "parsed")
+        telemetry.record("json_parsing", time.perf_counter() - start, kind=kind)
+        return result, None
+    except (ResponseParseError, TypeError, ValueError) as e:
+        telemetry.record("json_parsing", time.perf_counter() - start, error=True, kind=kind)
+        return None, e
+
+
+def _start_repair(content, error, kind, schema_hint):
+    """Count a repair call and return its prompt"""
+    repair_prompt = _repair_prompt(str(content), error, schema_hint)
+    parse_stats.record(kind, "repair_calls", estimate_tokens(repair_prompt))
+    telemetry.increment("retries", kind="json_repair")
+    return repair_prompt
+
+
+def _finish_repair(content, repaired, validator, kind):
+    data = extract_json(repaired)
+    result = validator(data) if validator is not None else data
+    parse_stats.record(kind, "repaired", estimate_tokens(content))
+    return result
+
+
+def _parse_failed(content, error, kind):
+    parse_stats.record(kind, "failed", estimate_tokens(content))
+    return ResponseParseError(f"Could not parse {kind} response: {error}")
+
+
+def parse_response(content, validator=None, kind="response", llm=None, schema_hint="a JSON object"):
+    """Extract and validate JSON from a model response.
+
+    If that fails and an ``llm`` is given, it is asked once to repair the
+    output, which only resends the broken response rather than the original
+    prompt. Outcomes are counted in ``parse_stats``. Raises ResponseParseError
+    when the response cannot be used.
+    """
+    result, error = _parse_first(content, validator, kind)
+    if error is None:
+        return result
+    if llm is not None:
+        try:
+            repaired = llm.invoke(_start_repair(content, error, kind, schema_hint)).content
+            return _finish_repair(content, repaired, validator, kind)
+        except Exception as e:
+            error = e
+    raise _parse_failed(content, error, kind)
+
+
+async def aparse_response(content, validator=None, kind="response", llm=None, schema_hint="a JSON object"):
+    """``parse_response`` that awaits the repair call instead of blocking on it"""
+    # llm_client imports this module
+    from agents.llm_client import ainvoke_llm
+
+    result, error = _parse_first(content, validator, kind)
+    if error is None:
+        return result
+    if llm is not None:
+        try:
+            repaired = (await ainvoke_llm(llm, _start_repair(content, error, kind, schema_hint))).content
+            return _finish_repair(content, repaired, validator, kind)
+        except Exception as e:
+            error = e
+    raise _parse_failed(content, error, kind)
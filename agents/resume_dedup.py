@@ -0,0 +1,207 @@
+# resume_dedup.py
+import re
+import zlib
+import threading
+
+import numpy as np
+
+from agents.hr_repository import content_hash
+
+# Word shingles; five words survive small edits while still telling different resumes apart
+SHINGLE_SIZE = 5
+# 128 MinHash values split into 16 LSH bands of 8 rows: pairs at a Jaccard similarity of 0.8 share
+# at least one band about 95% of the time, pairs at 0.5 only about 6% of the time
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+# Lower thresholds need more, shorter bands; the fewest bands that find at least this share of
+# pairs at the threshold are used (32 bands of 4 rows at 0.75, 64 bands of 2 rows at 0.5)
+MIN_LSH_RECALL = 0.9
+# Estimated Jaccard similarity at which a resume counts as a near-duplicate
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+# Hash functions are (a * x + b) mod p over 31-bit shingle hashes, which fits in 64-bit integers
+_MERSENNE_PRIME = (1 << 31) - 1
+# Fixed seed so signatures stored in the database stay comparable across runs
+_PERMUTATION_SEED = 1
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+_random = np.random.RandomState(_PERMUTATION_SEED)
+_PERMUTATION_A = _random.randint(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingle_hashes(text, shingle_size=SHINGLE_SIZE):
+    """Distinct 31-bit hashes of the word shingles of text, ignoring case, punctuation and layout"""
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[index:index + shingle_size]) for index in range(len(words) - shingle_size + 1)]
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64,
+                         count=len(shingles))
+    return np.unique(hashes % _MERSENNE_PRIME)
+
+
+def minhash_signature(text):
+    """MinHash signature of a resume as a uint32 array of NUM_PERMUTATIONS values"""
+    hashes = shingle_hashes(text)
+    if not len(hashes):
+        return np.full(NUM_PERMUTATIONS, _MERSENNE_PRIME, dtype=np.uint32)
+    # One row per permutation; the minimum over each row is that permutation's MinHash value
+    permuted = (_PERMUTATION_A[:, None] * hashes[None, :] + _PERMUTATION_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_recall(similarity, bands, num_permutations=NUM_PERMUTATIONS):
+    """Probability that two resumes with this Jaccard similarity share at least one of ``bands`` bands"""
+    rows = num_permutations // bands
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+def bands_for_threshold(threshold, num_permutations=NUM_PERMUTATIONS, min_bands=LSH_BANDS):
+    """Fewest bands (at least ``min_bands``) whose LSH recall at the threshold reaches MIN_LSH_RECALL"""
+    bands = min_bands
+    while bands < num_permutations and band_recall(threshold, bands, num_permutations) < MIN_LSH_RECALL:
+        bands *= 2
+    return bands
+
+
+def estimated_similarity(signature, other):
+    """Estimated Jaccard similarity of two resumes: the share of equal MinHash values"""
+    return float(np.count_nonzero(signature == other)) / len(signature)
+
+
+class LSHIndex:
+    """Locality-sensitive hashing index over MinHash signatures.
+
+    Each signature is cut into bands and every band is a key into its own
+    hash table, so a query only compares against resumes sharing a band
+    instead of the whole archive.
+    """
+
+    def __init__(self, bands=LSH_BANDS, num_permutations=NUM_PERMUTATIONS):
+        if num_permutations % bands:
+            raise Exception(f"{num_permutations} permutations cannot be split into {bands} bands")
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self._tables = [{} for _ in range(bands)]
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def items(self):
+        """(key, signature) pairs of every indexed resume"""
+        return self._signatures.items()
+
+    def _band_keys(self, signature):
+        return [hash(signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, key, signature):
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for table, band_key in zip(self._tables, self._band_keys(signature)):
+            bucket = table.get(band_key)
+            if bucket is None:
+                table[band_key] = [key]
+            else:
+                bucket.append(key)
+
+    def candidates(self, signature):
+        """Keys sharing at least one band with the signature"""
+        found = set()
+        for table, band_key in zip(self._tables, self._band_keys(signature)):
+            found.update(table.get(band_key, ()))
+        return found
+
+    def query(self, signature, threshold=DEFAULT_DUPLICATE_THRESHOLD):
+        """[(key, estimated similarity)] at or above the threshold, most similar first"""
+        matches = []
+        for key in self.candidates(signature):
+            similarity = estimated_similarity(signature, self._signatures[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda match: -match[1])
+
+
+class ResumeDeduplicator:
+    """Finds resumes that are near-duplicates of ones already seen, across uploads and job descriptions.
+
+    Resumes are keyed by their content hash, as in HRRepository. With a
+    repository, stored signatures are loaded into the LSH index on first use,
+    and new ones are written back by ``flush``. A threshold too low for the
+    index's bands is served by a finer-banded index, built on first use from
+    the same signatures (see bands_for_threshold).
+    """
+
+    def __init__(self, repository=None, threshold=DEFAULT_DUPLICATE_THRESHOLD, bands=LSH_BANDS):
+        self.repository = repository
+        self.threshold = threshold
+        self.index = LSHIndex(bands)
+        # Band count -> index; every index holds the same signatures
+        self._indexes = {bands: self.index}
+        self._pending = []
+        self._loaded = repository is None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        for resume_hash, signature in self.repository.iter_resume_signatures():
+            self.index.add(resume_hash, np.frombuffer(signature, dtype=np.uint32))
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self.index)
+
+    def _index_for(self, threshold):
+        bands = bands_for_threshold(threshold, min_bands=self.index.bands)
+        index = self._indexes.get(bands)
+        if index is None:
+            index = LSHIndex(bands)
+            for key, signature in self.index.items():
+                index.add(key, signature)
+            self._indexes[bands] = index
+        return index
+
+    def check(self, resume_text, threshold=None):
+        """Look up near-duplicates of a resume, then add it to the index.
+
+        ``threshold`` overrides the deduplicator's own for this lookup only.
+        Returns {"resume_hash", "duplicate_of", "similarity"}; ``duplicate_of`` is
+        the content hash of the most similar earlier resume, or None.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        resume_hash = content_hash(resume_text)
+        signature = minhash_signature(resume_text)
+        with self._lock:
+            self._ensure_loaded()
+            matches = [(key, similarity) for key, similarity in self._index_for(threshold).query(signature, threshold)
+                       if key != resume_hash]
+            if resume_hash not in self.index:
+                for index in self._indexes.values():
+                    index.add(resume_hash, signature)
+                self._pending.append((resume_hash, signature.tobytes()))
+
+        duplicate_of, similarity = matches[0] if matches else (None, None)
+        return {"resume_hash": resume_hash, "duplicate_of": duplicate_of, "similarity": similarity}
+
+    def stored_analysis(self, resume_hash, job_description):
+        """Analysis already stored for an earlier resume and this job description, or None"""
+        if self.repository is None:
+            return None
+        return self.repository.get_analysis_by_hash(resume_hash, job_description)
+
+    def flush(self):
+        """Write the signatures added since the last flush to the repository"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending and self.repository is not None:
+            self.repository.save_resume_signatures(pending)
+        return len(pending)
@@ -1,47 +1,205 @@
 # resume_parser_agent.py
+import io
+import os
+import threading
+from collections import deque
 import PyPDF2
-import re
+from concurrent.futures import ProcessPoolExecutor
+from agents.instrumentation import traced
+from agents.contact_extraction import (
+    UNKNOWN_NAME, extract_contact_fields, extract_contacts_batch, first_email, first_phone, name_candidates, name_from_filename
+)
+from agents.text_compaction import (
+    DEFAULT_RESUME_TOKEN_BUDGET, PAGE_BREAK, clean_lines, compact_resume, compact_job_description, segment_sections
+)
+
+# Analysis only needs the first pages of a resume; anything past these budgets is skipped
+DEFAULT_MAX_PAGES = 8
+DEFAULT_MAX_CHARS = 30000
+# Only long documents (with a page budget raised to match) are split across processes: every chunk process
+# re-parses the whole PDF, which costs more than it saves on a short resume
+PARALLEL_PAGE_THRESHOLD = 20
+PAGES_PER_CHUNK = 8
+# Processes in the shared page-decoding pool, which is also the number of chunks decoded at once
+PAGE_DECODE_WORKERS = min(4, os.cpu_count() or 1)
+# Nesting depth of Form XObjects searched for fonts
+MAX_XOBJECT_DEPTH = 3
+
+
+def _has_fonts(resources, depth=0):
+    """Whether a resource dictionary, or a Form XObject it draws, declares fonts"""
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    if "/Font" in resources:
+        return True
+    xobjects = resources.get("/XObject")
+    if xobjects is None or depth >= MAX_XOBJECT_DEPTH:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Form" and _has_fonts(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+def _page_has_text_layer(page):
+    """Cheap check for pages that carry no fonts (scanned images), which cannot yield text"""
+    return _has_fonts(page.get("/Resources"))
+
+
+_page_pool = {"executor": None}
+_page_pool_lock = threading.Lock()
+
+
+def _page_decode_pool():
+    """Long-lived process pool for page chunks, shared by every parser in this process"""
+    with _page_pool_lock:
+        if _page_pool["executor"] is None:
+            _page_pool["executor"] = ProcessPoolExecutor(max_workers=PAGE_DECODE_WORKERS)
+        return _page_pool["executor"]
+
+
+def _decode_page_chunk(pdf_bytes, page_numbers):
+    """Process-pool entry point: extract the text of several pages from raw PDF bytes"""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    texts = []
+    for page_num in page_numbers:
+        page = pdf_reader.pages[page_num]
+        texts.append(page.extract_text() if _page_has_text_layer(page) else "")
+    return texts
+
 
 class ResumeParserAgent:
-    def __init__(self):
-        pass
+    def __init__(self, max_pages=DEFAULT_MAX_PAGES, max_chars=DEFAULT_MAX_CHARS, token_budget=DEFAULT_RESUME_TOKEN_BUDGET,
+                 parallel_page_threshold=PARALLEL_PAGE_THRESHOLD):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.token_budget = token_budget
+        self.parallel_page_threshold = parallel_page_threshold
+    
+    def iter_page_texts(self, pdf_file, max_pages=None, max_chars=None):
+        """Lazily yield the text of each page, stopping once the page or character budget is spent"""
+        max_pages = self.max_pages if max_pages is None else max_pages
+        max_chars = self.max_chars if max_chars is None else max_chars
+        return self._iter_reader_pages(PyPDF2.PdfReader(pdf_file), max_pages, max_chars)
+    
+    def _iter_reader_pages(self, pdf_reader, max_pages, max_chars):
+        total_chars = 0
+    
+        for page_num, page in enumerate(pdf_reader.pages):
+            if max_pages and page_num >= max_pages:
+                break
+            if not _page_has_text_layer(page):
+                continue
+    
+            page_text = page.extract_text() or ""
+            if max_chars and total_chars + len(page_text) > max_chars:
+                yield page_text[:max_chars - total_chars]
+                break
+    
+            total_chars += len(page_text)
+            yield page_text
+    
+    @traced("pdf_extraction")
+    def extract_text_from_pdf(self, pdf_file, max_pages=None, max_chars=None, parallel=True):
+        """Extract text content from a PDF file, up to the configured page and character budgets"""
+        max_pages = self.max_pages if max_pages is None else max_pages
+        max_chars = self.max_chars if max_chars is None else max_chars
     
-    def extract_text_from_pdf(self, pdf_file):
-        """Extract text content from a PDF file"""
         try:
+            # The reader is opened once; it only parses the page tree here, page content is decoded lazily
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page_num in range(len(pdf_reader.pages)):
-                text += pdf_reader.pages[page_num].extract_text()
-            return text
+            if parallel:
+                page_count = len(pdf_reader.pages)
+                pages_to_decode = min(page_count, max_pages) if max_pages else page_count
+                if self._should_split(pages_to_decode, max_pages):
+                    pdf_file.seek(0)
+                    return self._extract_text_parallel(pdf_file.read(), pages_to_decode, max_chars)
+    
+            # Page breaks are kept so compaction can tell running headers and footers from body text
+            return PAGE_BREAK.join(self._iter_reader_pages(pdf_reader, max_pages, max_chars))
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
+    def _should_split(self, pages_to_decode, max_pages):
+        """Split only documents with at least the threshold number of pages to decode, into several chunks"""
+        return pages_to_decode >= self.parallel_page_threshold and pages_to_decode > PAGES_PER_CHUNK
+    
+    def _extract_text_parallel(self, pdf_bytes, page_count, max_chars):
+        """Decode page chunks of a large PDF on the shared process pool and join them in page order.
+        
+        At most PAGE_DECODE_WORKERS chunks are in flight; the next one is only
+        submitted as the earliest finishes, so once the character budget is
+        spent no further chunks are decoded.
+        """
+        chunks = deque(list(range(start, min(start + PAGES_PER_CHUNK, page_count)))
+                       for start in range(0, page_count, PAGES_PER_CHUNK))
+        executor = _page_decode_pool()
+        in_flight = deque()
+        while chunks and len(in_flight) < PAGE_DECODE_WORKERS:
+            in_flight.append(executor.submit(_decode_page_chunk, pdf_bytes, chunks.popleft()))
+    
+        page_texts = []
+        total_chars = 0
+        try:
+            while in_flight:
+                page_chunk = in_flight.popleft().result()
+                if chunks:
+                    in_flight.append(executor.submit(_decode_page_chunk, pdf_bytes, chunks.popleft()))
+                for page_text in page_chunk:
+                    if not page_text:
+                        continue
+                    if max_chars and total_chars + len(page_text) > max_chars:
+                        page_texts.append(page_text[:max_chars - total_chars])
+                        return PAGE_BREAK.join(page_texts)
+                    total_chars += len(page_text)
+                    page_texts.append(page_text)
+        finally:
+            for future in in_flight:
+                future.cancel()
+    
+        return PAGE_BREAK.join(page_texts)
+    
+    @traced("compaction")
+    def compact_text(self, text, token_budget=None):
+        """Prepare resume text for an LLM prompt: clean it up and trim it to the token budget"""
+        token_budget = self.token_budget if token_budget is None else token_budget
+        return compact_resume(text, token_budget)
+    
+    def segment_sections(self, text):
+        """Split resume text into a {section: text} dict (experience, skills, education, ...)"""
+        sections = {}
+        for section, section_lines in segment_sections(clean_lines(text)):
+            sections.setdefault(section, []).extend(section_lines)
+        return {section: "\n".join(section_lines) for section, section_lines in sections.items()}
+    
+    def compact_job_description(self, job_description):
+        """Job description cleaned up for prompts; computed once per distinct text"""
+        return compact_job_description(job_description)
+    
     def extract_email(self, text):
         """Extract email address from text using regex"""
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        emails = re.findall(email_pattern, text)
-        return emails[0] if emails else None
+        return first_email(text)
     
     def extract_phone(self, text):
         """Extract phone number from text using regex"""
-        # This pattern catches most US/international phone formats
-        phone_pattern = r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-        phones = re.findall(phone_pattern, text)
-        return phones[0] if phones else None
+        return first_phone(text)
     
     def extract_name(self, text, fallback_filename=""):
         """Attempt to extract candidate name from the beginning of the resume"""
         # Usually names appear at the top, often on their own line
-        lines = text.split('\n')
-        # Check first few non-empty lines for potential names (simple heuristic)
-        for line in lines[:5]:
-            line = line.strip()
-            if line and len(line.split()) <= 4 and not any(char.isdigit() for char in line):
-                return line
-                
-        # If we can't find a name, use the filename without extension as fallback
-        if fallback_filename:
-            return fallback_filename.split('.')[0].replace('_', ' ').title()
+        candidates = name_candidates(text)
+        if candidates:
+            return candidates[0]
         
-        return "Unknown Candidate"
\ No newline at end of file
+        # If we can't find a name, use the filename without extension as fallback
+        return name_from_filename(fallback_filename) or UNKNOWN_NAME
+    
+    def extract_contact_fields(self, text, fallback_filename=""):
+        """Name, email, phone, LinkedIn and GitHub found locally in one resume"""
+        return extract_contact_fields(text, fallback_filename)
+    
+    def extract_contacts_batch(self, texts, fallback_filenames=None):
+        """Contact records for a list (or pandas Series) of resume texts"""
+        return extract_contacts_batch(texts, fallback_filenames)
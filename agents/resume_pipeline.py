@@ -0,0 +1,200 @@
+# resume_pipeline.py
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from agents.resume_parser_agent import ResumeParserAgent
+from agents.candidate_analyzer_agent import DEFAULT_BATCH_TOKEN_BUDGET
+from agents.instrumentation import telemetry
+
+
+def _extract_text_worker(file_bytes):
+    """Process-pool entry point: extract text from the raw bytes of a PDF.
+
+    Pages are decoded serially: the extraction pool already spreads files
+    over the cores, and a pool inside a pool worker would only compete with
+    it. Returns (text, seconds taken); telemetry is not collected from
+    worker processes, so the parent records the timing.
+    """
+    start = time.perf_counter()
+    text = ResumeParserAgent().extract_text_from_pdf(io.BytesIO(file_bytes), parallel=False)
+    return text, time.perf_counter() - start
+
+
+def _read_file_bytes(file):
+    """Return the full contents of an uploaded file object as bytes"""
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+
+class ResumeProcessingPipeline:
+    """Bounded-concurrency resume pipeline: PDF extraction on a process pool,
+    LLM analysis on a thread pool with a fixed number of in-flight requests."""
+
+    def __init__(self, candidate_analyzer, max_concurrent_analyses=4, extraction_workers=None,
+                 batch_analysis=False, max_batch_tokens=DEFAULT_BATCH_TOKEN_BUDGET, analysis_lookup=None,
+                 resume_compactor=None, job_description_compactor=None, prescreener=None, deduplicator=None,
+                 duplicate_threshold=None):
+        self.candidate_analyzer = candidate_analyzer
+        self.max_concurrent_analyses = max(1, int(max_concurrent_analyses))
+        self.extraction_workers = extraction_workers
+        self.batch_analysis = batch_analysis
+        self.max_batch_tokens = max_batch_tokens
+        # Optional callable (resume_text, job_description) -> stored analysis or None
+        self.analysis_lookup = analysis_lookup
+        # Optional callables that shrink resume and job description text before it goes into a prompt
+        self.resume_compactor = resume_compactor
+        self.job_description_compactor = job_description_compactor
+        # Optional PreScreener; resumes below its floor are rejected locally without an LLM call
+        self.prescreener = prescreener
+        # Optional ResumeDeduplicator; near-duplicates of earlier resumes reuse their stored analysis
+        self.deduplicator = deduplicator
+        # Similarity threshold for this run; None uses the deduplicator's own
+        self.duplicate_threshold = duplicate_threshold
+
+    def process(self, files, job_description):
+        """Process uploaded resumes, yielding one result dict per file as soon as it finishes.
+
+        Results arrive in completion order, not upload order. Each result has the keys
+        ``file_name``, ``resume_text``, ``analysis``, ``error`` (None on success) and
+        ``duplicate`` (the deduplicator's match for a near-duplicate resume, else None).
+        """
+        files = list(files)
+        if not files:
+            return
+
+        try:
+            yield from self._process(files, job_description)
+        finally:
+            if self.deduplicator is not None:
+                self.deduplicator.flush()
+
+    def _process(self, files, job_description):
+        # Compacted once per run; stored analyses stay keyed by the original text
+        prompt_job_description = job_description
+        if self.job_description_compactor is not None:
+            prompt_job_description = self.job_description_compactor(job_description)
+
+        with ProcessPoolExecutor(max_workers=self.extraction_workers) as extract_pool, \
+                ThreadPoolExecutor(max_workers=self.max_concurrent_analyses) as analyze_pool:
+            extract_futures = {}
+            for file in files:
+                try:
+                    future = extract_pool.submit(_extract_text_worker, _read_file_bytes(file))
+                except Exception as e:
+                    yield {"file_name": file.name, "resume_text": None, "analysis": None, "error": e, "duplicate": None}
+                    continue
+                extract_futures[future] = file.name
+
+            # Analysis futures map to the list of (file_name, resume_text, duplicate) they cover
+            analyze_futures = {}
+            # Extracted resumes waiting to be packed into a batch
+            batch_buffer = []
+            pending = set(extract_futures)
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future in extract_futures:
+                        file_name = extract_futures.pop(future)
+                        try:
+                            resume_text, extraction_seconds = future.result()
+                            telemetry.record("pdf_extraction", extraction_seconds, worker="process")
+                        except Exception as e:
+                            telemetry.increment("stage_failures", stage="pdf_extraction")
+                            yield {"file_name": file_name, "resume_text": None, "analysis": None, "error": e, "duplicate": None}
+                            continue
+
+                        # Analyses that are already stored are never recomputed
+                        if self.analysis_lookup is not None:
+                            with telemetry.span("analysis_lookup"):
+                                stored_analysis = self.analysis_lookup(resume_text, job_description)
+                            if stored_analysis is not None:
+                                yield {"file_name": file_name, "resume_text": resume_text, "analysis": stored_analysis, "error": None, "duplicate": None}
+                                continue
+
+                        # A near-duplicate of an earlier resume reuses that resume's analysis for this job description
+                        duplicate = None
+                        if self.deduplicator is not None:
+                            with telemetry.span("deduplication"):
+                                match = self.deduplicator.check(resume_text, self.duplicate_threshold)
+                            if match["duplicate_of"] is not None:
+                                duplicate = match
+                                duplicate_analysis = self.deduplicator.stored_analysis(match["duplicate_of"], job_description)
+                                duplicate["reused_analysis"] = duplicate_analysis is not None
+                                if duplicate_analysis is not None:
+                                    yield {"file_name": file_name, "resume_text": resume_text, "analysis": duplicate_analysis, "error": None, "duplicate": duplicate}
+                                    continue
+
+                        if self.prescreener is not None:
+                            with telemetry.span("prescreening"):
+                                screening = self.prescreener.screen(resume_text)
+                            if not screening["passed"]:
+                                analysis = self.prescreener.rejection_analysis(resume_text, screening)
+                                yield {"file_name": file_name, "resume_text": resume_text, "analysis": analysis, "error": None, "duplicate": duplicate}
+                                continue
+
+                        prompt_text = resume_text
+                        if self.resume_compactor is not None:
+                            prompt_text = self.resume_compactor(resume_text)
+
+                        if self.batch_analysis:
+                            batch_buffer.append((file_name, resume_text, prompt_text, duplicate))
+                            continue
+
+                        # Hand the text over to the LLM stage
+                        analysis_future = analyze_pool.submit(
+                            self.candidate_analyzer.analyze_resume,
+                            prompt_text,
+                            prompt_job_description
+                        )
+                        analyze_futures[analysis_future] = [(file_name, resume_text, duplicate)]
+                        pending.add(analysis_future)
+                    else:
+                        entries = analyze_futures.pop(future)
+                        try:
+                            analyses = future.result()
+                            if not self.batch_analysis:
+                                analyses = [analyses]
+                        except Exception as e:
+                            analyses = [e] * len(entries)
+
+                        for (file_name, resume_text, duplicate), analysis in zip(entries, analyses):
+                            if isinstance(analysis, Exception):
+                                yield {"file_name": file_name, "resume_text": resume_text, "analysis": None, "error": analysis, "duplicate": duplicate}
+                            else:
+                                yield {"file_name": file_name, "resume_text": resume_text, "analysis": analysis, "error": None, "duplicate": duplicate}
+
+                if batch_buffer:
+                    extraction_finished = not extract_futures
+                    for batch_entries in self._take_full_batches(batch_buffer, prompt_job_description, extraction_finished):
+                        batch_future = analyze_pool.submit(
+                            self.candidate_analyzer.analyze_resumes_batch,
+                            [prompt_text for _, _, prompt_text, _ in batch_entries],
+                            prompt_job_description,
+                            self.max_batch_tokens
+                        )
+                        analyze_futures[batch_future] = [(file_name, resume_text, duplicate) for file_name, resume_text, _, duplicate in batch_entries]
+                        pending.add(batch_future)
+
+    def _take_full_batches(self, batch_buffer, job_description, flush):
+        """Remove and return the batches that are ready to send from the buffer.
+
+        A batch is ready once a later resume no longer fits alongside it; when
+        ``flush`` is set every buffered resume is sent.
+        """
+        batches = self.candidate_analyzer.plan_batches(
+            [prompt_text for _, _, prompt_text, _ in batch_buffer],
+            job_description,
+            self.max_batch_tokens
+        )
+        if not flush:
+            batches = batches[:-1]
+
+        ready = [[batch_buffer[index] for index in batch] for batch in batches]
+        taken = sum(len(batch) for batch in batches)
+        del batch_buffer[:taken]
+        return ready
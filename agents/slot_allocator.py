@@ -0,0 +1,119 @@
+# slot_allocator.py
+import heapq
+from datetime import datetime
+
+_TIME_FORMATS = ("%I:%M %p", "%I %p", "%H:%M", "%I:%M%p")
+
+
+def slot_datetime(slot):
+    """Parse a slot's date and time into a datetime; unparseable slots sort last"""
+    for time_format in _TIME_FORMATS:
+        try:
+            return datetime.strptime(f"{slot['date']} {str(slot['time']).strip().upper()}", f"%Y-%m-%d {time_format}")
+        except (ValueError, KeyError):
+            continue
+    return datetime.max
+
+
+def by_priority(candidates, score_key="overall_score"):
+    """Candidates sorted by descending score; missing or non-numeric scores go last"""
+    def score(candidate):
+        try:
+            value = float(candidate.get(score_key) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+        return value if value == value else 0.0
+    return sorted(candidates, key=lambda candidate: -score(candidate))
+
+
+def _normalize_skill(skill):
+    return str(skill).strip().lower()
+
+
+class SlotAllocator:
+    """Deterministic interview slot assignment without LLM calls.
+
+    Free slots are kept in a min-heap keyed by (datetime, interviewer, id), plus
+    one heap per interviewer skill when slots carry ``interviewer_skills``.
+    Candidates are served in descending score order: each gets the earliest
+    slot whose interviewer shares one of their key skills, or else the earliest
+    free slot. Taken slots are dropped lazily from the heaps.
+    """
+
+    def __init__(self, slots):
+        self._slots_by_id = {}
+        self._free_heap = []
+        self._skill_heaps = {}
+        self._taken = set()
+
+        for slot in slots:
+            if not slot.get("available", True):
+                continue
+            key = (slot_datetime(slot), str(slot.get("interviewer") or ""), slot["id"])
+            self._slots_by_id[slot["id"]] = slot
+            self._free_heap.append(key)
+            for skill in slot.get("interviewer_skills") or []:
+                self._skill_heaps.setdefault(_normalize_skill(skill), []).append(key)
+
+        heapq.heapify(self._free_heap)
+        for heap in self._skill_heaps.values():
+            heapq.heapify(heap)
+
+    def __len__(self):
+        return len(self._slots_by_id) - len(self._taken)
+
+    def _peek(self, heap):
+        """Earliest still-free slot key in a heap, discarding taken ones"""
+        while heap and heap[0][2] in self._taken:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def take_earliest(self, skills=None):
+        """Reserve and return the best free slot for a candidate with the given skills, or None"""
+        best = None
+        for skill in skills or []:
+            heap = self._skill_heaps.get(_normalize_skill(skill))
+            if heap:
+                key = self._peek(heap)
+                if key is not None and (best is None or key < best):
+                    best = key
+
+        if best is None:
+            best = self._peek(self._free_heap)
+        if best is None:
+            return None
+
+        return self.take(best[2])
+
+    def free_slots(self):
+        """Free slots in (datetime, interviewer) order"""
+        return [self._slots_by_id[key[2]] for key in sorted(self._free_heap) if key[2] not in self._taken]
+
+    def take(self, slot_id):
+        """Reserve a specific free slot by id; returns the slot, or None if it is unknown or taken"""
+        if slot_id not in self._slots_by_id or slot_id in self._taken:
+            return None
+        self._taken.add(slot_id)
+        slot = self._slots_by_id[slot_id]
+        slot["available"] = False
+        return slot
+
+    def release(self, slot_id):
+        """Return a previously taken slot to the pool"""
+        if slot_id in self._taken:
+            self._taken.discard(slot_id)
+            slot = self._slots_by_id[slot_id]
+            slot["available"] = True
+            key = (slot_datetime(slot), str(slot.get("interviewer") or ""), slot_id)
+            heapq.heappush(self._free_heap, key)
+            for skill in slot.get("interviewer_skills") or []:
+                heapq.heappush(self._skill_heaps.setdefault(_normalize_skill(skill), []), key)
+
+    def allocate(self, candidates, score_key="overall_score", skills_key="key_skills"):
+        """Assign slots to a batch of candidates in one pass, highest score first.
+
+        Candidates are dicts; returns (candidate, slot_or_None) pairs in priority
+        order. Assigned slots are marked unavailable in place.
+        """
+        return [(candidate, self.take_earliest(candidate.get(skills_key)))
+                for candidate in by_priority(candidates, score_key)]
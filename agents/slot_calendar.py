@@ -0,0 +1,162 @@
+# slot_calendar.py
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+SLOT_FIELDS = ["id", "date", "time", "interviewer", "interviewer_skills", "available"]
+
+
+def _slot_key(slot_date, slot_time, interviewer):
+    """Duplicate-detection key: same day, same time (case/space-insensitive), same interviewer"""
+    return (slot_date, " ".join(str(slot_time).upper().split()), (interviewer or "").strip().lower())
+
+
+def parse_skills(value):
+    """Interviewer skills as a list, from a comma-separated string or any iterable"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [skill.strip() for skill in value if skill and skill.strip()]
+
+
+def _date_str(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+class SlotCalendar:
+    """Interview slots stored column by column.
+
+    Slots may list the interviewer's skills, which SlotAllocator uses to match
+    candidates with interviewers. A set of (date, time, interviewer) keys rejects duplicates in O(1), so
+    generating tens of thousands of slots stays linear. With a repository,
+    new slots get their IDs from the database, whose unique key also drops
+    slots another session added first, and bookings only succeed for slots
+    that are still free in the database; ``refresh`` reloads other sessions'
+    slots. Without one, IDs come from a monotonic counter.
+    """
+
+    def __init__(self, slots=None, repository=None):
+        self.repository = repository
+        self._load(slots or [])
+
+    def _load(self, slots):
+        self._columns = {field: [] for field in SLOT_FIELDS}
+        self._positions = {}
+        self._keys = set()
+        self._next_id = 1
+
+        for slot in slots:
+            self._append(slot["id"], slot["date"], slot["time"], slot.get("interviewer"),
+                         parse_skills(slot.get("interviewer_skills")), bool(slot.get("available", True)))
+
+    def refresh(self):
+        """Reload every slot and its availability from the repository"""
+        if self.repository is not None:
+            self._load(self.repository.list_slots())
+
+    def _append(self, slot_id, slot_date, slot_time, interviewer, interviewer_skills, available):
+        self._positions[slot_id] = len(self._columns["id"])
+        self._keys.add(_slot_key(slot_date, slot_time, interviewer))
+        for field, value in zip(SLOT_FIELDS, (slot_id, slot_date, slot_time, interviewer, interviewer_skills, available)):
+            self._columns[field].append(value)
+        self._next_id = max(self._next_id, slot_id + 1)
+
+    def __len__(self):
+        return len(self._columns["id"])
+
+    def __contains__(self, slot):
+        slot_date, slot_time, interviewer = slot
+        return _slot_key(_date_str(slot_date), slot_time, interviewer) in self._keys
+
+    def add_slots(self, slots):
+        """Add (date, time, interviewer) or (date, time, interviewer, interviewer_skills) tuples, skipping
+        duplicates; returns the new slot dicts"""
+        new_slots = []
+        keys = set()
+        for slot in slots:
+            slot_date, slot_time, interviewer = slot[:3]
+            interviewer_skills = parse_skills(slot[3]) if len(slot) > 3 else []
+            slot_date = _date_str(slot_date)
+            slot_time = " ".join(str(slot_time).split())
+            interviewer = (interviewer or "").strip() or None
+            key = _slot_key(slot_date, slot_time, interviewer)
+            if not slot_time or key in self._keys or key in keys:
+                continue
+            keys.add(key)
+            new_slots.append({"date": slot_date, "time": slot_time, "interviewer": interviewer,
+                              "interviewer_skills": interviewer_skills, "available": True})
+
+        if self.repository is not None:
+            slot_ids = self.repository.add_slots(new_slots) if new_slots else []
+        else:
+            slot_ids = range(self._next_id, self._next_id + len(new_slots))
+        added = []
+        for slot_id, slot in zip(slot_ids, new_slots):
+            # None: another session stored the same slot first; it appears on the next refresh
+            if slot_id is not None:
+                self._append(slot_id, slot["date"], slot["time"], slot["interviewer"], slot["interviewer_skills"], True)
+                added.append(self._record(self._positions[slot_id]))
+        return added
+
+    def add_slot(self, slot_date, slot_time, interviewer=None, interviewer_skills=None):
+        """Add one slot; returns it, or None if it already exists"""
+        new_slots = self.add_slots([(slot_date, slot_time, interviewer, interviewer_skills)])
+        return new_slots[0] if new_slots else None
+
+    def add_range(self, start_date, days, times, interviewers=None, interviewer_skills=None):
+        """Bulk-generate slots for every day x time x interviewer combination.
+
+        ``interviewer_skills`` optionally maps interviewer names to their skills.
+        """
+        interviewers = [interviewer for interviewer in (interviewers or []) if interviewer] or [None]
+        interviewer_skills = interviewer_skills or {}
+        day_strings = [_date_str(start_date + timedelta(days=day)) for day in range(days)]
+        return self.add_slots(
+            (day, slot_time, interviewer, interviewer_skills.get(interviewer))
+            for day in day_strings
+            for slot_time in times
+            for interviewer in interviewers
+        )
+
+    def book(self, slot_ids):
+        """Mark slots taken if they are still free (in the repository, when there is one); returns the booked IDs"""
+        slot_ids = [slot_id for slot_id in dict.fromkeys(slot_ids) if slot_id in self._positions]
+        if self.repository is not None:
+            booked = self.repository.book_slots(slot_ids)
+        else:
+            booked = [slot_id for slot_id in slot_ids if self._columns["available"][self._positions[slot_id]]]
+        # Slots another session booked first are taken as well
+        for slot_id in slot_ids:
+            self._columns["available"][self._positions[slot_id]] = False
+        return booked
+
+    def set_available(self, slot_ids, available):
+        """Mark several slots available or taken"""
+        slot_ids = [slot_id for slot_id in slot_ids if slot_id in self._positions]
+        for slot_id in slot_ids:
+            self._columns["available"][self._positions[slot_id]] = bool(available)
+        if slot_ids and self.repository is not None:
+            self.repository.set_slots_availability(slot_ids, available)
+
+    def _record(self, position):
+        return {field: self._columns[field][position] for field in SLOT_FIELDS}
+
+    def get(self, slot_id):
+        position = self._positions.get(slot_id)
+        return self._record(position) if position is not None else None
+
+    def free_slots(self):
+        """Available slots as dicts, e.g. for SlotAllocator"""
+        return [self._record(position) for position, available in enumerate(self._columns["available"]) if available]
+
+    def to_records(self):
+        return [self._record(position) for position in range(len(self))]
+
+    def to_dataframe(self):
+        """All slots as a DataFrame, built directly from the columns"""
+        df = pd.DataFrame(self._columns, columns=SLOT_FIELDS)
+        df["interviewer_skills"] = df["interviewer_skills"].map(", ".join)
+        return df
@@ -0,0 +1,312 @@
+# talent_pool.py
+import math
+import zlib
+import threading
+from collections import Counter
+
+import numpy as np
+
+from agents.prescreening import tokenize
+
+# Resume vectors: signed feature hashing of term frequencies into a fixed number of dimensions
+VECTOR_DIMENSIONS = 512
+# Document frequencies are counted per term hash in a much larger space than the vectors
+DF_BUCKETS = 1 << 20
+# The index has about sqrt(n) k-means cells; a query scans the closest few
+MIN_LISTS = 8
+MAX_LISTS = 1024
+DEFAULT_PROBES = 8
+KMEANS_ITERATIONS = 8
+# Training sample per cell
+KMEANS_SAMPLE_PER_LIST = 64
+# Cells are retrained once the index has grown this many times since the last training
+RETRAIN_GROWTH = 4
+# Below this many vectors every search is a flat scan
+MIN_TRAIN_SIZE = 1024
+# Rows scored per matrix product when assigning vectors to cells
+ASSIGN_CHUNK_SIZE = 16384
+# The document frequency table (about 4 MB) is written once this many resumes were added since the
+# last write; resumes stored after it are recounted from their text when the pool is loaded
+STATE_SAVE_INTERVAL = 256
+# Stored resumes read per query when recounting document frequencies
+RECOUNT_PAGE_SIZE = 500
+
+DEFAULT_TOP_K = 20
+
+DOCUMENT_FREQUENCY_STATE = "talent_pool_document_frequencies"
+
+
+def _term_hashes(text):
+    """Stable 32-bit hashes of the distinct terms of a text and their counts"""
+    counts = Counter(tokenize(text))
+    hashes = np.fromiter((zlib.crc32(term.encode("utf-8")) for term in counts), dtype=np.int64, count=len(counts))
+    return hashes, np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+
+def _hashed_vector(hashes, weights, dimensions):
+    """L2-normalized signed feature-hashing vector; the top hash bit picks the sign"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    signs = np.where(hashes & (1 << 31), -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dimensions, signs * weights)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class HashedTfidfVectorizer:
+    """Hashed TF-IDF vectors that need no vocabulary, so resumes can be added one at a time.
+
+    Resume vectors use sublinear term frequencies only; IDF weights are
+    applied to the query, so vectors never go stale as document frequencies
+    change and the dot product still down-weights common terms.
+    """
+
+    def __init__(self, dimensions=VECTOR_DIMENSIONS, document_frequencies=None, documents=0):
+        self.dimensions = dimensions
+        self.document_frequencies = (document_frequencies if document_frequencies is not None
+                                     else np.zeros(DF_BUCKETS, dtype=np.int32))
+        self.documents = documents
+
+    def _count(self, hashes):
+        np.add.at(self.document_frequencies, hashes % DF_BUCKETS, 1)
+        self.documents += 1
+
+    def count_document(self, text):
+        """Count a resume's terms towards the document frequencies without building its vector"""
+        self._count(_term_hashes(text)[0])
+
+    def document_vector(self, text):
+        """Vector for a resume; also counts its terms towards the document frequencies"""
+        hashes, counts = _term_hashes(text)
+        self._count(hashes)
+        return _hashed_vector(hashes, 1 + np.log(counts), self.dimensions)
+
+    def query_vector(self, text):
+        """Vector for a job description: term frequencies weighted by inverse document frequency"""
+        hashes, counts = _term_hashes(text)
+        frequencies = self.document_frequencies[hashes % DF_BUCKETS]
+        idf = np.log((1 + self.documents) / (1 + frequencies)).astype(np.float32) + 1
+        return _hashed_vector(hashes, (1 + np.log(counts)) * idf, self.dimensions)
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over normalized vectors.
+
+    Vectors are grouped into k-means cells; a search scores the ``probes``
+    cells whose centroids are closest to the query and then only the vectors
+    in them. New vectors go straight into their closest cell, and the cells
+    are retrained as the index grows. Scores are cosine similarities.
+    """
+
+    def __init__(self, dimensions=VECTOR_DIMENSIONS, probes=DEFAULT_PROBES, seed=0):
+        self.dimensions = dimensions
+        self.probes = probes
+        self.keys = []
+        self.centroids = None
+        self._vectors = np.empty((0, dimensions), dtype=np.float32)
+        self._size = 0
+        self._positions = {}
+        self._lists = []
+        self._list_arrays = {}
+        self._trained_size = 0
+        self._random = np.random.RandomState(seed)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    @property
+    def vectors(self):
+        return self._vectors[:self._size]
+
+    def add(self, keys, vectors, train=True):
+        """Append vectors (rows) under keys; keys already in the index are skipped"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        fresh = [(key, row) for row, key in enumerate(keys) if key not in self._positions]
+        if not fresh:
+            return 0
+        rows = vectors[[row for _, row in fresh]]
+
+        # Grow the backing array geometrically so insertion stays amortized O(1)
+        needed = self._size + len(rows)
+        if needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._vectors), 1024), self.dimensions), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        start = self._size
+        self._vectors[start:needed] = rows
+        for offset, (key, _) in enumerate(fresh):
+            self._positions[key] = start + offset
+            self.keys.append(key)
+        self._size = needed
+
+        if self.centroids is not None:
+            self._assign(start, needed)
+        if train and self.needs_training():
+            self.train()
+        return len(rows)
+
+    def needs_training(self):
+        """Whether the cells should be (re)trained for the current size"""
+        if self.centroids is None:
+            return self._size >= MIN_TRAIN_SIZE
+        return self._size >= RETRAIN_GROWTH * self._trained_size
+
+    def train(self):
+        """Cluster the vectors into about sqrt(n) cells with spherical k-means and rebuild the lists"""
+        if self._size < MIN_LISTS:
+            return
+        list_count = int(min(MAX_LISTS, max(MIN_LISTS, math.sqrt(self._size))))
+        sample_size = min(self._size, list_count * KMEANS_SAMPLE_PER_LIST)
+        sample = self.vectors[self._random.choice(self._size, sample_size, replace=False)]
+
+        centroids = sample[self._random.choice(sample_size, list_count, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=list_count)
+            # Empty cells are reseeded with random sample points
+            empty = counts == 0
+            sums[empty] = sample[self._random.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms == 0, 1, norms)
+
+        self.centroids = centroids.astype(np.float32)
+        self._lists = [[] for _ in range(list_count)]
+        self._trained_size = self._size
+        self._assign(0, self._size)
+
+    def _assign(self, start, end):
+        for chunk_start in range(start, end, ASSIGN_CHUNK_SIZE):
+            chunk_end = min(end, chunk_start + ASSIGN_CHUNK_SIZE)
+            cells = np.argmax(self._vectors[chunk_start:chunk_end] @ self.centroids.T, axis=1)
+            for position, cell in zip(range(chunk_start, chunk_end), cells):
+                self._lists[cell].append(position)
+        self._list_arrays = {}
+
+    def _list_array(self, cell):
+        array = self._list_arrays.get(cell)
+        if array is None:
+            array = self._list_arrays[cell] = np.asarray(self._lists[cell], dtype=np.int64)
+        return array
+
+    def search(self, query, k=DEFAULT_TOP_K, probes=None):
+        """[(key, score)] of the approximate top-k vectors by cosine similarity, best first"""
+        if not self._size or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+
+        if self.centroids is None:
+            positions = np.arange(self._size)
+        else:
+            probes = min(probes or self.probes, len(self.centroids))
+            cells = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+            positions = np.concatenate([self._list_array(cell) for cell in cells])
+            if not len(positions):
+                return []
+
+        scores = self._vectors[positions] @ query
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self.keys[positions[index]], float(scores[index])) for index in top]
+
+
+class TalentPool:
+    """Semantic search over every stored resume, for re-evaluating past applicants.
+
+    Resume vectors and document frequencies are persisted in the repository;
+    the IVF cells are rebuilt when the pool is loaded. Resumes stored before
+    the pool existed are vectorized on first use. Document frequencies are
+    saved every STATE_SAVE_INTERVAL resumes rather than on every add.
+    """
+
+    def __init__(self, repository=None, dimensions=VECTOR_DIMENSIONS, probes=DEFAULT_PROBES):
+        self.repository = repository
+        self.vectorizer = HashedTfidfVectorizer(dimensions)
+        self.index = IVFIndex(dimensions, probes)
+        self._loaded = repository is None
+        # Resumes counted in the document frequencies last written to the repository
+        self._saved_documents = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self.index)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        state = self.repository.load_index_state(DOCUMENT_FREQUENCY_STATE)
+        if state is not None:
+            self.vectorizer.documents = int(np.frombuffer(state[:8], dtype=np.int64)[0])
+            self.vectorizer.document_frequencies = np.frombuffer(state[8:], dtype=np.int32).copy()
+        counted = self.vectorizer.documents
+
+        for page in self.repository.iter_resume_vectors():
+            self.index.add([resume_hash for resume_hash, _ in page],
+                           np.vstack([np.frombuffer(vector, dtype=np.float32) for _, vector in page]), train=False)
+
+        # Vectors are stored in the order their terms were counted; the ones past the saved count are recounted
+        uncounted = self.index.keys[counted:]
+        for start in range(0, len(uncounted), RECOUNT_PAGE_SIZE):
+            for resume in self.repository.get_resumes(uncounted[start:start + RECOUNT_PAGE_SIZE]).values():
+                self.vectorizer.count_document(resume["text"])
+
+        # Resumes stored before the pool existed (or by another process) are added now
+        added = 0
+        for page in self.repository.iter_resumes_without_vectors():
+            added += self._add(page, train=False, save_state=False)
+        if added or uncounted:
+            self._save_state()
+        else:
+            self._saved_documents = self.vectorizer.documents
+        if self.index.needs_training():
+            self.index.train()
+
+    def _add(self, resumes, train=True, save_state=True):
+        keys = []
+        vectors = []
+        seen = set()
+        for resume_hash, text in resumes:
+            if resume_hash in self.index or resume_hash in seen:
+                continue
+            seen.add(resume_hash)
+            keys.append(resume_hash)
+            vectors.append(self.vectorizer.document_vector(text))
+        if not keys:
+            return 0
+        self.index.add(keys, np.vstack(vectors), train=train)
+
+        if self.repository is not None:
+            self.repository.save_resume_vectors([(key, vector.tobytes()) for key, vector in zip(keys, vectors)])
+            if save_state and self.vectorizer.documents - self._saved_documents >= STATE_SAVE_INTERVAL:
+                self._save_state()
+        return len(keys)
+
+    def _save_state(self):
+        if self.repository is not None:
+            self.repository.save_index_state(
+                DOCUMENT_FREQUENCY_STATE,
+                np.array([self.vectorizer.documents], dtype=np.int64).tobytes() + self.vectorizer.document_frequencies.tobytes()
+            )
+            self._saved_documents = self.vectorizer.documents
+
+    def add_resumes(self, resumes):
+        """Index (resume_hash, text) pairs; already indexed resumes are skipped. Returns how many were added"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._add(resumes)
+
+    def search(self, job_description, k=DEFAULT_TOP_K, probes=None):
+        """[(resume_hash, similarity)] of the k stored resumes closest to a job description"""
+        with self._lock:
+            self._ensure_loaded()
+            return self.index.search(self.vectorizer.query_vector(job_description), k, probes)
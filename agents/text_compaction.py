@@ -0,0 +1,220 @@
+# text_compaction.py
+import re
+from collections import Counter
+from functools import lru_cache
+
+from agents.response_parsing import estimate_tokens
+
+# Resume text sent to the analyzer is trimmed to about this many tokens
+DEFAULT_RESUME_TOKEN_BUDGET = 1500
+# Size of the job description digest used in email prompts
+DEFAULT_DIGEST_TOKEN_BUDGET = 150
+# Lines kept from the top of the resume (name, contact details, headline)
+MAX_HEADER_LINES = 6
+# Opening lines of each section that are kept before any section gets more
+SECTION_PREVIEW_LINES = 3
+# Smallest remaining budget worth spending on the start of a line that does not fit
+MIN_PARTIAL_LINE_TOKENS = 16
+# Separator between the pages of extracted PDF text
+PAGE_BREAK = "\n\f\n"
+# Lines this close to the top or bottom of a page are running header/footer candidates
+PAGE_EDGE_LINES = 2
+# A line found on more than half of the pages (and on at least this many) is page furniture wherever it appears
+MIN_FURNITURE_PAGES = 3
+
+# Section headings recognised in resumes and job descriptions
+SECTION_KEYWORDS = {
+    "summary": ["summary", "profile", "professional summary", "objective", "about me", "career objective"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "career history"],
+    "skills": ["skills", "technical skills", "core competencies", "competencies", "technologies", "tools",
+               "key skills", "skills & tools"],
+    "projects": ["projects", "key projects", "selected projects", "personal projects"],
+    "education": ["education", "academic background", "qualifications", "academics"],
+    "certifications": ["certifications", "certificates", "licenses", "courses", "training"],
+    "requirements": ["requirements", "required qualifications", "what you'll need", "what we're looking for",
+                     "minimum qualifications", "must have"],
+    "responsibilities": ["responsibilities", "key responsibilities", "what you'll do", "duties", "role description"],
+    "preferred": ["preferred qualifications", "nice to have", "bonus points", "preferred skills"],
+    "other": ["interests", "hobbies", "references", "languages", "awards", "publications", "volunteering",
+              "benefits", "company overview", "about us", "perks"]
+}
+
+# Order in which resume sections receive the token budget
+RESUME_SECTION_PRIORITY = ["header", "experience", "skills", "projects", "summary", "education",
+                           "certifications", "other"]
+# Job description sections used for the digest, most important first
+DIGEST_SECTION_PRIORITY = ["requirements", "skills", "responsibilities", "preferred", "experience"]
+
+_HEADING_LOOKUP = {keyword: section for section, keywords in SECTION_KEYWORDS.items() for keyword in keywords}
+
+_BOILERPLATE_PATTERNS = [
+    re.compile(r"^page\s*\d+(\s*(of|/)\s*\d+)?$", re.IGNORECASE),
+    re.compile(r"^[-–—\s]*\d+[-–—\s]*$"),
+    re.compile(r"^\d+\s*/\s*\d+$"),
+    re.compile(r"^(curriculum vitae|resume|résumé|cv)$", re.IGNORECASE),
+    re.compile(r"^references( are)? available (up)?on request\.?$", re.IGNORECASE),
+    re.compile(r"^confidential$", re.IGNORECASE)
+]
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_DIGITS_PATTERN = re.compile(r"\d+")
+_BULLET_PATTERN = re.compile(r"^[•●▪◦·\-–*>#]+\s*")
+
+
+def _furniture_key(line):
+    # Running headers and footers often differ only in their page number
+    return _DIGITS_PATTERN.sub("#", line.lower())
+
+
+def _page_furniture(pages):
+    """Keys of lines repeated at the same place at the top or bottom of several pages, or found on most pages"""
+    if len(pages) < 2:
+        return set()
+    edge_counts = Counter()
+    page_counts = Counter()
+    for page in pages:
+        keys = [_furniture_key(line) for line in page]
+        # Positions count from the nearer edge: 0, 1, ... from the top and -1, -2, ... from the bottom
+        edge_counts.update(set(enumerate(keys[:PAGE_EDGE_LINES])))
+        edge_counts.update(set((-1 - position, key) for position, key in enumerate(reversed(keys[-PAGE_EDGE_LINES:]))))
+        page_counts.update(set(keys))
+    furniture = {key for (_, key), count in edge_counts.items() if count >= 2}
+    furniture.update(key for key, count in page_counts.items()
+                     if count >= MIN_FURNITURE_PAGES and count > len(pages) / 2)
+    return furniture
+
+
+def is_boilerplate(line):
+    """True for a normalized line that carries no content, such as a page number or a "CURRICULUM VITAE" title"""
+    return any(pattern.match(line) for pattern in _BOILERPLATE_PATTERNS)
+
+
+def clean_lines(text):
+    """Normalized, non-empty lines with page furniture removed.
+
+    Whitespace inside each line is collapsed, and page numbers and boilerplate
+    are dropped. In text with page breaks (PAGE_BREAK), a running header or
+    footer (a line repeated at the top or bottom of several pages, or present
+    on most pages) is kept only once; lines repeated within the body, such as
+    the same job title at two employers, are all kept.
+    """
+    pages = []
+    for page_text in (text or "").replace("\xa0", " ").split("\f"):
+        page = []
+        for raw_line in page_text.splitlines():
+            line = _WHITESPACE_PATTERN.sub(" ", raw_line).strip()
+            if line and not is_boilerplate(line):
+                page.append(line)
+        pages.append(page)
+
+    furniture = _page_furniture([page for page in pages if page])
+    seen = set()
+    lines = []
+    for page in pages:
+        for line in page:
+            key = _furniture_key(line)
+            if key in furniture:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+    return lines
+
+
+def heading_section(line):
+    """Section name if the line is a section heading, else None"""
+    if len(line) > 40:
+        return None
+    key = _BULLET_PATTERN.sub("", line).strip(" :*#").lower()
+    return _HEADING_LOOKUP.get(key)
+
+
+def segment_sections(lines):
+    """Split lines into (section, lines) pairs in document order; text before the first heading is "header" """
+    sections = [("header", [])]
+    for line in lines:
+        section = heading_section(line)
+        if section is not None:
+            sections.append((section, []))
+        else:
+            sections[-1][1].append(line)
+    return [(section, section_lines) for section, section_lines in sections if section_lines]
+
+
+def _take_lines(lines, token_budget):
+    """Longest prefix of lines that fits the token budget; a line that does not fit is cut at a word boundary"""
+    taken = []
+    for line in lines:
+        tokens = estimate_tokens(line)
+        if tokens > token_budget:
+            if token_budget >= MIN_PARTIAL_LINE_TOKENS:
+                taken.append(line[:token_budget * 4].rsplit(" ", 1)[0] + " ...")
+                token_budget = 0
+            break
+        taken.append(line)
+        token_budget -= tokens
+    return taken, token_budget
+
+
+def compact_resume(text, token_budget=DEFAULT_RESUME_TOKEN_BUDGET):
+    """Clean a resume and trim it to the token budget, keeping the most relevant sections.
+
+    Every section first gets its opening lines (SECTION_PREVIEW_LINES), in
+    RESUME_SECTION_PRIORITY order, so short sections such as skills and
+    education survive a long work history; the rest of the budget then goes to
+    the remaining lines in the same order. Sections are emitted in their
+    original order under upper-case headings. A budget of 0 or None only cleans.
+    """
+    sections = segment_sections(clean_lines(text))
+    kept = [section_lines for _, section_lines in sections]
+    if token_budget:
+        priority = {section: rank for rank, section in enumerate(RESUME_SECTION_PRIORITY)}
+        order = sorted(range(len(sections)), key=lambda position: (priority.get(sections[position][0], len(priority)), position))
+        kept = [[] for _ in sections]
+        remaining = token_budget
+        for limit in (SECTION_PREVIEW_LINES, None):
+            for position in order:
+                section, section_lines = sections[position]
+                if section == "header":
+                    section_lines = section_lines[:MAX_HEADER_LINES]
+                section_lines = section_lines[:limit] if limit else section_lines
+                extra, remaining = _take_lines(section_lines[len(kept[position]):], remaining)
+                kept[position].extend(extra)
+
+    parts = []
+    for (section, _), section_lines in zip(sections, kept):
+        if not section_lines:
+            continue
+        if section != "header":
+            parts.append(f"{section.upper()}:")
+        parts.extend(section_lines)
+    return "\n".join(parts)
+
+
+@lru_cache(maxsize=32)
+def compact_job_description(text):
+    """Job description with whitespace normalized and page furniture removed (cached per text)"""
+    return "\n".join(clean_lines(text))
+
+
+@lru_cache(maxsize=32)
+def job_description_digest(text, token_budget=DEFAULT_DIGEST_TOKEN_BUDGET):
+    """Short summary of a job description: the title plus its key requirement lines (cached per text)"""
+    lines = clean_lines(text)
+    if not lines:
+        return ""
+
+    title = _BULLET_PATTERN.sub("", lines[0]).strip(" *#")
+    sections = {}
+    for section, section_lines in segment_sections(lines[1:]):
+        sections.setdefault(section, []).extend(section_lines)
+
+    candidates = [line for section in DIGEST_SECTION_PRIORITY for line in sections.get(section, [])]
+    if not candidates:
+        candidates = lines[1:]
+
+    digest_lines, _ = _take_lines(
+        [f"- {_BULLET_PATTERN.sub('', line)}" for line in candidates],
+        token_budget - estimate_tokens(title)
+    )
+    return "\n".join([title] + digest_lines)
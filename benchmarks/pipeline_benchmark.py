@@ -0,0 +1,299 @@
+# pipeline_benchmark.py
+"""Offline benchmark of the resume -> analysis -> scheduling -> email flow.
+
+Runs every stage over synthetic PDF resumes with the fake LLM backend, so no
+API key or network access is needed, and reports throughput, p50/p95 latency
+and peak traced memory per stage. Example:
+
+    python -m benchmarks.pipeline_benchmark --sizes 10 100 1000 --latency 0.05 --failure-rate 0.02
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.agent_registry import configure_llm_backend, get_llm_client
+from agents.llm_backends import BACKEND_FAKE
+from agents.resume_parser_agent import ResumeParserAgent
+from agents.candidate_analyzer_agent import CandidateAnalyzerAgent
+from agents.communication_agent import CommunicationAgent
+from agents.resume_pipeline import ResumeProcessingPipeline
+from agents.slot_calendar import SlotCalendar
+from agents.email_outbox import EmailOutbox
+from agents.email_templates import EMAIL_MODES, EMAIL_MODE_TEMPLATE
+from agents.model_router import ModelRouter
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+JOB_DESCRIPTION = """Senior Python Developer
+Role Description
+Build and operate backend services for our hiring platform.
+Responsibilities
+- Design REST APIs and data pipelines
+- Own services in production on AWS
+Requirements
+- Python, Django, PostgreSQL
+- Docker, Kubernetes, CI/CD
+Benefits
+- Remote friendly"""
+
+SKILL_POOL = ["Python", "Django", "PostgreSQL", "Docker", "Kubernetes", "AWS", "React", "Java", "Go",
+              "SQL", "Terraform", "Kafka", "Spark", "Pandas", "Excel", "Salesforce", "Figma", "Nursing"]
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+LAST_NAMES = ["Smith", "Khan", "Garcia", "Chen", "Okafor", "Novak", "Silva", "Haddad", "Ito", "Berg"]
+
+
+class BenchmarkUpload(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def synthetic_resume_text(index, rng):
+    """Plain-text resume with a random skill mix, so scores and pre-screening vary"""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    skills = rng.sample(SKILL_POOL, rng.randint(3, 8))
+    lines = [
+        name,
+        f"{name.lower().replace(' ', '.')}{index}@example.com | +1 555 {index % 1000:03d} {index % 10000:04d}",
+        "SUMMARY",
+        f"Engineer with {rng.randint(1, 15)} years of experience.",
+        "EXPERIENCE"
+    ]
+    for job in range(rng.randint(2, 5)):
+        lines.append(f"Company {job} - Engineer ({2010 + job}-{2012 + job})")
+        lines.extend(f"- Delivered project {job}.{bullet} using {rng.choice(skills)}" for bullet in range(rng.randint(2, 6)))
+    lines += ["SKILLS", ", ".join(skills), "EDUCATION", "BSc Computer Science"]
+    return "\n".join(lines)
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_pdf(text):
+    """Single-page PDF containing the text, one line per text line"""
+    stream_lines = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"]
+    stream_lines += [f"({_pdf_escape(line)}) '" for line in text.splitlines()]
+    stream_lines.append("ET")
+    stream = "\n".join(stream_lines).encode("latin-1", "replace")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref_offset = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        output.write(f"{offset:010d} 00000 n \n".encode())
+    output.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    return output.getvalue()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class StageRecorder:
+    """Collects per-item latencies, errors, wall time and peak traced memory for one stage"""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.latencies = []
+        self.errors = 0
+        self.items = 0
+
+    def __enter__(self):
+        tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_time = time.perf_counter() - self._start
+        _, self.peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return False
+
+    def timed(self, fn, *args, **kwargs):
+        """Call fn, recording its latency; exceptions are counted and returned"""
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            self.errors += 1
+            return e
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            self.items += 1
+
+    def report(self):
+        return {
+            "stage": self.name,
+            "resumes": self.size,
+            "items": self.items,
+            "errors": self.errors,
+            "wall_seconds": round(self.wall_time, 3),
+            "throughput_per_second": round(self.items / self.wall_time, 1) if self.wall_time else 0.0,
+            "p50_ms": round(1000 * _percentile(self.latencies, 0.5), 2),
+            "p95_ms": round(1000 * _percentile(self.latencies, 0.95), 2),
+            "peak_memory_mb": round(self.peak_memory / (1024 * 1024), 2)
+        }
+
+
+def run_benchmark(size, concurrency=8, email_mode=EMAIL_MODE_TEMPLATE, routing=False, seed=0, work_dir=None):
+    """Run every stage for ``size`` synthetic resumes and return one report dict per stage"""
+    rng = random.Random(seed)
+    work_dir = work_dir or tempfile.mkdtemp(prefix="hr_benchmark_")
+    api_key = "benchmark"
+
+    router = ModelRouter.from_api_key(api_key) if routing else None
+    resume_parser = ResumeParserAgent()
+    candidate_analyzer = CandidateAnalyzerAgent(api_key, llm=get_llm_client(api_key), router=router)
+    outbox = EmailOutbox(os.path.join(work_dir, f"outbox_{size}.sqlite"))
+    communication_agent = CommunicationAgent(api_key, llm=get_llm_client(api_key), outbox=outbox,
+                                             email_mode=email_mode, router=router)
+
+    texts = [synthetic_resume_text(index, rng) for index in range(size)]
+    pdfs = [synthetic_pdf(text) for text in texts]
+    reports = []
+
+    with StageRecorder("pdf_extraction", size) as stage:
+        extracted = [stage.timed(resume_parser.extract_text_from_pdf, io.BytesIO(pdf)) for pdf in pdfs]
+    reports.append(stage.report())
+    extracted = [text for text in extracted if isinstance(text, str)]
+
+    with StageRecorder("compaction", size) as stage:
+        compacted = [stage.timed(resume_parser.compact_text, text) for text in extracted]
+    reports.append(stage.report())
+    job_description = resume_parser.compact_job_description(JOB_DESCRIPTION)
+
+    with StageRecorder("analysis", size) as stage:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            analyses = list(executor.map(
+                lambda text: stage.timed(candidate_analyzer.analyze_resume, text, job_description), compacted
+            ))
+    reports.append(stage.report())
+
+    approved = [
+        {
+            "name": analysis["name"], "email": analysis.get("email") or "candidate@example.com",
+            "overall_score": analysis["overall_score"], "key_skills": analysis["key_skills"],
+            "strengths": analysis["strengths"]
+        }
+        for analysis in analyses
+        if isinstance(analysis, dict) and analysis["auto_decision"]["status"] == "Approved"
+    ]
+
+    with StageRecorder("scheduling", size) as stage:
+        calendar = SlotCalendar()
+        days = max(1, len(approved) // 8 + 1)
+        stage.timed(calendar.add_range, date(2025, 1, 6), days, ["9:00 AM", "11:00 AM", "2:00 PM", "4:00 PM"],
+                    ["Interviewer A", "Interviewer B"])
+        assignments = stage.timed(candidate_analyzer.schedule_interviews, approved, calendar.free_slots())
+        if not isinstance(assignments, Exception):
+            calendar.set_available([slot["id"] for _, slot in assignments if slot], False)
+    reports.append(stage.report())
+    assignments = assignments if isinstance(assignments, list) else []
+
+    interview_details = {"format": "Video Call", "location": "Zoom", "interviewer": "Hiring Team"}
+
+    def prepare_email(candidate_info, slot):
+        details = dict(interview_details, date=f"{slot['date']} at {slot['time']}")
+        email = communication_agent.generate_interview_email(candidate_info, JOB_DESCRIPTION, details)
+        return communication_agent.enqueue_email(
+            to_email=candidate_info["email"], subject=email["subject"], html_content=email["body"],
+            sender_name="Hiring Team", candidate_name=candidate_info["name"], metadata={"interview_slot": slot}
+        )
+
+    with StageRecorder("email", size) as stage:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(
+                lambda assignment: stage.timed(prepare_email, *assignment),
+                [(candidate, slot) for candidate, slot in assignments if slot]
+            ))
+    reports.append(stage.report())
+
+    # Whole intake through the production pipeline: process-pool extraction plus concurrent analysis
+    pipeline = ResumeProcessingPipeline(
+        candidate_analyzer,
+        max_concurrent_analyses=concurrency,
+        resume_compactor=resume_parser.compact_text,
+        job_description_compactor=resume_parser.compact_job_description
+    )
+    uploads = [BenchmarkUpload(pdf, f"resume_{index}.pdf") for index, pdf in enumerate(pdfs)]
+    with StageRecorder("end_to_end_pipeline", size) as stage:
+        start = time.perf_counter()
+        for result in pipeline.process(uploads, JOB_DESCRIPTION + "\n"):
+            # Latency here is time from intake start until the resume's result is available
+            stage.latencies.append(time.perf_counter() - start)
+            stage.items += 1
+            if result["error"] is not None:
+                stage.errors += 1
+    reports.append(stage.report())
+
+    return reports
+
+
+def format_reports(reports):
+    """Fixed-width text table of stage reports"""
+    columns = ["resumes", "stage", "items", "errors", "wall_seconds", "throughput_per_second", "p50_ms", "p95_ms", "peak_memory_mb"]
+    widths = {column: max(len(column), *(len(str(report[column])) for report in reports)) for column in columns}
+    lines = ["  ".join(column.ljust(widths[column]) for column in columns)]
+    lines += ["  ".join(str(report[column]).ljust(widths[column]) for column in columns) for report in reports]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the resume processing flow")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of resumes to run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Latency varies by +/- this fraction of the mean")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fake LLM calls that fail")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent analysis and email requests")
+    parser.add_argument("--email-mode", choices=EMAIL_MODES, default=EMAIL_MODE_TEMPLATE)
+    parser.add_argument("--routing", action="store_true", help="Route tasks through the fast/pro ModelRouter")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the reports to this JSON file")
+    args = parser.parse_args(argv)
+
+    latency = (args.latency * (1 - args.jitter), args.latency * (1 + args.jitter)) if args.jitter else args.latency
+    configure_llm_backend(BACKEND_FAKE, latency=latency, failure_rate=args.failure_rate, seed=args.seed)
+
+    reports = []
+    for size in args.sizes:
+        reports.extend(run_benchmark(size, args.concurrency, args.email_mode, args.routing, args.seed))
+        print(format_reports([report for report in reports if report["resumes"] == size]), flush=True)
+        print()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(reports, output_file, indent=2)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
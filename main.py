@@ -3,13 +3,38 @@
 import streamlit as st
 import pandas as pd
 import os
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Import our agent modules
 from agents.job_description_agent import JobDescriptionAgent
 from agents.resume_parser_agent import ResumeParserAgent
 from agents.candidate_analyzer_agent import CandidateAnalyzerAgent
 from agents.communication_agent import CommunicationAgent
+from agents.resume_pipeline import ResumeProcessingPipeline
+from agents.analysis_cache import AnalysisCache
+from agents.agent_registry import (
+    get_llm_client, configure_rate_limits, current_rate_limits, llm_client_stats
+)
+from agents.llm_client import DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT
+from agents.llm_backends import BACKEND_GEMINI, BACKEND_RECORD, BACKEND_REPLAY, BACKEND_FAKE
+from agents.model_router import (
+    ModelRouter, TIER_FAST, TIER_PRO, DEFAULT_TIER_MODELS, DEFAULT_CONCURRENCY, DEFAULT_BORDERLINE_MARGIN
+)
+from agents.email_delivery import DEFAULT_SMTP_HOST, DEFAULT_SMTP_PORT
+from agents.email_outbox import EmailOutbox, OutboxWorker
+from agents.email_templates import EMAIL_MODE_LLM, EMAIL_MODE_TEMPLATE, EMAIL_MODE_OFFLINE
+from agents.candidate_store import CandidateStore
+from agents.hr_repository import HRRepository, content_hash
+from agents.resume_dedup import DEFAULT_DUPLICATE_THRESHOLD, ResumeDeduplicator
+from agents.talent_pool import DEFAULT_TOP_K, TalentPool
+from agents.jd_versioning import FULL_RESCORE_CHANGE_SHARE, describe_changes, diff_job_descriptions
+from agents.slot_calendar import SlotCalendar
+from agents.response_parsing import parse_stats
+from agents.instrumentation import telemetry, MetricsServer, DEFAULT_TRACE_PATH, DEFAULT_METRICS_PORT
+from agents.text_compaction import DEFAULT_RESUME_TOKEN_BUDGET
+from agents.prescreening import DEFAULT_PRESCREEN_FLOOR, PreScreener, skills_from_job_description
+from agents.candidate_ranking import DEFAULT_WEIGHTS, WEIGHT_PROFILES, rank_dataframe, rank_under_profiles
 
 # Set page configuration
 st.set_page_config(
@@ -18,28 +43,109 @@ st.set_page_config(
     layout="wide"
 )
 
+# Persistent storage shared by every session; session state only caches what was loaded from it
+@st.cache_resource
+def load_repository():
+    return HRRepository()
+
+repository = load_repository()
+
 # Initialize session state variables
 if "job_description" not in st.session_state:
-    st.session_state.job_description = ""
-if "resumes" not in st.session_state:
-    st.session_state.resumes = {}
-if "candidates_data" not in st.session_state:
-    st.session_state.candidates_data = pd.DataFrame(
-        columns=["Name", "Email", "Skills Match (%)", 
-                 "Experience Match (%)", "Overall Score", 
-                 "Key Skills", "Strengths", "Weaknesses", 
-                 "Recommendation", "Status", "Automated Decision"])
-if "emails_sent" not in st.session_state:
-    st.session_state.emails_sent = {}
-if "available_interview_slots" not in st.session_state:
-    # Initialize with some default interview slots
-    st.session_state.available_interview_slots = [
-        {"id": 1, "date": "2025-04-20", "time": "10:00 AM", "available": True},
-        {"id": 2, "date": "2025-04-20", "time": "2:00 PM", "available": True},
-        {"id": 3, "date": "2025-04-21", "time": "11:00 AM", "available": True},
-        {"id": 4, "date": "2025-04-21", "time": "3:00 PM", "available": True},
-        {"id": 5, "date": "2025-04-22", "time": "9:00 AM", "available": True}
-    ]
+    st.session_state.job_description = repository.latest_job_description() or ""
+if "candidate_store" not in st.session_state:
+    # Rows are read from the repository the first time the table is needed
+    st.session_state.candidate_store = CandidateStore(repository=repository)
+if "slot_calendar" not in st.session_state:
+    st.session_state.slot_calendar = SlotCalendar(repository.list_slots(), repository=repository)
+    if not len(st.session_state.slot_calendar):
+        # Initialize with some default interview slots
+        st.session_state.slot_calendar.add_slots([
+            ("2025-04-20", "10:00 AM", None),
+            ("2025-04-20", "2:00 PM", None),
+            ("2025-04-21", "11:00 AM", None),
+            ("2025-04-21", "3:00 PM", None),
+            ("2025-04-22", "9:00 AM", None)
+        ])
+
+# The LSH index over every stored resume is built once and shared by all sessions
+@st.cache_resource
+def load_deduplicator():
+    return ResumeDeduplicator(repository=load_repository())
+
+# The talent pool vector index is loaded from the repository once and shared by all sessions
+@st.cache_resource
+def load_talent_pool():
+    return TalentPool(repository=load_repository())
+
+# Agents and their shared LLM client survive reruns; they are only rebuilt when the keys change
+@st.cache_resource
+def load_analysis_cache():
+    return AnalysisCache()
+
+# Replay falls back to fake responses for prompts that were never recorded
+LLM_BACKEND_OPTIONS = {"replay_fallback": True}
+
+@st.cache_resource
+def load_router(google_api_key, routing_settings, llm_backend):
+    # routing_settings is None (routing off) or (fast model, pro model, fast limit, pro limit, borderline margin)
+    if routing_settings is None:
+        return None
+    fast_model, pro_model, fast_concurrency, pro_concurrency, borderline_margin = routing_settings
+    return ModelRouter.from_api_key(
+        google_api_key,
+        backend=llm_backend,
+        backend_options=LLM_BACKEND_OPTIONS,
+        tier_models={TIER_FAST: fast_model, TIER_PRO: pro_model},
+        concurrency={TIER_FAST: fast_concurrency, TIER_PRO: pro_concurrency},
+        borderline_margin=borderline_margin
+    )
+
+@st.cache_resource
+def load_agents(google_api_key, routing_settings, approve_threshold, llm_backend):
+    # Each session's agents use the clients of the backend chosen in that session
+    llm = get_llm_client(google_api_key, backend=llm_backend, backend_options=LLM_BACKEND_OPTIONS)
+    router = load_router(google_api_key, routing_settings, llm_backend)
+    return (
+        JobDescriptionAgent(google_api_key, llm=llm, router=router),
+        ResumeParserAgent(),
+        CandidateAnalyzerAgent(google_api_key, cache=load_analysis_cache(), llm=llm, router=router,
+                               approve_threshold=approve_threshold, backend=llm_backend)
+    )
+
+@st.cache_resource
+def load_outbox():
+    return EmailOutbox()
+
+@st.cache_resource
+def load_outbox_worker():
+    # One delivery thread per server process, shared by every session
+    worker = OutboxWorker(load_outbox())
+    worker.start()
+    return worker
+
+@st.cache_resource
+def load_metrics_server(port):
+    """Prometheus /metrics endpoint, started once per port"""
+    return MetricsServer(port)
+
+@st.cache_resource
+def load_communication_agent(google_api_key, gmail_email, gmail_password, smtp_host, smtp_port, smtp_use_ssl, messages_per_minute,
+                             routing_settings, llm_backend):
+    return CommunicationAgent(
+        google_api_key, gmail_email, gmail_password,
+        llm=get_llm_client(google_api_key, backend=llm_backend, backend_options=LLM_BACKEND_OPTIONS),
+        smtp_host=smtp_host,
+        smtp_port=smtp_port,
+        smtp_use_ssl=smtp_use_ssl,
+        messages_per_minute=messages_per_minute or None,
+        outbox=load_outbox(),
+        router=load_router(google_api_key, routing_settings, llm_backend)
+    )
+
+analysis_cache = load_analysis_cache()
+outbox = load_outbox()
+outbox_worker = load_outbox_worker()
 
 # Sidebar for API Keys and Configuration
 with st.sidebar:
@@ -47,17 +153,118 @@ with st.sidebar:
     
     google_api_key = st.text_input("Google Gemini API Key", type="password")
     
+    llm_backend_labels = {
+        "Gemini (live)": BACKEND_GEMINI,
+        "Gemini + record responses": BACKEND_RECORD,
+        "Replay recorded responses": BACKEND_REPLAY,
+        "Fake LLM (offline demo)": BACKEND_FAKE
+    }
+    llm_backend = llm_backend_labels[st.selectbox(
+        "LLM Backend", list(llm_backend_labels),
+        help="Record saves every model response locally; Replay and Fake run without an API key or network access"
+    )]
+    offline_backend = llm_backend in (BACKEND_REPLAY, BACKEND_FAKE)
+    if offline_backend and not google_api_key:
+        google_api_key = "offline"
+    
     # Email configuration (Using Gmail)
     st.markdown("#### Email Configuration")
     gmail_email = st.text_input("Gmail Email Address")
     gmail_password = st.text_input("Gmail App Password", type="password", 
                                  help="Use an App Password for Gmail. Generate from your Google Account > Security > App Passwords")
+    with st.expander("Advanced SMTP Settings"):
+        smtp_host = st.text_input("SMTP Host", DEFAULT_SMTP_HOST)
+        smtp_port = st.number_input("SMTP Port", min_value=1, max_value=65535, value=DEFAULT_SMTP_PORT)
+        smtp_use_ssl = st.checkbox("Use SSL", value=True)
+        messages_per_minute = st.number_input("Max emails per minute (0 = unlimited)", min_value=0, max_value=600, value=20)
     
     # Automation settings
     st.markdown("---")
     st.markdown("### Automation Settings")
     auto_approve_threshold = st.slider("Auto-approve candidates with score above:", 40, 90, 50)
     auto_email_enabled = st.checkbox("Auto-generate & send interview emails", value=True)
+    ai_slot_selection = st.checkbox("Use AI to choose interview slots", value=False,
+                                    help="By default slots are assigned instantly, earliest first and highest-scoring candidates first. Enable to have the LLM pick each slot instead.")
+    max_concurrent_analyses = st.number_input("Max concurrent resume analyses", min_value=1, max_value=32, value=4,
+                                              help="Number of LLM analysis requests kept in flight while processing resumes")
+    batch_analysis_enabled = st.checkbox("Batch resume analyses", value=False,
+                                         help="Analyze several resumes against the job description in a single LLM request")
+    prescreen_enabled = st.checkbox("Local pre-screening", value=True,
+                                    help="Score resumes locally against the key skills and job description first; resumes below the floor are rejected without an LLM call")
+    prescreen_floor = st.slider("Pre-screening floor (local score)", 0, 60, DEFAULT_PRESCREEN_FLOOR, disabled=not prescreen_enabled)
+    dedup_enabled = st.checkbox("Detect near-duplicate resumes", value=True,
+                                help="Resumes that are near-copies of earlier uploads reuse the stored analysis and are linked to the existing candidate")
+    duplicate_threshold = st.slider("Near-duplicate similarity", 0.5, 1.0, DEFAULT_DUPLICATE_THRESHOLD, 0.05,
+                                    disabled=not dedup_enabled)
+    compact_prompts = st.checkbox("Compact resumes before analysis", value=True,
+                                  help="Strip page headers, footers and repeated lines, and keep the most relevant resume sections within a token budget")
+    resume_token_budget = st.number_input("Resume token budget (0 = no trimming)", min_value=0, max_value=20000,
+                                          value=DEFAULT_RESUME_TOKEN_BUDGET, step=250, disabled=not compact_prompts)
+    
+    with st.expander("Model Routing"):
+        model_routing_enabled = st.checkbox("Route tasks across model tiers", value=True,
+                                            help="Triage scoring, emails and slot selection use the fast model; borderline candidates and job description writing use the pro model")
+        fast_model = st.text_input("Fast model", DEFAULT_TIER_MODELS[TIER_FAST])
+        pro_model = st.text_input("Pro model", DEFAULT_TIER_MODELS[TIER_PRO])
+        fast_concurrency = st.number_input("Fast model max concurrent requests", min_value=1, max_value=64,
+                                           value=DEFAULT_CONCURRENCY[TIER_FAST])
+        pro_concurrency = st.number_input("Pro model max concurrent requests", min_value=1, max_value=64,
+                                          value=DEFAULT_CONCURRENCY[TIER_PRO])
+        borderline_margin = st.number_input("Borderline margin (points around the auto-approve threshold)",
+                                            min_value=0, max_value=50, value=DEFAULT_BORDERLINE_MARGIN)
+    routing_settings = (
+        (fast_model, pro_model, int(fast_concurrency), int(pro_concurrency), int(borderline_margin))
+        if model_routing_enabled else None
+    )
+    
+    with st.expander("LLM Rate Limits"):
+        requests_per_minute = st.number_input("Requests per minute per model (0 = unlimited)", min_value=0, max_value=100000, value=0,
+                                              help="Match your Gemini quota so bursts wait for capacity instead of failing with 429s")
+        tokens_per_minute = st.number_input("Tokens per minute per model (0 = unlimited)", min_value=0, max_value=10000000,
+                                            value=0, step=10000)
+        llm_max_concurrency = st.number_input("Max concurrent LLM requests per model", min_value=1, max_value=256,
+                                              value=DEFAULT_MAX_CONCURRENCY,
+                                              help="Upper bound for the adaptive limit, which halves on 429s and timeouts and grows back on success")
+        llm_timeout = st.number_input("Request timeout (seconds)", min_value=5, max_value=600, value=int(DEFAULT_TIMEOUT))
+        llm_max_retries = st.number_input("Retries for rate limits, timeouts and server errors", min_value=0, max_value=10,
+                                          value=DEFAULT_MAX_RETRIES)
+        llm_hedging = st.checkbox("Hedge slow requests", value=True,
+                                  help="A request still running past the recent p95 latency is sent again; the first response wins")
+    rate_limit_settings = {
+        "requests_per_minute": int(requests_per_minute) or None,
+        "tokens_per_minute": int(tokens_per_minute) or None,
+        "timeout": float(llm_timeout),
+        "max_retries": int(llm_max_retries),
+        "hedge": llm_hedging,
+        "max_concurrency": int(llm_max_concurrency)
+    }
+    if current_rate_limits() != rate_limit_settings:
+        configure_rate_limits(**rate_limit_settings)
+    
+    with st.expander("Instrumentation"):
+        trace_enabled = st.checkbox("Write spans to a JSONL trace file", value=False)
+        trace_path = st.text_input("Trace file", DEFAULT_TRACE_PATH, disabled=not trace_enabled)
+        metrics_enabled = st.checkbox("Serve Prometheus metrics", value=False,
+                                      help="Exposes stage histograms, token counts and retries at http://127.0.0.1:<port>/metrics")
+        metrics_port = st.number_input("Metrics port", min_value=1024, max_value=65535, value=DEFAULT_METRICS_PORT,
+                                       disabled=not metrics_enabled)
+    if telemetry.trace_path != (trace_path if trace_enabled else None):
+        telemetry.configure(trace_path if trace_enabled else None)
+    if metrics_enabled:
+        try:
+            load_metrics_server(int(metrics_port))
+        except OSError as e:
+            st.error(f"Could not start the metrics endpoint: {e}")
+    
+    email_mode_labels = {
+        "Full LLM": EMAIL_MODE_LLM,
+        "Template + LLM personalization": EMAIL_MODE_TEMPLATE,
+        "Offline templates (no LLM)": EMAIL_MODE_OFFLINE
+    }
+    email_mode = email_mode_labels[st.selectbox(
+        "Email generation mode", list(email_mode_labels),
+        help="Templates fill in the fixed parts of each email; only the personalized paragraph uses the LLM, or nothing at all in offline mode"
+    )]
     
     interviewer_name = st.text_input("Default Interviewer Name", placeholder="HR Manager")
     company_name = st.text_input("Company Name", "Your Company")
@@ -75,15 +282,32 @@ with st.sidebar:
        - Send interview invitations via email
     """)
 
+# Results from an offline backend are demo data: they stay in this session and never reach the repository,
+# the slot calendar or the outbox
+if offline_backend:
+    if "offline_candidate_store" not in st.session_state:
+        st.session_state.offline_candidate_store = CandidateStore()
+    candidate_store = st.session_state.offline_candidate_store
+else:
+    candidate_store = st.session_state.candidate_store
+
 # Initialize agents if API keys are provided
 agents_initialized = False
 if google_api_key:
     try:
-        # Initialize all agents
-        job_description_agent = JobDescriptionAgent(google_api_key)
-        resume_parser = ResumeParserAgent()
-        candidate_analyzer = CandidateAnalyzerAgent(google_api_key)
-        communication_agent = CommunicationAgent(google_api_key, gmail_email, gmail_password)
+        # Initialize all agents (cached across reruns)
+        job_description_agent, resume_parser, candidate_analyzer = load_agents(
+            google_api_key, routing_settings, auto_approve_threshold, llm_backend
+        )
+        communication_agent = load_communication_agent(
+            google_api_key, gmail_email, gmail_password,
+            smtp_host, int(smtp_port), smtp_use_ssl, int(messages_per_minute),
+            routing_settings, llm_backend
+        )
+        
+        # The background worker delivers this account's queued mail with this session's credentials
+        if gmail_email and gmail_password:
+            outbox_worker.register_sender(communication_agent)
         
         agents_initialized = True
     except Exception as e:
@@ -139,6 +363,7 @@ with tab1:
                             job_role, industry, experience_level, key_skills,
                             company_name, company_specialization
                         )
+                        st.session_state.key_skills = key_skills
                     except Exception as e:
                         st.error(f"Error generating job description: {str(e)}")
     
@@ -186,7 +411,132 @@ with tab1:
                     st.markdown(validation_results)
         
         if st.button("Confirm and Continue"):
+            if not offline_backend:
+                repository.save_job_description(st.session_state.job_description)
             st.success("Job description confirmed! Please proceed to the Resume Analysis tab.")
+        
+        # Candidates scored against an earlier version of this job description: re-score them on the changed criteria.
+        # The earlier version is the one this session last scored candidates against, or one picked here.
+        current_jd_hash = content_hash(st.session_state.job_description)
+        scored_versions = {jd_hash: (version, title, count) for jd_hash, version, title, count
+                           in repository.scored_job_descriptions() if jd_hash != current_jd_hash}
+        if scored_versions:
+            version_options = [None] + list(scored_versions)
+            tracked_jd_hash = st.session_state.get("scored_job_description_hash")
+            scored_jd_hash = st.selectbox(
+                "Update candidates scored against an earlier version",
+                version_options,
+                index=version_options.index(tracked_jd_hash) if tracked_jd_hash in scored_versions else 0,
+                format_func=lambda jd_hash: "None" if jd_hash is None else
+                    f"v{scored_versions[jd_hash][0]}: {scored_versions[jd_hash][1]} ({scored_versions[jd_hash][2]} candidates)",
+                help="Defaults to the version this session last scored candidates against"
+            )
+        else:
+            scored_jd_hash = None
+        scored_jd = repository.get_job_description(scored_jd_hash) if scored_jd_hash else None
+        if scored_jd is not None:
+            jd_diff = diff_job_descriptions(scored_jd, st.session_state.job_description)
+            st.markdown("### Requirement Changes")
+            st.caption(f"Comparing with version {scored_versions[scored_jd_hash][0]} of this job description")
+            
+            if jd_diff["requirements_changed"]:
+                st.markdown(describe_changes(jd_diff))
+                if jd_diff["added_skills"] or jd_diff["removed_skills"]:
+                    st.markdown(f"**Skills added:** {', '.join(jd_diff['added_skills']) or 'none'} — "
+                                f"**Skills removed:** {', '.join(jd_diff['removed_skills']) or 'none'}")
+            else:
+                st.info("Only text outside the requirements changed; existing scores still apply.")
+            
+            if st.button("Apply to existing candidates", disabled=not agents_initialized or offline_backend,
+                         help="Not available with an offline backend, which never changes stored candidates" if offline_backend else None):
+                job_description = st.session_state.job_description
+                new_jd_hash = repository.save_job_description(job_description, parent_hash=scored_jd_hash)
+                new_version = repository.job_description_version(new_jd_hash)
+                # Read from the database, so candidates added by other sessions are re-scored as well
+                scored_candidates = {row["Candidate ID"]: row for row in repository.candidates_for_job_description(scored_jd_hash)}
+                stored_resumes = repository.get_resumes({row["resume_hash"] for row in scored_candidates.values() if row["resume_hash"]})
+                # A changed requirement can move any candidate's score, even one whose resume never mentions it
+                # (a new must-have they lack), so every candidate is re-scored; edits outside the criteria change no score
+                rescore_ids = [candidate_id for candidate_id, row in scored_candidates.items()
+                               if row["resume_hash"] in stored_resumes] if jd_diff["requirements_changed"] else []
+                missing_resumes = len(scored_candidates) - len(rescore_ids) if jd_diff["requirements_changed"] else 0
+                # Small edits re-evaluate only the changed criteria; a largely rewritten JD gets full analyses
+                full_rescore = jd_diff["change_share"] > FULL_RESCORE_CHANGE_SHARE
+                requirement_changes = describe_changes(jd_diff)
+                
+                def rescore_candidate(candidate_id):
+                    row = scored_candidates[candidate_id]
+                    resume_hash = row["resume_hash"]
+                    stored_analysis = repository.get_analysis_by_hash(resume_hash, job_description)
+                    if stored_analysis is not None:
+                        return stored_analysis, True
+                    resume_text = stored_resumes[resume_hash]["text"]
+                    if compact_prompts:
+                        resume_text = resume_parser.compact_text(resume_text, resume_token_budget)
+                    if full_rescore:
+                        return candidate_analyzer.analyze_resume(resume_text, job_description), False
+                    previous_analysis = repository.get_analysis_by_hash(resume_hash, scored_jd)
+                    if previous_analysis is None:
+                        previous_analysis = {
+                            "skills_match_percentage": row["Skills Match (%)"],
+                            "experience_match_percentage": row["Experience Match (%)"],
+                            "overall_score": row["Overall Score"],
+                            "key_skills": str(row["Key Skills"]).split(", "),
+                            "strengths": str(row["Strengths"]).split(", "),
+                            "weaknesses": str(row["Weaknesses"]).split(", "),
+                            "recommendation": row["Recommendation"]
+                        }
+                    return candidate_analyzer.rescore_changed_criteria(resume_text, previous_analysis, requirement_changes), False
+                
+                updates = {}
+                new_analyses = []
+                with telemetry.span("jd_rescoring", candidates=len(scored_candidates), rescored=len(rescore_ids)):
+                    with st.spinner(f"Re-scoring all {len(rescore_ids)} candidates against the changed requirements..."):
+                        with ThreadPoolExecutor(max_workers=max_concurrent_analyses) as executor:
+                            futures = [executor.submit(rescore_candidate, candidate_id) for candidate_id in rescore_ids]
+                            
+                            for candidate_id, future in zip(rescore_ids, futures):
+                                try:
+                                    analysis_data, reused = future.result()
+                                except Exception as e:
+                                    st.error(f"Error re-scoring candidate {candidate_id}: {str(e)}")
+                                    continue
+                                if not reused:
+                                    new_analyses.append((stored_resumes[scored_candidates[candidate_id]["resume_hash"]]["text"], job_description, dict(analysis_data)))
+                                
+                                score = analysis_data.get("overall_score", 0)
+                                updates[candidate_id] = {
+                                    "Skills Match (%)": analysis_data.get("skills_match_percentage", 0),
+                                    "Experience Match (%)": analysis_data.get("experience_match_percentage", 0),
+                                    "Overall Score": score,
+                                    "Key Skills": ", ".join(analysis_data.get("key_skills", [])),
+                                    "Strengths": ", ".join(analysis_data.get("strengths", [])),
+                                    "Weaknesses": ", ".join(analysis_data.get("weaknesses", [])),
+                                    "Recommendation": analysis_data.get("recommendation", ""),
+                                    "JD Version": new_version
+                                }
+                                # Candidates who were already emailed keep their status
+                                if not scored_candidates[candidate_id]["Email Sent"]:
+                                    if score >= auto_approve_threshold:
+                                        updates[candidate_id]["Status"] = "Approved"
+                                        updates[candidate_id]["Automated Decision"] = f"Auto-approved: Score {score}% meets threshold ({auto_approve_threshold}%)"
+                                    else:
+                                        updates[candidate_id]["Status"] = "Pending"
+                                        updates[candidate_id]["Automated Decision"] = f"Manual review needed: Score {score}% below threshold ({auto_approve_threshold}%)"
+                    
+                    candidate_store.update_records(updates)
+                    repository.save_analyses(new_analyses)
+                    # Every candidate now belongs to the new version; only text outside the criteria changed for the others
+                    repository.move_candidates(list(scored_candidates), new_jd_hash)
+                st.session_state.scored_job_description_hash = new_jd_hash
+                
+                if rescore_ids:
+                    st.success(f"Re-scored {len(updates)} of {len(rescore_ids)} candidates"
+                               + (" with full analyses" if full_rescore else " on the changed requirements only"))
+                    if missing_resumes:
+                        st.warning(f"{missing_resumes} candidates have no stored resume and keep their old scores")
+                else:
+                    st.success(f"Moved {len(scored_candidates)} candidates to version {new_version}; their scores still apply")
 
 # RESUME PARSER AND ANALYZER
 with tab2:
@@ -205,6 +555,12 @@ with tab2:
         uploaded_files = st.file_uploader("Upload candidate resumes (PDF)", 
                                          accept_multiple_files=True, 
                                          type=["pdf"])
+        if prescreen_enabled:
+            prescreen_skills = st.text_input(
+                "Key skills for pre-screening (comma separated)",
+                value=st.session_state.get("key_skills") or ", ".join(skills_from_job_description(st.session_state.job_description)),
+                help="Taken from the Key Skills used to generate the job description, or guessed from its skills and requirements sections"
+            )
     
     with col2:
         if st.button("Process Resumes", disabled=not agents_initialized or not st.session_state.job_description):
@@ -215,37 +571,97 @@ with tab2:
                 # Clear previous data
                 new_candidates_data = []
                 
-                for i, file in enumerate(uploaded_files):
+                deduplicator = load_deduplicator()
+                job_description_key = content_hash(st.session_state.job_description)
+                
+                pipeline = ResumeProcessingPipeline(
+                    candidate_analyzer,
+                    max_concurrent_analyses=max_concurrent_analyses,
+                    batch_analysis=batch_analysis_enabled,
+                    # Offline backends neither reuse nor store analyses, so demo scores never mix with real ones
+                    analysis_lookup=None if offline_backend else repository.get_analysis,
+                    resume_compactor=(lambda text: resume_parser.compact_text(text, resume_token_budget)) if compact_prompts else None,
+                    job_description_compactor=resume_parser.compact_job_description if compact_prompts else None,
+                    prescreener=PreScreener(
+                        st.session_state.job_description, prescreen_skills,
+                        floor=prescreen_floor, resume_parser=resume_parser
+                    ) if prescreen_enabled else None,
+                    # Offline backends do not reuse stored analyses for near-duplicates either
+                    deduplicator=deduplicator if dedup_enabled and not offline_backend else None,
+                    # The deduplicator is shared by every session, so the threshold is passed per run
+                    duplicate_threshold=duplicate_threshold
+                )
+                prescreened_count = 0
+                duplicate_links = []
+                linked_resumes = []
+                
+                # Parsed resumes and analyses are written to the repository in bulk after the loop
+                processed_resumes = []
+                processed_analyses = []
+                completed_results = []
+                
+                status_text.text(f"Processing {len(uploaded_files)} resumes...")
+                intake_start = time.perf_counter()
+                
+                # Results arrive in completion order, not upload order
+                for i, result in enumerate(pipeline.process(uploaded_files, st.session_state.job_description)):
+                    file_name = result["file_name"]
+                    
+                    # Update progress bar
+                    progress_bar.progress((i + 1) / len(uploaded_files))
+                    status_text.text(f"Processed {file_name} ({i + 1}/{len(uploaded_files)})")
+                    
+                    if result["error"] is not None:
+                        st.error(f"Error processing {file_name}: {str(result['error'])}")
+                        continue
+                    
+                    completed_results.append(result)
+                
+                # Contact details come from the resume text itself, extracted for every resume in one pass
+                contacts = resume_parser.extract_contacts_batch(
+                    [result["resume_text"] for result in completed_results],
+                    [result["file_name"] for result in completed_results]
+                )
+                
+                for result, contact in zip(completed_results, contacts):
+                    file_name = result["file_name"]
                     try:
-                        status_text.text(f"Processing {file.name}...")
-                        
-                        # Extract text from PDF using Resume Parser Agent
-                        resume_text = resume_parser.extract_text_from_pdf(file)
-                        
-                        # Store in session state
-                        st.session_state.resumes[file.name] = resume_text
+                        resume_text = result["resume_text"]
+                        analysis_data = result["analysis"]
                         
-                        # Use Candidate Analyzer Agent to analyze the resume
-                        status_text.text(f"Analyzing {file.name}...")
+                        duplicate = result.get("duplicate")
+                        if duplicate is not None:
+                            # Link the upload to the candidate created from the earlier resume
+                            existing_id = repository.candidate_id_for_resume(duplicate["duplicate_of"], job_description_key)
+                            linked_id = existing_id if existing_id is not None else repository.candidate_id_for_resume(duplicate["duplicate_of"])
+                            duplicate_links.append((duplicate["resume_hash"], duplicate["duplicate_of"], duplicate["similarity"], linked_id))
+                            if duplicate["reused_analysis"] and existing_id is not None:
+                                # Already a candidate for this job description: keep the resume, skip the new row
+                                linked_resumes.append((file_name, resume_text))
+                                continue
                         
-                        analysis_data = candidate_analyzer.analyze_resume(
-                            resume_text, 
-                            st.session_state.job_description
-                        )
+                        # Keep for the bulk insert into the repository
+                        processed_resumes.append((file_name, resume_text))
+                        if analysis_data.get("prescreened"):
+                            # Local rejections depend on the floor, so they are not stored as analyses
+                            prescreened_count += 1
+                        else:
+                            processed_analyses.append((resume_text, st.session_state.job_description, dict(analysis_data)))
                         
-                        # Backup Email Extraction with Regex if missing
-                        if not analysis_data.get("email") or analysis_data.get("email") == "":
-                            email = resume_parser.extract_email(resume_text)
-                            if email:
-                                analysis_data["email"] = email
-                            else:
-                                analysis_data["email"] = "Not found"
+                        # Locally extracted contact details take precedence over anything stored with the analysis
+                        if contact["name_candidates"] or not analysis_data.get("name"):
+                            analysis_data["name"] = contact["name"]
+                        analysis_data["email"] = contact["email"] or analysis_data.get("email") or "Not found"
+                        analysis_data["phone"] = contact["phone"] or analysis_data.get("phone") or ""
                         
                         # Make automated decision based on configured threshold
                         auto_decision = "Pending"
                         decision_reason = ""
                         
-                        if analysis_data.get("overall_score", 0) >= auto_approve_threshold:
+                        if analysis_data.get("prescreened"):
+                            auto_decision = "Rejected"
+                            decision_reason = analysis_data["auto_decision"]["reason"]
+                        elif analysis_data.get("overall_score", 0) >= auto_approve_threshold:
                             auto_decision = "Approved"
                             decision_reason = f"Auto-approved: Score {analysis_data.get('overall_score')}% meets threshold ({auto_approve_threshold}%)"
                         else:
@@ -267,21 +683,45 @@ with tab2:
                             "Automated Decision": decision_reason,
                             "Email Sent": False
                         })
-                        
-                        # Update progress bar
-                        progress_bar.progress((i + 1) / len(uploaded_files))
                     
                     except Exception as e:
-                        st.error(f"Error processing {file.name}: {str(e)}")
+                        st.error(f"Error processing {file_name}: {str(e)}")
                 
-                # Add to the existing DataFrame
-                new_df = pd.DataFrame(new_candidates_data)
-                st.session_state.candidates_data = pd.concat([st.session_state.candidates_data, new_df], ignore_index=True)
+                # Persist resumes and analyses, then add the candidates in one step
+                job_description_hash = None
+                resume_hashes = None
+                if not offline_backend:
+                    with telemetry.span("persist_results", resumes=len(processed_resumes)):
+                        job_description_hash = repository.save_job_description(st.session_state.job_description)
+                        st.session_state.scored_job_description_hash = job_description_hash
+                        resume_hashes = repository.save_resumes(processed_resumes + linked_resumes)[:len(processed_resumes)]
+                        repository.save_duplicate_links(duplicate_links)
+                        repository.save_analyses(processed_analyses)
+                    with telemetry.span("talent_pool_indexing", resumes=len(processed_resumes) + len(linked_resumes)):
+                        stored_resumes = processed_resumes + linked_resumes
+                        load_talent_pool().add_resumes(
+                            [(content_hash(text), text) for _, text in stored_resumes]
+                        )
+                with telemetry.span("dataframe_update", rows=len(new_candidates_data)):
+                    new_ids = candidate_store.add_candidates(
+                        new_candidates_data,
+                        resume_hashes=resume_hashes,
+                        job_description_hash=job_description_hash
+                    )
+                    new_df = candidate_store.df.loc[new_ids]
+                telemetry.record("intake", time.perf_counter() - intake_start, resumes=len(uploaded_files))
                 
                 status_text.text("Processing complete!")
+                if prescreened_count:
+                    st.info(f"{prescreened_count} resumes were rejected by local pre-screening without an LLM call")
+                if duplicate_links:
+                    st.info(f"{len(duplicate_links)} resumes were near-duplicates of earlier uploads; "
+                            f"{len(linked_resumes)} were linked to existing candidates instead of being added again")
                 
                 # Automatic email generation and sending for approved candidates
-                if auto_email_enabled and gmail_email and gmail_password:
+                if auto_email_enabled and offline_backend:
+                    st.info("Interview slots are not booked and no emails are queued with an offline LLM backend")
+                elif auto_email_enabled and gmail_email and gmail_password:
                     # Get newly approved candidates
                     auto_approved_df = new_df[new_df["Status"] == "Approved"]
                     
@@ -299,116 +739,253 @@ with tab2:
                             "additional_details": "Please prepare to discuss your experiences and have questions ready about the role."
                         }
                         
-                        for idx, candidate in auto_approved_df.iterrows():
+                        # Skip candidates whose email is invalid or missing
+                        valid_email = auto_approved_df["Email"].str.contains("@", na=False) & (auto_approved_df["Email"] != "Not found")
+                        for name in auto_approved_df.loc[~valid_email, "Name"]:
+                            email_results.append({
+                                "candidate": name,
+                                "success": False,
+                                "message": "Invalid email address"
+                            })
+                        
+                        # Candidates who already have an invitation get neither a new email nor a slot
+                        already_invited = valid_email & auto_approved_df["Email"].map(
+                            lambda email: isinstance(email, str) and outbox.is_active(email, kind="interview")
+                        )
+                        for name in auto_approved_df.loc[already_invited, "Name"]:
+                            email_results.append({
+                                "candidate": name,
+                                "success": False,
+                                "skipped": True,
+                                "message": "Invitation already queued or sent"
+                            })
+                        
+                        # Prepare candidate info and assign interview slots to the whole batch in one pass
+                        scheduling_candidates = [
+                            {
+                                "name": candidate['Name'],
+                                "email": candidate['Email'],
+                                "overall_score": candidate['Overall Score'],
+                                "experience_match_percentage": candidate['Experience Match (%)'],
+                                "key_skills": candidate['Key Skills'].split(", "),
+                                "strengths": candidate['Strengths'].split(", ")
+                            }
+                            for _, candidate in auto_approved_df[valid_email & ~already_invited].iterrows()
+                        ]
+                        # Other sessions may have booked slots since this session loaded the calendar
+                        slot_calendar = st.session_state.slot_calendar
+                        slot_calendar.refresh()
+                        # Slots are only proposed here; each one is booked once its invitation is queued
+                        assignments = candidate_analyzer.schedule_interviews(
+                            scheduling_candidates,
+                            slot_calendar.free_slots(),
+                            use_llm=ai_slot_selection
+                        )
+                        
+                        for candidate_info, interview_slot in assignments:
+                            booked = False
                             try:
-                                # Skip if email is invalid or missing
-                                if candidate["Email"] == "Not found" or "@" not in candidate["Email"]:
-                                    email_results.append({
-                                        "candidate": candidate["Name"],
-                                        "success": False,
-                                        "message": "Invalid email address"
-                                    })
-                                    continue
-                                
-                                # Get an available interview slot
-                                available_slots = [slot for slot in st.session_state.available_interview_slots if slot["available"]]
-                                
-                                if not available_slots:
+                                if interview_slot is None:
                                     email_results.append({
-                                        "candidate": candidate["Name"],
+                                        "candidate": candidate_info["name"],
                                         "success": False,
                                         "message": "No interview slots available"
                                     })
                                     continue
                                 
-                                # Prepare candidate info
-                                candidate_info = {
-                                    "name": candidate['Name'],
-                                    "key_skills": candidate['Key Skills'].split(", "),
-                                    "strengths": candidate['Strengths'].split(", ")
-                                }
-                                
-                                # Get the best slot for this candidate using AI decision
-                                recommended_slot = candidate_analyzer.get_best_interview_time_slot(
-                                    candidate_info, 
-                                    available_slots
-                                )
-                                
-                                # Find the slot in our list
-                                interview_slot = next((slot for slot in available_slots if slot["id"] == recommended_slot["slot_id"]), available_slots[0])
-                                
-                                # Mark the slot as unavailable
-                                for i, slot in enumerate(st.session_state.available_interview_slots):
-                                    if slot["id"] == interview_slot["id"]:
-                                        st.session_state.available_interview_slots[i]["available"] = False
-                                
                                 # Use the slot info in the interview details
                                 interview_details = default_interview_details.copy()
                                 interview_details["date"] = f"{interview_slot['date']} at {interview_slot['time']}"
+                                if interview_slot.get("interviewer"):
+                                    interview_details["interviewer"] = f"{interview_slot['interviewer']}, {company_name}"
                                 
                                 # Generate the email
                                 email_content = communication_agent.generate_interview_email(
                                     candidate_info,
                                     st.session_state.job_description,
                                     interview_details,
-                                    "Professional"
+                                    "Professional",
+                                    mode=email_mode
                                 )
                                 
-                                # Send the email
-                                result = communication_agent.send_email(
-                                    to_email=candidate["Email"],
+                                # Claim the slot right before queueing, so another session cannot hand it out as well
+                                booked = bool(slot_calendar.book([interview_slot["id"]]))
+                                if not booked:
+                                    email_results.append({
+                                        "candidate": candidate_info["name"],
+                                        "success": False,
+                                        "message": "Interview slot was just booked by another session"
+                                    })
+                                    continue
+                                
+                                # Queue the email in the outbox; the background worker delivers it
+                                message_id, newly_queued = communication_agent.enqueue_email(
+                                    to_email=candidate_info["email"],
                                     subject=email_content["subject"],
                                     html_content=email_content["body"],
-                                    sender_name=default_interview_details["interviewer"]
+                                    sender_name=default_interview_details["interviewer"],
+                                    candidate_name=candidate_info["name"],
+                                    metadata={"interview_slot": interview_slot}
                                 )
+                                # The slot stays taken only for a newly queued invitation
+                                if not newly_queued:
+                                    slot_calendar.set_available([interview_slot["id"]], True)
                                 
-                                # Record the results
+                                # Record the results; another session may have invited the candidate in the meantime
                                 email_results.append({
-                                    "candidate": candidate["Name"],
-                                    "success": result["success"],
-                                    "message": result["message"],
+                                    "candidate": candidate_info["name"],
+                                    "success": newly_queued,
+                                    "skipped": not newly_queued,
+                                    "message": "Queued for delivery" if newly_queued else "Invitation already queued or sent",
                                     "interview_slot": interview_slot
                                 })
-                                
-                                # Store the email for record keeping
-                                if result["success"]:
-                                    st.session_state.emails_sent[candidate['Email']] = {
-                                        "subject": email_content["subject"],
-                                        "body": email_content["body"],
-                                        "sent": True,
-                                        "candidate_name": candidate['Name'],
-                                        "interview_slot": interview_slot,
-                                        "date_sent": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                                    }
-                                    
-                                    # Update the DataFrame to mark email as sent
-                                    for i, row in st.session_state.candidates_data.iterrows():
-                                        if row["Email"] == candidate["Email"]:
-                                            st.session_state.candidates_data.at[i, "Email Sent"] = True
                             
                             except Exception as e:
+                                if booked:
+                                    slot_calendar.set_available([interview_slot["id"]], True)
                                 email_results.append({
-                                    "candidate": candidate["Name"],
+                                    "candidate": candidate_info["name"],
                                     "success": False,
                                     "message": str(e)
                                 })
                         
                         # Display results
                         success_count = sum(1 for r in email_results if r["success"])
-                        fail_count = len(email_results) - success_count
+                        skipped_count = sum(1 for r in email_results if r.get("skipped"))
+                        fail_count = len(email_results) - success_count - skipped_count
                         
                         if success_count > 0:
-                            sending_status.success(f"✅ Successfully scheduled interviews for {success_count} candidates")
+                            sending_status.success(f"✅ Scheduled interviews for {success_count} candidates. Invitations are being delivered in the background.")
+                        
+                        if skipped_count > 0:
+                            st.info(f"Skipped {skipped_count} candidates who already have an interview invitation.")
                         
                         if fail_count > 0:
-                            st.error(f"⚠️ Failed to send {fail_count} emails. See Communication Dashboard for details.")
+                            st.error(f"⚠️ Could not prepare {fail_count} emails. See Communication Dashboard for details.")
                 
                 st.success(f"Successfully processed {len(uploaded_files)} resumes")
             else:
                 st.warning("Please upload resume files (PDF format)")
     
+    # Re-evaluate earlier applicants: nearest stored resumes first, full LLM scoring only for the top matches
+    st.markdown("### Search Talent Pool")
+    talent_pool = load_talent_pool()
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        talent_pool_k = st.number_input("Top matches", min_value=1, max_value=200, value=DEFAULT_TOP_K,
+                                        help="Stored resumes closest to the current job description")
+    with col2:
+        if st.button("Search talent pool", disabled=not st.session_state.job_description):
+            search_start = time.perf_counter()
+            with telemetry.span("talent_pool_search", k=talent_pool_k):
+                matches = talent_pool.search(st.session_state.job_description, k=talent_pool_k)
+            search_ms = 1000 * (time.perf_counter() - search_start)
+            stored = repository.get_resumes([resume_hash for resume_hash, _ in matches])
+            st.session_state.talent_pool_matches = [
+                {
+                    "resume_hash": resume_hash,
+                    "file_name": stored[resume_hash]["file_name"],
+                    "text": stored[resume_hash]["text"],
+                    "similarity": similarity
+                }
+                for resume_hash, similarity in matches if resume_hash in stored
+            ]
+            st.session_state.talent_pool_search_ms = search_ms
+    
+    talent_pool_matches = st.session_state.get("talent_pool_matches") or []
+    if talent_pool_matches:
+        st.caption(f"Searched {len(talent_pool)} stored resumes in {st.session_state.talent_pool_search_ms:.1f} ms")
+        match_contacts = resume_parser.extract_contacts_batch(
+            [match["text"] for match in talent_pool_matches],
+            [match["file_name"] for match in talent_pool_matches]
+        )
+        st.dataframe(pd.DataFrame({
+            "Name": [contact["name"] for contact in match_contacts],
+            "File": [match["file_name"] for match in talent_pool_matches],
+            "Similarity": [round(match["similarity"], 3) for match in talent_pool_matches]
+        }), hide_index=True)
+        
+        if st.button("Analyze top matches", disabled=not agents_initialized):
+            job_description_key = content_hash(st.session_state.job_description)
+            # Resumes that are already candidates for this job description are not scored again
+            pending_matches = [
+                (match, contact) for match, contact in zip(talent_pool_matches, match_contacts)
+                if repository.candidate_id_for_resume(match["resume_hash"], job_description_key) is None
+            ]
+            
+            def analyze_match(match):
+                stored_analysis = None if offline_backend else repository.get_analysis_by_hash(
+                    match["resume_hash"], st.session_state.job_description
+                )
+                if stored_analysis is not None:
+                    return stored_analysis, True
+                resume_text = match["text"]
+                if compact_prompts:
+                    resume_text = resume_parser.compact_text(resume_text, resume_token_budget)
+                return candidate_analyzer.analyze_resume(resume_text, st.session_state.job_description), False
+            
+            match_rows = []
+            match_hashes = []
+            match_analyses = []
+            with st.spinner(f"Analyzing {len(pending_matches)} top matches..."):
+                with ThreadPoolExecutor(max_workers=max_concurrent_analyses) as executor:
+                    futures = [executor.submit(analyze_match, match) for match, _ in pending_matches]
+                    
+                    for (match, contact), future in zip(pending_matches, futures):
+                        try:
+                            analysis_data, reused = future.result()
+                        except Exception as e:
+                            st.error(f"Error analyzing {match['file_name']}: {str(e)}")
+                            continue
+                        if not reused and not offline_backend:
+                            match_analyses.append((match["text"], st.session_state.job_description, dict(analysis_data)))
+                        
+                        score = analysis_data.get("overall_score", 0)
+                        if score >= auto_approve_threshold:
+                            auto_decision = "Approved"
+                            decision_reason = f"Auto-approved: Score {score}% meets threshold ({auto_approve_threshold}%)"
+                        else:
+                            auto_decision = "Pending"
+                            decision_reason = f"Manual review needed: Score {score}% below threshold ({auto_approve_threshold}%)"
+                        
+                        match_hashes.append(match["resume_hash"])
+                        match_rows.append({
+                            "Name": contact["name"],
+                            "Email": contact["email"] or analysis_data.get("email") or "Not found",
+                            "Skills Match (%)": analysis_data.get("skills_match_percentage", 0),
+                            "Experience Match (%)": analysis_data.get("experience_match_percentage", 0),
+                            "Overall Score": score,
+                            "Key Skills": ", ".join(analysis_data.get("key_skills", [])),
+                            "Strengths": ", ".join(analysis_data.get("strengths", [])),
+                            "Weaknesses": ", ".join(analysis_data.get("weaknesses", [])),
+                            "Recommendation": analysis_data.get("recommendation", ""),
+                            "Status": auto_decision,
+                            "Automated Decision": decision_reason,
+                            "Email Sent": False
+                        })
+            
+            job_description_hash = None
+            if not offline_backend:
+                job_description_hash = repository.save_job_description(st.session_state.job_description)
+                repository.save_analyses(match_analyses)
+                st.session_state.scored_job_description_hash = job_description_hash
+            candidate_store.add_candidates(
+                match_rows,
+                resume_hashes=match_hashes,
+                job_description_hash=job_description_hash
+            )
+            skipped = len(talent_pool_matches) - len(pending_matches)
+            st.success(f"Added {len(match_rows)} candidates from the talent pool"
+                       + (f"; {skipped} were already candidates for this job description" if skipped else ""))
+    
+    # Reflect background deliveries in the "Email Sent" column, reading only what was sent since the last check
+    sent_emails, st.session_state.email_sent_mark = outbox.sent_recipients_since(
+        st.session_state.get("email_sent_mark"), kind="interview"
+    )
+    candidate_store.mark_email_sent(sent_emails)
+    
     # Display candidate analysis results in an editable table
-    if not st.session_state.candidates_data.empty:
+    if not candidate_store.empty:
         st.markdown("### Candidate Analysis Results")
         
         # Add filters
@@ -429,15 +1006,24 @@ with tab2:
             )
         
         # Apply filters
-        filtered_df = st.session_state.candidates_data[
-            (st.session_state.candidates_data["Overall Score"] >= min_score) &
-            (st.session_state.candidates_data["Recommendation"].isin(recommendation_filter)) &
-            (st.session_state.candidates_data["Status"].isin(status_filter))
+        filtered_df = candidate_store.df[
+            (candidate_store.df["Overall Score"] >= min_score) &
+            (candidate_store.df["Recommendation"].isin(recommendation_filter)) &
+            (candidate_store.df["Status"].isin(status_filter))
         ]
         
+        # Page through large candidate pools instead of rendering every row
+        page_size = 50
+        page_count = max(1, -(-len(filtered_df) // page_size))
+        if page_count > 1:
+            page_number = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+        else:
+            page_number = 1
+        page_df = filtered_df.iloc[(page_number - 1) * page_size:page_number * page_size]
+        
         # Create an editable data table
         edited_df = st.data_editor(
-            filtered_df,
+            page_df,
             column_config={
                 "Status": st.column_config.SelectboxColumn(
                     "Status",
@@ -457,35 +1043,33 @@ with tab2:
                     help="Whether an interview email has been sent",
                     width="small",
                     disabled=True
+                ),
+                "JD Version": st.column_config.NumberColumn(
+                    "JD Version",
+                    help="Job description version the scores were computed against",
+                    format="v%d",
+                    disabled=True
                 )
             },
             use_container_width=True,
             hide_index=True,
         )
         
-        # Update the main dataframe with edited values and trigger email for newly approved candidates
-        newly_approved = []
+        # Apply only the rows whose status actually changed, addressed by candidate ID
+        status_changes = candidate_store.apply_edits(edited_df, columns=["Status"])
         
-        for i, row in edited_df.iterrows():
-            idx = st.session_state.candidates_data.index[
-                st.session_state.candidates_data["Email"] == row["Email"]
-            ].tolist()
-            
-            if idx:
-                # Check if status has changed from Pending to Approved
-                original_status = st.session_state.candidates_data.loc[idx[0], "Status"]
-                if original_status != "Approved" and row["Status"] == "Approved":
-                    newly_approved.append(row)
-                
-                # Update status
-                st.session_state.candidates_data.loc[idx[0], "Status"] = row["Status"]
-                
-                # If rejected, add the reason
-                if row["Status"] == "Rejected" and original_status != "Rejected":
-                    st.session_state.candidates_data.loc[idx[0], "Automated Decision"] = "Manually rejected"
+        newly_approved = status_changes[
+            (status_changes["Status"] == "Approved") & (status_changes["previous Status"] != "Approved")
+        ]
+        newly_rejected_ids = status_changes.index[
+            (status_changes["Status"] == "Rejected") & (status_changes["previous Status"] != "Rejected")
+        ]
+        
+        # If rejected, add the reason
+        candidate_store.update_rows(newly_rejected_ids, "Automated Decision", "Manually rejected")
         
         # Trigger email for newly approved candidates if auto-email is enabled
-        if auto_email_enabled and gmail_email and gmail_password and newly_approved:
+        if auto_email_enabled and gmail_email and gmail_password and not newly_approved.empty:
             st.info(f"Scheduling interviews for {len(newly_approved)} newly approved candidates...")
             
             # Process will be similar to the auto-email logic above
@@ -495,34 +1079,128 @@ with tab2:
             st.button("Send Interview Invitations", key="send_new_invitations")
         
         # Show the automated analysis summary
-        approved_count = len(st.session_state.candidates_data[st.session_state.candidates_data["Status"] == "Approved"])
-        pending_count = len(st.session_state.candidates_data[st.session_state.candidates_data["Status"] == "Pending"])
-        rejected_count = len(st.session_state.candidates_data[st.session_state.candidates_data["Status"] == "Rejected"])
+        approved_count = len(candidate_store.df[candidate_store.df["Status"] == "Approved"])
+        pending_count = len(candidate_store.df[candidate_store.df["Status"] == "Pending"])
+        rejected_count = len(candidate_store.df[candidate_store.df["Status"] == "Rejected"])
         
         st.markdown(f"### Analysis Summary")
         col1, col2, col3 = st.columns(3)
         col1.metric("Approved Candidates", approved_count)
         col2.metric("Pending Review", pending_count)
         col3.metric("Rejected Candidates", rejected_count)
+        
+        # Bulk rejection emails, drafted in batches and delivered through the outbox
+        if rejected_count > 0 and gmail_email and gmail_password and agents_initialized and not offline_backend:
+            already_notified = outbox.active_recipients(kind="rejection")
+            rejected_df = candidate_store.df[
+                (candidate_store.df["Status"] == "Rejected") &
+                (candidate_store.df["Email"].str.contains("@", na=False)) &
+                (~candidate_store.df["Email"].isin(already_notified))
+            ]
+            
+            if not rejected_df.empty and st.button(f"Send Rejection Emails ({len(rejected_df)})"):
+                with st.spinner(f"Drafting {len(rejected_df)} rejection emails..."):
+                    try:
+                        candidates_info = [
+                            {
+                                "name": row["Name"],
+                                "strengths": [item for item in str(row["Strengths"]).split(", ") if item],
+                                "weaknesses": [item for item in str(row["Weaknesses"]).split(", ") if item]
+                            }
+                            for _, row in rejected_df.iterrows()
+                        ]
+                        rejection_emails = communication_agent.generate_rejection_emails_batch(
+                            candidates_info,
+                            st.session_state.job_description,
+                            mode=email_mode
+                        )
+                        
+                        for (_, row), email_content in zip(rejected_df.iterrows(), rejection_emails):
+                            communication_agent.enqueue_email(
+                                to_email=row["Email"],
+                                subject=email_content["subject"],
+                                html_content=email_content["body"],
+                                sender_name=f"{interviewer_name}, {company_name}",
+                                candidate_name=row["Name"],
+                                kind="rejection"
+                            )
+                        
+                        st.success(f"Queued {len(rejection_emails)} rejection emails for delivery")
+                    except Exception as e:
+                        st.error(f"Error preparing rejection emails: {str(e)}")
+        
+        # Rank candidates directly on the DataFrame so re-weighting stays instant for large pools
+        st.markdown("### Candidate Ranking")
+        candidate_count = len(candidate_store.df)
+        weight_col1, weight_col2, weight_col3, weight_col4 = st.columns(4)
+        with weight_col1:
+            skills_weight = st.slider("Skills Weight", 0.0, 1.0, DEFAULT_WEIGHTS["skills_match_percentage"], 0.05)
+        with weight_col2:
+            experience_weight = st.slider("Experience Weight", 0.0, 1.0, DEFAULT_WEIGHTS["experience_match_percentage"], 0.05)
+        with weight_col3:
+            overall_weight = st.slider("Overall Score Weight", 0.0, 1.0, DEFAULT_WEIGHTS["overall_score"], 0.05)
+        with weight_col4:
+            top_k = st.number_input("Show top", min_value=1, max_value=candidate_count, value=min(10, candidate_count))
+        
+        ranked_df = rank_dataframe(
+            candidate_store.df,
+            [skills_weight, experience_weight, overall_weight],
+            top_k=int(top_k)
+        )
+        st.dataframe(
+            ranked_df[["Name", "Email", "Skills Match (%)", "Experience Match (%)", "Overall Score", "Weighted Score", "Status"]],
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        if st.checkbox("Compare weight profiles"):
+            profile_rankings = rank_under_profiles(candidate_store.df, WEIGHT_PROFILES, top_k=int(top_k))
+            candidate_names = candidate_store.df["Name"].to_numpy()
+            comparison_df = pd.DataFrame(
+                {profile: candidate_names[positions] for profile, positions in profile_rankings.items()},
+                index=pd.RangeIndex(1, len(next(iter(profile_rankings.values()))) + 1, name="Rank")
+            )
+            st.dataframe(comparison_df, use_container_width=True)
 
 # COMMUNICATION DASHBOARD
 with tab3:
     st.header("Communication Dashboard")
     
+    # Delivery status comes straight from the outbox, which the background worker keeps updating
+    outbox_messages = outbox.list_messages()
+    status_counts = outbox.status_counts()
+    
+    status_col1, status_col2, status_col3, status_col4 = st.columns(4)
+    status_col1.metric("Queued", status_counts.get("queued", 0))
+    status_col2.metric("Sending", status_counts.get("sending", 0))
+    status_col3.metric("Sent", status_counts.get("sent", 0))
+    status_col4.metric("Failed", status_counts.get("failed", 0))
+    if st.button("Refresh Delivery Status"):
+        st.experimental_rerun()
+    
+    # Messages queued before the outbox recorded sender accounts are only sent once a recruiter picks the account
+    unassigned_count = outbox.unassigned_count()
+    if unassigned_count:
+        st.warning(f"{unassigned_count} queued emails have no sender account and will not be sent until one is chosen.")
+        if gmail_email and gmail_password and st.button(f"Send them from {gmail_email}"):
+            outbox.assign_sender(gmail_email)
+            st.experimental_rerun()
+    
     st.markdown("### Interview Schedule")
     
     # Create a schedule view of all interviews
-    if st.session_state.emails_sent:
+    if outbox_messages:
         interview_schedule = []
-        for email, content in st.session_state.emails_sent.items():
-            if "interview_slot" in content:
+        for message in outbox_messages:
+            interview_slot = message["metadata"].get("interview_slot")
+            if interview_slot:
                 interview_schedule.append({
-                    "Candidate": content["candidate_name"],
-                    "Email": email,
-                    "Date": content["interview_slot"]["date"],
-                    "Time": content["interview_slot"]["time"],
-                    "Sent On": content.get("date_sent", "Unknown"),
-                    "Status": "Confirmed" if content["sent"] else "Pending"
+                    "Candidate": message["candidate_name"],
+                    "Email": message["to_email"],
+                    "Date": interview_slot["date"],
+                    "Time": interview_slot["time"],
+                    "Sent On": message["sent_at"] or "Not yet sent",
+                    "Status": "Confirmed" if message["status"] == "sent" else message["status"].title()
                 })
         
         if interview_schedule:
@@ -535,92 +1213,169 @@ with tab3:
     # Email management
     st.markdown("### Email History")
     
-    if st.session_state.emails_sent:
+    if outbox_messages:
         email_history = []
-        for email, content in st.session_state.emails_sent.items():
+        for message in outbox_messages:
             interview_slot_info = ""
-            if "interview_slot" in content:
-                interview_slot_info = f"{content['interview_slot']['date']} at {content['interview_slot']['time']}"
+            interview_slot = message["metadata"].get("interview_slot")
+            if interview_slot:
+                interview_slot_info = f"{interview_slot['date']} at {interview_slot['time']}"
             
             email_history.append({
-                "Candidate": content["candidate_name"],
-                "Email Address": email,
-                "Subject": content["subject"],
+                "Candidate": message["candidate_name"],
+                "Email Address": message["to_email"],
+                "Subject": message["subject"],
                 "Interview Time": interview_slot_info,
-                "Status": "Sent" if content["sent"] else "Pending",
-                "Date Sent": content.get("date_sent", "")
+                "Status": message["status"].title(),
+                "Attempts": message["attempts"],
+                "Last Error": message["last_error"] or "",
+                "Queued On": message["created_at"],
+                "Date Sent": message["sent_at"] or ""
             })
         
         st.dataframe(pd.DataFrame(email_history), use_container_width=True, hide_index=True)
         
         # View email content
         if st.checkbox("View Email Content"):
-            email_to_view = st.selectbox("Select email to view", 
-                                        [f"{content['candidate_name']} ({email})" for email, content in st.session_state.emails_sent.items()])
+            messages_by_label = {
+                f"{message['candidate_name']} ({message['to_email']}) #{message['id']}": message
+                for message in outbox_messages
+            }
+            email_to_view = st.selectbox("Select email to view", list(messages_by_label))
             
             if email_to_view:
-                selected_email = email_to_view.split("(")[1].split(")")[0]
-                content = st.session_state.emails_sent.get(selected_email)
-                
-                if content:
-                    st.markdown(f"**Subject:** {content['subject']}")
-                    st.markdown("**Email Body:**")
-                    st.text_area("", value=content['body'], height=300, disabled=True)
+                content = messages_by_label[email_to_view]
+                st.markdown(f"**Subject:** {content['subject']}")
+                st.markdown("**Email Body:**")
+                st.text_area("", value=content['body'], height=300, disabled=True)
     else:
         st.info("No emails have been sent yet.")
     
     # Interview slot management
     st.markdown("### Interview Slot Management")
     
+    slot_calendar = st.session_state.slot_calendar
+    
     # Show current slots
-    slots_df = pd.DataFrame(st.session_state.available_interview_slots)
-    st.dataframe(slots_df)
+    st.dataframe(slot_calendar.to_dataframe(), hide_index=True)
     
     # Add new slots
     st.markdown("#### Add New Interview Slot")
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
         new_date = st.date_input("Date")
     with col2:
         new_time = st.text_input("Time (e.g. 10:30 AM)")
     with col3:
+        new_interviewer = st.text_input("Interviewer (optional)")
+    with col4:
+        new_interviewer_skills = st.text_input("Interviewer skills (optional, comma separated)",
+                                               help="Candidates sharing one of these key skills are offered this slot first")
+    with col5:
         if st.button("Add Slot"):
-            new_id = max([slot["id"] for slot in st.session_state.available_interview_slots]) + 1 if st.session_state.available_interview_slots else 1
-            st.session_state.available_interview_slots.append({
-                "id": new_id,
-                "date": new_date.strftime("%Y-%m-%d"),
-                "time": new_time,
-                "available": True
-            })
-            st.success("New interview slot added")
-            st.experimental_rerun()
+            if slot_calendar.add_slot(new_date, new_time, new_interviewer, new_interviewer_skills):
+                st.success("New interview slot added")
+                st.experimental_rerun()
+            else:
+                st.warning("This slot already exists")
     
     # Add bulk slots option
     if st.checkbox("Add Multiple Slots"):
         col1, col2 = st.columns(2)
         with col1:
             start_date = st.date_input("Start Date")
-            days = st.number_input("Number of Days", min_value=1, max_value=14, value=5)
+            days = st.number_input("Number of Days", min_value=1, max_value=366, value=5)
+            interviewers_input = st.text_area("Interviewers (optional, one per line)", "",
+                                              help="Add the interviewer's skills after a colon, e.g. \"Jane Doe: Python, AWS\"")
         with col2:
             times_input = st.text_area("Times (one per line)", "9:00 AM\n11:00 AM\n2:00 PM\n4:00 PM")
             
         if st.button("Generate Multiple Slots"):
             times = [time.strip() for time in times_input.split("\n") if time.strip()]
+            interviewers = []
+            interviewer_skills = {}
+            for line in interviewers_input.split("\n"):
+                name, _, skills = line.partition(":")
+                if name.strip():
+                    interviewers.append(name.strip())
+                    interviewer_skills[name.strip()] = skills
             
-            from datetime import timedelta
-            
-            for day in range(days):
-                current_date = start_date + timedelta(days=day)
-                for time in times:
-                    new_id = max([slot["id"] for slot in st.session_state.available_interview_slots]) + 1 if st.session_state.available_interview_slots else 1
-                    st.session_state.available_interview_slots.append({
-                        "id": new_id,
-                        "date": current_date.strftime("%Y-%m-%d"),
-                        "time": time,
-                        "available": True
-                    })
-            
-            st.success(f"Added {len(times) * days} new interview slots")
+            new_slots = slot_calendar.add_range(start_date, days, times, interviewers, interviewer_skills)
+            st.success(f"Added {len(new_slots)} new interview slots")
+            st.experimental_rerun()
+
+# Analysis cache statistics (rendered last so this run's hits and misses are included)
+with st.sidebar:
+    st.markdown("---")
+    st.markdown("### Analysis Cache")
+    cache_stats = analysis_cache.stats()
+    cache_col1, cache_col2 = st.columns(2)
+    cache_col1.metric("Cache Hits", cache_stats["hits"])
+    cache_col2.metric("Cache Misses", cache_stats["misses"])
+    st.caption(f"{cache_stats['entries']} of {cache_stats['max_entries']} cached analyses in use")
+    if st.button("Clear Analysis Cache"):
+        analysis_cache.clear()
+        st.experimental_rerun()
+    
+    st.markdown("### Response Parsing")
+    parse_totals = parse_stats.snapshot()["total"]
+    parse_col1, parse_col2, parse_col3 = st.columns(3)
+    parse_col1.metric("Parsed", parse_totals["parsed"])
+    parse_col2.metric("Repaired", parse_totals["repaired"])
+    parse_col3.metric("Failed", parse_totals["failed"])
+    st.caption(f"{parse_totals['repair_calls']} repair requests, ~{parse_totals['wasted_tokens']} tokens spent on unusable output")
+    
+    model_router = load_router(google_api_key, routing_settings, llm_backend) if google_api_key else None
+    if model_router is not None:
+        st.markdown("### Model Tiers")
+        tier_stats = pd.DataFrame.from_dict(model_router.stats(), orient="index")
+        st.dataframe(tier_stats[["model", "calls", "errors", "p50_latency", "p95_latency", "input_tokens", "output_tokens"]])
+
+# Per-stage timings, token counts and retries recorded by the instrumentation (rendered last to include this run)
+with st.expander("Pipeline Performance"):
+    stage_stats = telemetry.stage_stats()
+    if not stage_stats:
+        st.info("No pipeline activity recorded yet. Process some resumes to see per-stage timings.")
+    else:
+        stage_df = pd.DataFrame.from_dict(stage_stats, orient="index").sort_values("total_seconds", ascending=False)
+        st.dataframe(stage_df[["count", "errors", "total_seconds", "mean_ms", "p50_ms", "p95_ms", "max_ms"]])
+        
+        histogram_stage = st.selectbox("Latency histogram for stage", list(stage_df.index))
+        # Numbered labels keep the buckets in order on the chart axis
+        histogram_df = pd.DataFrame(
+            [(f"{position:02d} {label}", count) for position, (label, count) in enumerate(telemetry.histogram(histogram_stage))],
+            columns=["Duration", "Spans"]
+        ).set_index("Duration")
+        st.bar_chart(histogram_df)
+        
+        perf_col1, perf_col2 = st.columns(2)
+        with perf_col1:
+            st.markdown("**LLM tokens by stage**")
+            token_rows = [(labels.get("stage"), labels.get("model"), labels.get("direction"), value)
+                          for _, labels, value in telemetry.counters("llm_tokens")]
+            if token_rows:
+                token_df = pd.DataFrame(token_rows, columns=["Stage", "Model", "Direction", "Tokens"])
+                st.dataframe(token_df.pivot_table(index=["Stage", "Model"], columns="Direction", values="Tokens",
+                                                  aggfunc="sum", fill_value=0))
+            else:
+                st.caption("No LLM calls recorded")
+        with perf_col2:
+            st.markdown("**Retries**")
+            retry_rows = [(labels.get("kind"), value) for _, labels, value in telemetry.counters("retries")]
+            if retry_rows:
+                st.dataframe(pd.DataFrame(retry_rows, columns=["Kind", "Retries"]).set_index("Kind"))
+            else:
+                st.caption("No retries recorded")
+        
+        client_stats = llm_client_stats()
+        if client_stats:
+            st.markdown("**LLM clients**")
+            st.dataframe(pd.DataFrame.from_dict(client_stats, orient="index").rename_axis(["Backend", "Model"]))
+        
+        perf_col3, perf_col4 = st.columns(2)
+        perf_col3.download_button("Download Prometheus metrics", telemetry.to_prometheus(), file_name="hr_assistant_metrics.txt")
+        if perf_col4.button("Reset Performance Metrics"):
+            telemetry.reset()
             st.experimental_rerun()
 
 # Footer